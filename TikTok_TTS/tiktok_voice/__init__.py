@@ -1,2 +1,4 @@
-from .src.text_to_speech import tts
-from .src.voice import Voice
\ No newline at end of file
+from .src.text_to_speech import tts, configure_http, configure_hedging, configure_limiter
+from .src.text_to_speech_async import tts_async, create_async_session
+from .src.voice import Voice
+from .src.endpoint_health import health_snapshot
@@ -0,0 +1,114 @@
+# Python standard modules
+import time
+from collections import deque
+from threading import Lock
+from typing import Deque, Dict, List, Optional
+
+class EndpointHealth:
+    """Rolling latency and error statistics for one endpoint, with a circuit breaker.
+
+    After failure_threshold consecutive failures the circuit opens and the
+    endpoint is skipped for cooldown seconds. Once the cooldown is over it is
+    half-open: it gets traffic again and the next success closes it.
+    """
+
+    def __init__(self, window: int = 50, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold: int = failure_threshold
+        self.cooldown: float = cooldown
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._consecutive_failures: int = 0
+        self._opened_at: Optional[float] = None
+        self._lock: Lock = Lock()
+        # Lifetime totals (the rolling window above forgets old requests)
+        self.requests: int = 0
+        self.failures: int = 0
+
+    def record_success(self, latency: float):
+        """Record a successful request and its latency in seconds."""
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(latency)
+            self._outcomes.append(True)
+            self._consecutive_failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        """Record a failed request, opening the circuit if needed."""
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            self._outcomes.append(False)
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def is_available(self) -> bool:
+        """Whether the circuit is closed or its cooldown is over (half-open)."""
+        with self._lock:
+            return self._opened_at is None or time.monotonic() - self._opened_at >= self.cooldown
+
+    def error_rate(self) -> float:
+        """Fraction of failed requests in the rolling window."""
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency (in seconds) at the given percentile of the rolling window."""
+        with self._lock:
+            if not self._latencies:
+                return None
+            ordered: List[float] = sorted(self._latencies)
+        index: int = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def score(self) -> float:
+        """Lower is better: median latency weighted by the error rate.
+
+        Endpoints without measurements score 0 so they get tried early.
+        """
+        median: Optional[float] = self.latency_percentile(50)
+        if median is None:
+            return 0.0
+        return median * (1 + 4 * self.error_rate())
+
+
+_health: Dict[str, EndpointHealth] = {}
+_health_lock: Lock = Lock()
+
+def get_health(url: str) -> EndpointHealth:
+    """Return the shared health tracker for an endpoint url."""
+    with _health_lock:
+        health = _health.get(url)
+        if health is None:
+            health = EndpointHealth()
+            _health[url] = health
+        return health
+
+def health_snapshot() -> Dict[str, Dict[str, float]]:
+    """Totals and current state of every endpoint tried so far, keyed by url."""
+    with _health_lock:
+        trackers = dict(_health)
+    return {
+        url: {
+            "requests": health.requests,
+            "failures": health.failures,
+            "circuit_open": not health.is_available(),
+            "error_rate": health.error_rate(),
+        }
+        for url, health in trackers.items()
+    }
+
+def rank_endpoints(endpoints: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Order endpoints from best to worst, leaving out open circuits.
+
+    If every circuit is open the configured order is kept, so a request is
+    still attempted instead of failing without trying.
+    """
+    available = [endpoint for endpoint in endpoints if get_health(endpoint["url"]).is_available()]
+    if not available:
+        return list(endpoints)
+    # sorted() is stable, so ties keep the config.json order
+    return sorted(available, key=lambda endpoint: get_health(endpoint["url"]).score())
@@ -1,94 +1,330 @@
 # Python standard modules
+import io
 import os
 import requests
 import base64
 import re
+import time
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from json import load
-from threading import Thread
-from typing import Dict, List, Optional
-
-# Downloaded modules
-from playsound import playsound
+from threading import Event, Lock
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
 
 # Local files
 from .voice import Voice
+from .endpoint_health import get_health, rank_endpoints
+
+# Shared HTTP connection pools (one keep-alive session per endpoint host)
+DEFAULT_POOL_SIZE: int = 16
+DEFAULT_TIMEOUT: Tuple[float, float] = (5.0, 30.0) # (connect, read) in seconds
+# Maximum number of chunks of one endpoint requested at the same time
+DEFAULT_MAX_PARALLEL_CHUNKS: int = 8
+
+_pool_size: int = DEFAULT_POOL_SIZE
+_timeout: Tuple[float, float] = DEFAULT_TIMEOUT
+_max_parallel_chunks: int = DEFAULT_MAX_PARALLEL_CHUNKS
+_sessions: Dict[str, requests.Session] = {}
+_chunk_executors: Dict[str, ThreadPoolExecutor] = {}
+_sessions_lock: Lock = Lock()
+
+def configure_http(
+    pool_size: Optional[int] = None,
+    timeout: Optional[Union[float, Tuple[float, float]]] = None,
+    max_parallel_chunks: Optional[int] = None
+):
+    """Configure the shared connection pools used for every endpoint.
+
+    pool_size is the number of keep-alive connections kept per endpoint host
+    and timeout is either one value or a (connect, read) tuple in seconds.
+    max_parallel_chunks bounds how many chunks are in flight per endpoint.
+    Existing sessions and workers are released and rebuilt on their next use.
+    """
+    global _pool_size, _timeout, _max_parallel_chunks
+
+    with _sessions_lock:
+        if pool_size is not None:
+            if pool_size < 1:
+                raise ValueError("pool_size must be at least 1")
+            _pool_size = pool_size
+        if timeout is not None:
+            _timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        if max_parallel_chunks is not None:
+            if max_parallel_chunks < 1:
+                raise ValueError("max_parallel_chunks must be at least 1")
+            _max_parallel_chunks = max_parallel_chunks
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        for executor in _chunk_executors.values():
+            executor.shutdown(wait=False)
+        _chunk_executors.clear()
+
+def _get_chunk_executor(url: str) -> ThreadPoolExecutor:
+    """Return the bounded worker pool that fetches chunks for an endpoint."""
+    with _sessions_lock:
+        executor = _chunk_executors.get(url)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=_max_parallel_chunks, thread_name_prefix="tiktok_chunk")
+            _chunk_executors[url] = executor
+        return executor
+
+# Hedged requests (disabled by default)
+_hedge_enabled: bool = False
+_hedge_percentile: float = 95.0
+_hedge_min_delay: float = 0.25
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_lock: Lock = Lock()
+
+def configure_hedging(
+    enabled: bool = True,
+    percentile: float = 95.0,
+    min_delay: float = 0.25
+):
+    """Enable or disable hedged chunk requests.
+
+    When enabled, a chunk that has not been answered by the best endpoint
+    within its latency percentile (but at least min_delay seconds) is also
+    sent to the next endpoint, and the first good response wins.
+    """
+    global _hedge_enabled, _hedge_percentile, _hedge_min_delay
+
+    if not 0 < percentile <= 100:
+        raise ValueError("percentile must be in (0, 100]")
+    _hedge_enabled = enabled
+    _hedge_percentile = percentile
+    _hedge_min_delay = min_delay
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    """Return the executor used to run hedged requests, creating it on first use."""
+    global _hedge_executor
+
+    with _hedge_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=2 * _pool_size, thread_name_prefix="tiktok_hedge")
+        return _hedge_executor
+
+# Optional limiter of the requests in flight per endpoint (disabled by default)
+_limiter_factory: Optional[Callable[[str], Any]] = None
+
+def configure_limiter(factory: Optional[Callable[[str], Any]]):
+    """Bound the requests in flight to each endpoint with an external limiter.
+
+    factory(url) returns the limiter of an endpoint: an object with a
+    blocking acquire(), an awaitable acquire_async() and
+    release(success, latency, throttled). Every chunk request holds a slot
+    while it runs; success is None when a request was cancelled (for example
+    the loser of a hedge race) and throttled is True on HTTP 429.
+    Pass None to disable.
+    """
+    global _limiter_factory
+    _limiter_factory = factory
+
+def _get_limiter(url: str) -> Optional[Any]:
+    return _limiter_factory(url) if _limiter_factory is not None else None
+
+def _get_session(url: str) -> requests.Session:
+    """Return the shared session for the host of url, creating it on first use."""
+    parts = urlsplit(url)
+    key: str = f"{parts.scheme}://{parts.netloc}"
+
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_pool_size)
+            session.mount(key, adapter)
+            _sessions[key] = session
+        return session
 
 def tts(
     text: str,
     voice: Voice,
-    output_file_path: str = "output.mp3",
+    output_file_path: Optional[str] = "output.mp3",
     play_sound: bool = False
-):
-    """Main function to convert text to speech and save to a file."""
+) -> Optional[bytes]:
+    """Main function to convert text to speech and save to a file.
+
+    Audio is written to the file chunk by chunk, in order, as soon as each
+    chunk and all its predecessors have arrived. Pass output_file_path=None to
+    skip the file and get the audio bytes back instead.
+    """
     
     # Validate input arguments
     _validate_args(text, voice)
 
     # Load endpoint data from the endpoints.json file
     endpoint_data: List[Dict[str, str]] = _load_endpoints()
-    success: bool = False    
+
+    # Try the healthiest endpoints first; skip those whose circuit is open
+    ranked_endpoints: List[Dict[str, str]] = rank_endpoints(endpoint_data)
 
     # Iterate over endpoints to find a working one
-    for endpoint in endpoint_data:
-        # Generate audio bytes from the current endpoint
-        audio_bytes: bytes = _fetch_audio_bytes(endpoint, text, voice)
-        
-        if audio_bytes:
-            # Save the generated audio to a file
-            _save_audio_file(output_file_path, audio_bytes)
+    for index, endpoint in enumerate(ranked_endpoints):
+        # The next endpoint in line receives hedged duplicates of slow chunks
+        hedge_endpoint = ranked_endpoints[index + 1] if index + 1 < len(ranked_endpoints) else None
+
+        # Stream the audio from the current endpoint into the output
+        sink: BinaryIO = _open_sink(output_file_path)
+        success: bool = _fetch_audio(endpoint, text, voice, hedge_endpoint, sink)
+        audio_bytes: Optional[bytes] = _close_sink(sink, output_file_path, success)
         
+        if success:
             # Optionally play the audio file
-            if play_sound:
+            if output_file_path is not None and play_sound:
+                # Imported on demand: playback is rare and playsound is slow to import
+                from playsound import playsound
                 playsound(output_file_path)
             
-            success = True
             # Stop after processing a valid endpoint
-            break
+            return audio_bytes
 
-    if not success:
-        raise Exception("failed to generate audio")
+    raise Exception("failed to generate audio")
 
-def _save_audio_file(output_file_path: str, audio_bytes: bytes):
-    """Write the audio bytes to a file."""
-    if os.path.exists(output_file_path):
-        os.remove(output_file_path)
-        
-    with open(output_file_path, "wb") as file:
-        file.write(audio_bytes)
+def _open_sink(output_file_path: Optional[str]) -> BinaryIO:
+    """Open where the audio of one endpoint attempt is written.
+
+    Files are written next to the target with a .part suffix and only
+    renamed into place once every chunk has arrived.
+    """
+    if output_file_path is None:
+        return io.BytesIO()
+    return open(f"{output_file_path}.part", "wb")
+
+def _close_sink(sink: BinaryIO, output_file_path: Optional[str], success: bool) -> Optional[bytes]:
+    """Finish an endpoint attempt, returning the audio bytes when there is no output file."""
+    if output_file_path is None:
+        return sink.getvalue() if success else None
+
+    sink.close()
+    if success:
+        os.replace(f"{output_file_path}.part", output_file_path)
+    elif os.path.exists(f"{output_file_path}.part"):
+        os.remove(f"{output_file_path}.part")
+    return None
 
-def _fetch_audio_bytes(
+class _OrderedWriter:
+    """Write chunks to a sink in index order, each as soon as its predecessors are written."""
+
+    def __init__(self, sink: BinaryIO):
+        self._sink: BinaryIO = sink
+        self._waiting: Dict[int, bytes] = {}
+        self._next_index: int = 0
+
+    def add(self, index: int, audio_chunk: bytes):
+        self._waiting[index] = audio_chunk
+        while self._next_index in self._waiting:
+            self._sink.write(self._waiting.pop(self._next_index))
+            self._next_index += 1
+
+def _request_chunk(
     endpoint: Dict[str, str],
-    text: str,
+    text_chunk: str,
+    voice: Voice,
+    discarded: Optional[Event] = None
+) -> Optional[bytes]:
+    """Request and decode one chunk from an endpoint, recording the outcome in its health stats.
+
+    A thread cannot be cancelled mid-request, so a hedge loser runs to the end;
+    once discarded is set its result is ignored and recorded as cancelled.
+    """
+    health = get_health(endpoint["url"])
+    limiter = _get_limiter(endpoint["url"])
+    if limiter is not None:
+        limiter.acquire()
+    audio_chunk: Optional[bytes] = None
+    throttled: bool = False
+    success: Optional[bool] = None
+    # Started after the limiter so queueing time does not count as endpoint latency
+    started: float = time.monotonic()
+    try:
+        session = _get_session(endpoint["url"])
+        response = session.post(endpoint["url"], json={"text": text_chunk, "voice": voice.value}, timeout=_timeout)
+        throttled = response.status_code == 429
+        response.raise_for_status()
+        # Each chunk is a complete base64 string, so it is decoded on its own
+        audio_chunk = base64.b64decode(response.json()[endpoint["response"]] or "")
+    except (requests.RequestException, KeyError, ValueError, TypeError):
+        audio_chunk = None
+    finally:
+        latency: float = time.monotonic() - started
+        # None for a hedge loser, like a cancelled request in the async client
+        success = None if discarded is not None and discarded.is_set() else bool(audio_chunk)
+        if limiter is not None:
+            limiter.release(success, latency, throttled)
+
+    if success is None:
+        return None
+    if not success:
+        health.record_failure()
+        return None
+    health.record_success(latency)
+    return audio_chunk
+
+def _fetch_chunk(
+    endpoint: Dict[str, str],
+    hedge_endpoint: Optional[Dict[str, str]],
+    text_chunk: str,
     voice: Voice
 ) -> Optional[bytes]:
-    """Fetch audio data from an endpoint and decode it."""
+    """Fetch one chunk, sending a hedged duplicate to hedge_endpoint if the first request is slow."""
+    if not _hedge_enabled or hedge_endpoint is None:
+        return _request_chunk(endpoint, text_chunk, voice)
+
+    executor = _get_hedge_executor()
+    delay: float = max(_hedge_min_delay, get_health(endpoint["url"]).latency_percentile(_hedge_percentile) or 0.0)
+    discarded = Event()
+    pending = {executor.submit(_request_chunk, endpoint, text_chunk, voice, discarded)}
+    try:
+        done, pending = wait(pending, timeout=delay)
+        for future in done:
+            if future.result():
+                return future.result()
+
+        # Slow or failed: race a duplicate on the next endpoint, first good response wins
+        pending.add(executor.submit(_request_chunk, hedge_endpoint, text_chunk, voice, discarded))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result():
+                    return future.result()
+        return None
+    finally:
+        # Whatever is still running lost the race
+        discarded.set()
+
+def _fetch_audio(
+    endpoint: Dict[str, str],
+    text: str,
+    voice: Voice,
+    hedge_endpoint: Optional[Dict[str, str]],
+    sink: BinaryIO
+) -> bool:
+    """Fetch audio data from an endpoint and write it to sink in order. Returns False on failure."""
     
-    # Initialize variables for endpoint validity and audio data
     text_chunks: List[str] = _split_text(text)
-    audio_chunks: List[str] = ["" for _ in range(len(text_chunks))]
-
-    # Function to generate audio for each text chunk
-    def generate_audio_chunk(index: int, text_chunk: str):
-        try:
-            response = requests.post(endpoint["url"], json={"text": text_chunk, "voice": voice.value})
-            response.raise_for_status()
-            audio_chunks[index] = response.json()[endpoint["response"]]
-        except (requests.RequestException, KeyError):
-            return
-
-    # Start threads for generating audio for each chunk
-    threads = [Thread(target=generate_audio_chunk, args=(i, chunk)) for i, chunk in enumerate(text_chunks)]
-    for thread in threads:
-        thread.start()
-
-    for thread in threads:
-        thread.join()
-
-    if any(not chunk for chunk in audio_chunks):
-        return None
+    writer = _OrderedWriter(sink)
+
+    # Chunks share the endpoint's bounded worker pool instead of one thread each
+    executor = _get_chunk_executor(endpoint["url"])
+    futures = {executor.submit(_fetch_chunk, endpoint, hedge_endpoint, chunk, voice): index for index, chunk in enumerate(text_chunks)}
 
-    # Concatenate and decode audio data from all chunks
-    return base64.b64decode("".join(audio_chunks))
+    try:
+        for future in as_completed(futures):
+            audio_chunk: Optional[bytes] = future.result()
+            # Fail fast: one missing chunk makes the whole endpoint attempt useless
+            if not audio_chunk:
+                return False
+            writer.add(futures[future], audio_chunk)
+    finally:
+        # Drop chunks that have not started yet (a no-op when everything finished)
+        for future in futures:
+            future.cancel()
+
+    return True
 
 def _load_endpoints() -> List[Dict[str, str]]:
     """Load endpoint configurations from a JSON file."""
@@ -108,27 +344,80 @@ def _validate_args(text: str, voice: Voice):
     if not text:
         raise ValueError("text must not be empty")
 
+# Byte limit of the text sent in one request
+CHUNK_BYTE_LIMIT: int = 300
+_PUNCTUATION_SPLIT = re.compile(r'.*?[.,!?:;-]|.+')
+_SPACE_SPLIT = re.compile(r'.*?[ ]|.+')
+
 def _split_text(text: str) -> List[str]:
-    """Split text into chunks of 300 characters or less."""
+    """Split text into balanced chunks of 300 bytes (UTF-8) or less.
+
+    Text is cut after punctuation marks, then at spaces for pieces that are
+    still too long (and at character boundaries for single huge words). The
+    pieces are packed into as few chunks as greedy packing would use, with
+    sizes as equal as those chunks allow so no single chunk dominates the
+    parallel latency. Each chunk boundary is found by bisecting the running
+    byte counts, so the packing costs per chunk rather than per piece.
+    """
     
-    # Split text into chunks based on punctuation marks
+    character_limit: int = CHUNK_BYTE_LIMIT
+    pieces: List[str] = []
+
+    # Split text into pieces based on punctuation marks
+    for piece in _PUNCTUATION_SPLIT.findall(text):
+        if len(piece) * 4 <= character_limit or len(piece.encode("utf-8")) <= character_limit:
+            pieces.append(piece)
+            continue
+
+        # Further split any piece longer than the limit at spaces
+        words: List[str] = _SPACE_SPLIT.findall(piece)
+        # No UTF-8 character takes more than 4 bytes, so short words need no measuring
+        if max(map(len, words)) * 4 <= character_limit:
+            pieces.extend(words)
+            continue
+        for word in words:
+            if len(word.encode("utf-8")) <= character_limit:
+                pieces.append(word)
+                continue
+            # A single word over the limit is cut at character boundaries
+            start: int = 0
+            part_size: int = 0
+            for position, char in enumerate(word):
+                char_size: int = len(char.encode("utf-8"))
+                if part_size + char_size > character_limit:
+                    pieces.append(word[start:position])
+                    start, part_size = position, 0
+                part_size += char_size
+            pieces.append(word[start:])
+
+    if not pieces:
+        return [text]
+
+    # offsets[i] is the byte count of pieces[:i]
+    offsets: List[int] = list(accumulate(map(len, map(str.encode, pieces)), initial=0))
+    count: int = len(pieces)
+
+    # Greedy packing from the end is optimal: suffix_starts[m] is the first
+    # piece of the last m chunks, so pieces[j:] fit in m chunks iff j >= suffix_starts[m]
+    suffix_starts: List[int] = [count]
+    while suffix_starts[-1] > 0:
+        end: int = suffix_starts[-1]
+        suffix_starts.append(bisect_left(offsets, offsets[end] - character_limit, 0, end))
+    total_chunks: int = len(suffix_starts) - 1
+
+    # Each chunk ends at the boundary closest to an equal share of the bytes
+    # still left, but no earlier than the rest can still fit in the remaining
+    # chunks, so the result never has more chunks (requests) than greedy packing
     merged_chunks: List[str] = []
-    separated_chunks: List[str] = re.findall(r'.*?[.,!?:;-]|.+', text)
-    character_limit: int = 300
-    # Further split any chunks longer than 300 characters
-    for i, chunk in enumerate(separated_chunks):
-        if len(chunk.encode("utf-8")) > character_limit:
-            separated_chunks[i:i+1] = re.findall(r'.*?[ ]|.+', chunk) 
-
-    # Combine chunks into segments of 300 characters or less
-    current_chunk: str = ""
-    for separated_chunk in separated_chunks:
-        if len(current_chunk.encode("utf-8")) + len(separated_chunk.encode("utf-8")) <= character_limit:
-            current_chunk += separated_chunk
-        else:
-            merged_chunks.append(current_chunk)
-            current_chunk = separated_chunk
-
-    # Append the last chunk
-    merged_chunks.append(current_chunk)
+    start_index: int = 0
+    for remaining in range(total_chunks, 0, -1):
+        base: int = offsets[start_index]
+        target: float = base + (offsets[count] - base) / remaining
+        last: int = bisect_right(offsets, base + character_limit, start_index, count + 1) - 1
+        end_index: int = bisect_left(offsets, target, start_index + 1, last)
+        if end_index > start_index + 1 and target - offsets[end_index - 1] < offsets[end_index] - target:
+            end_index -= 1
+        end_index = max(end_index, suffix_starts[remaining - 1])
+        merged_chunks.append("".join(pieces[start_index:end_index]))
+        start_index = end_index
     return merged_chunks
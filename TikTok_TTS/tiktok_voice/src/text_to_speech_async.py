@@ -0,0 +1,158 @@
+# Python standard modules
+import asyncio
+import base64
+import time
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+# Downloaded modules
+import aiohttp
+
+# Local files
+from . import text_to_speech as _sync
+from .voice import Voice
+from .endpoint_health import get_health, rank_endpoints
+
+def create_async_session(limit_per_host: Optional[int] = None) -> aiohttp.ClientSession:
+    """Create an aiohttp session configured like the shared sync pools.
+
+    Reuse one session across many tts_async() calls to keep connections
+    alive; the caller is responsible for closing it.
+    """
+    connect_timeout, read_timeout = _sync._timeout
+    connector = aiohttp.TCPConnector(limit=0, limit_per_host=limit_per_host or _sync._pool_size)
+    timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+async def tts_async(
+    text: str,
+    voice: Voice,
+    output_file_path: Optional[str] = "output.mp3",
+    session: Optional[aiohttp.ClientSession] = None
+) -> Optional[bytes]:
+    """Async counterpart of tts(): chunks are fetched as coroutines instead of threads.
+
+    Endpoints are tried in the same health-ranked order as tts() and audio
+    is written chunk by chunk in the same way. With output_file_path=None the
+    audio bytes are returned instead. Without a session a temporary one is
+    used for this call only.
+    """
+
+    # Validate input arguments
+    _sync._validate_args(text, voice)
+
+    if session is None:
+        async with create_async_session() as own_session:
+            return await tts_async(text, voice, output_file_path, own_session)
+
+    # Try the healthiest endpoints first; skip those whose circuit is open
+    ranked_endpoints: List[Dict[str, str]] = rank_endpoints(_sync._load_endpoints())
+
+    # Iterate over endpoints to find a working one
+    for index, endpoint in enumerate(ranked_endpoints):
+        hedge_endpoint = ranked_endpoints[index + 1] if index + 1 < len(ranked_endpoints) else None
+        sink: BinaryIO = _sync._open_sink(output_file_path)
+        success: bool = await _fetch_audio_async(session, endpoint, text, voice, hedge_endpoint, sink)
+        audio_bytes: Optional[bytes] = _sync._close_sink(sink, output_file_path, success)
+
+        if success:
+            return audio_bytes
+
+    raise Exception("failed to generate audio")
+
+async def _request_chunk_async(
+    session: aiohttp.ClientSession,
+    endpoint: Dict[str, str],
+    text_chunk: str,
+    voice: Voice
+) -> Optional[bytes]:
+    """Request and decode one chunk from an endpoint, recording the outcome in its health stats."""
+    health = get_health(endpoint["url"])
+    limiter = _sync._get_limiter(endpoint["url"])
+    if limiter is not None:
+        await limiter.acquire_async()
+    audio_chunk: Optional[bytes] = None
+    throttled: bool = False
+    success: Optional[bool] = None # Stays None if the request is cancelled
+    started: float = time.monotonic()
+    try:
+        async with session.post(endpoint["url"], json={"text": text_chunk, "voice": voice.value}) as response:
+            throttled = response.status == 429
+            response.raise_for_status()
+            # Each chunk is a complete base64 string, so it is decoded on its own
+            audio_chunk = base64.b64decode((await response.json(content_type=None))[endpoint["response"]] or "")
+        success = bool(audio_chunk)
+    except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, ValueError, TypeError):
+        success = False
+    finally:
+        latency: float = time.monotonic() - started
+        if limiter is not None:
+            limiter.release(success, latency, throttled)
+
+    if not success:
+        health.record_failure()
+        return None
+    health.record_success(latency)
+    return audio_chunk
+
+async def _fetch_chunk_async(
+    session: aiohttp.ClientSession,
+    endpoint: Dict[str, str],
+    hedge_endpoint: Optional[Dict[str, str]],
+    text_chunk: str,
+    voice: Voice
+) -> Optional[bytes]:
+    """Fetch one chunk, hedging to hedge_endpoint like the sync client does."""
+    if not _sync._hedge_enabled or hedge_endpoint is None:
+        return await _request_chunk_async(session, endpoint, text_chunk, voice)
+
+    delay: float = max(_sync._hedge_min_delay, get_health(endpoint["url"]).latency_percentile(_sync._hedge_percentile) or 0.0)
+    pending = {asyncio.ensure_future(_request_chunk_async(session, endpoint, text_chunk, voice))}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        for task in done:
+            if task.result():
+                return task.result()
+
+        # Slow or failed: race a duplicate on the next endpoint, first good response wins
+        pending.add(asyncio.ensure_future(_request_chunk_async(session, hedge_endpoint, text_chunk, voice)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.result():
+                    return task.result()
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def _fetch_audio_async(
+    session: aiohttp.ClientSession,
+    endpoint: Dict[str, str],
+    text: str,
+    voice: Voice,
+    hedge_endpoint: Optional[Dict[str, str]],
+    sink: BinaryIO
+) -> bool:
+    """Fetch every chunk of text from an endpoint concurrently and write the audio to sink in order."""
+    text_chunks: List[str] = _sync._split_text(text)
+    writer = _sync._OrderedWriter(sink)
+    # Bound the chunks in flight like the sync worker pool does
+    semaphore = asyncio.Semaphore(_sync._max_parallel_chunks)
+
+    async def fetch(index: int, text_chunk: str) -> Tuple[int, Optional[bytes]]:
+        async with semaphore:
+            return index, await _fetch_chunk_async(session, endpoint, hedge_endpoint, text_chunk, voice)
+
+    tasks = [asyncio.ensure_future(fetch(index, chunk)) for index, chunk in enumerate(text_chunks)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, audio_chunk = await next_done
+            # Fail fast: one missing chunk makes the whole endpoint attempt useless
+            if not audio_chunk:
+                return False
+            writer.add(index, audio_chunk)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return True
@@ -114,8 +114,5 @@ class Voice(Enum):
     # Function to check if a string matches any enum member name
     @staticmethod
     def from_string(input_string: str):
-        # Iterate over all enum members
-        for voice in Voice:
-            if voice.name == input_string:
-                return voice
-        return None
+        # Dict lookup on the member names instead of scanning every member
+        return Voice.__members__.get(input_string)
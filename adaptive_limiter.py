@@ -0,0 +1,221 @@
+# adaptive_limiter.py
+
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+
+from metrics import contar, registrar_coletor
+
+# --- Configuração (pode ser sobrescrita por variáveis de ambiente) ---
+# Janela inicial e máxima de requisições simultâneas por provedor (no TikTok, por endpoint)
+LIMITES_PADRAO = {
+    "edge": (int(os.environ.get("QUICKTTS_LIMITE_EDGE_INICIAL", "8")), int(os.environ.get("QUICKTTS_LIMITE_EDGE_MAX", "32"))),
+    "tiktok": (int(os.environ.get("QUICKTTS_LIMITE_TIKTOK_INICIAL", "4")), int(os.environ.get("QUICKTTS_LIMITE_TIKTOK_MAX", "32"))),
+}
+# Espera entre tentativas: exponencial a partir de RETENTATIVA_BASE_S, limitada a RETENTATIVA_MAX_S
+RETENTATIVA_BASE_S = 0.5
+RETENTATIVA_MAX_S = 8.0
+
+
+def espera_retentativa(tentativa, base=RETENTATIVA_BASE_S, maximo=RETENTATIVA_MAX_S):
+    """Segundos de espera antes da tentativa seguinte à 'tentativa' (0, 1, ...), com jitter para as retentativas não saírem juntas."""
+    return min(maximo, base * 2 ** tentativa) * random.uniform(0.5, 1.0)
+
+
+class _Espera:
+    """Uma requisição esperando vaga; entregar() é chamado com a trava do limitador."""
+
+    def __init__(self, acordar):
+        self._acordar = acordar
+        self.entregue = False
+        self.cancelada = False
+
+    def entregar(self):
+        if self.cancelada:
+            return False
+        try:
+            self._acordar()
+        except RuntimeError: # Loop de eventos de quem esperava já foi fechado
+            return False
+        self.entregue = True
+        return True
+
+
+class _Vaga:
+    """Context manager de uma requisição: ocupa uma vaga e, ao sair, informa o resultado ao limitador."""
+
+    def __init__(self, limitador):
+        self._limitador = limitador
+        self._falhou = False
+        self._estrangulado = False
+        self._latencia_s = None
+        self._inicio = None
+
+    def falhou(self, estrangulado=False):
+        """Marca a requisição como falha (estrangulado=True para 429 / limite de taxa) sem lançar exceção."""
+        self._falhou = True
+        self._estrangulado = self._estrangulado or estrangulado
+
+    def latencia(self, segundos):
+        """Usa esta latência no lugar do tempo total do bloco (ex.: tempo até o primeiro byte)."""
+        self._latencia_s = segundos
+
+    def _sair(self, exc):
+        if isinstance(exc, asyncio.CancelledError):
+            self._limitador.release(None)
+            return
+        if exc is not None:
+            self._falhou = True
+            self._estrangulado = self._estrangulado or getattr(exc, "status", None) == 429
+        latencia = self._latencia_s if self._latencia_s is not None else time.monotonic() - self._inicio
+        self._limitador.release(not self._falhou, latencia, self._estrangulado)
+
+    def __enter__(self):
+        self._limitador.acquire()
+        self._inicio = time.monotonic()
+        return self
+
+    def __exit__(self, tipo, exc, tb):
+        self._sair(exc)
+
+    async def __aenter__(self):
+        await self._limitador.acquire_async()
+        self._inicio = time.monotonic()
+        return self
+
+    async def __aexit__(self, tipo, exc, tb):
+        self._sair(exc)
+
+
+class LimitadorAIMD:
+    """
+    Limite adaptativo de requisições simultâneas (AIMD, como o controle de congestionamento do TCP).
+
+    Enquanto as respostas chegam bem e a janela está cheia, ela cresce cerca de 1 vaga por rodada
+    (+1/limite a cada sucesso). Um erro, um 429 ou uma latência muito acima da normal corta a janela
+    pela metade, no máximo uma vez por rodada, para uma rajada de falhas simultâneas não zerá-la.
+
+    É seguro entre threads e entre loops de eventos (cada requisição da interface roda o seu próprio
+    asyncio.run), então uma única instância por provedor/endpoint é compartilhada pelo processo.
+    A interface acquire/acquire_async/release é a que a biblioteca TikTok espera em configure_limiter.
+    """
+
+    def __init__(self, nome, inicial=4, minimo=1, maximo=32, fator_corte=0.5, fator_pico=3.0, suavizacao=0.1):
+        self.nome = nome
+        self.minimo = minimo
+        self.maximo = maximo
+        self.fator_corte = fator_corte
+        self.fator_pico = fator_pico
+        self.suavizacao = suavizacao
+        self.limite = float(min(max(inicial, minimo), maximo))
+        self.em_andamento = 0
+        self.cortes = 0
+        self._latencia_base = None # Média móvel exponencial das latências
+        self._amostras = 0
+        self._ultimo_corte = 0.0
+        self._esperando = deque()
+        self._lock = threading.Lock()
+
+    def _tem_vaga(self):
+        return self.em_andamento < int(self.limite)
+
+    def _distribuir(self):
+        # Entrega as vagas livres, na ordem de chegada; chamado com a trava
+        while self._esperando and self._tem_vaga():
+            if self._esperando.popleft().entregar():
+                self.em_andamento += 1
+
+    def acquire(self):
+        """Ocupa uma vaga, bloqueando a thread até haver uma."""
+        with self._lock:
+            if not self._esperando and self._tem_vaga():
+                self.em_andamento += 1
+                return
+            evento = threading.Event()
+            self._esperando.append(_Espera(evento.set))
+        evento.wait()
+
+    async def acquire_async(self):
+        """Ocupa uma vaga sem bloquear o loop de eventos."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._esperando and self._tem_vaga():
+                self.em_andamento += 1
+                return
+            futuro = loop.create_future()
+            espera = _Espera(lambda: loop.call_soon_threadsafe(lambda: futuro.done() or futuro.set_result(None)))
+            self._esperando.append(espera)
+        try:
+            await futuro
+        except asyncio.CancelledError:
+            with self._lock:
+                if espera.entregue:
+                    # A vaga chegou junto com o cancelamento: devolve para o próximo
+                    self.em_andamento -= 1
+                    self._distribuir()
+                else:
+                    espera.cancelada = True
+            raise
+
+    def release(self, success, latency=None, throttled=False):
+        """
+        Libera a vaga e ajusta a janela. success=None só libera (ex.: requisição cancelada por um hedge),
+        sem contar como sucesso nem como falha.
+        """
+        with self._lock:
+            self.em_andamento -= 1
+            if success is not None:
+                self._ajustar(success, latency, throttled)
+            self._distribuir()
+
+    def _ajustar(self, sucesso, latencia, estrangulado):
+        pico = (
+            sucesso and latencia is not None and self._latencia_base is not None
+            and self._amostras >= 10 and latencia > self.fator_pico * self._latencia_base
+        )
+        if sucesso and latencia is not None:
+            self._latencia_base = latencia if self._latencia_base is None else (1 - self.suavizacao) * self._latencia_base + self.suavizacao * latencia
+            self._amostras += 1
+
+        if not sucesso or estrangulado or pico:
+            agora = time.monotonic()
+            # Uma "rodada" é a latência típica: falhas dentro dela vêm da mesma janela e contam como um corte só
+            if agora - self._ultimo_corte >= max(self._latencia_base or 0.0, 0.5):
+                self.limite = max(float(self.minimo), self.limite * self.fator_corte)
+                self._ultimo_corte = agora
+                self.cortes += 1
+                contar("limitador_cortes", limitador=self.nome, motivo="429" if estrangulado else ("latencia" if pico else "erro"))
+        elif self.em_andamento + 1 >= int(self.limite):
+            # Só cresce se a janela estava cheia; vagas ociosas não dizem nada sobre a capacidade
+            self.limite = min(float(self.maximo), self.limite + 1.0 / self.limite)
+
+    def vaga(self):
+        """Uma requisição limitada: with limitador.vaga() as vaga (threads) ou async with (corrotinas)."""
+        return _Vaga(self)
+
+
+_limitadores = {}
+_limitadores_lock = threading.Lock()
+
+def get_limitador(provedor, endpoint=None):
+    """Limitador compartilhado de um provedor (ou de um endpoint dele), criado no primeiro uso."""
+    chave = (provedor, endpoint)
+    with _limitadores_lock:
+        limitador = _limitadores.get(chave)
+        if limitador is None:
+            inicial, maximo = LIMITES_PADRAO.get(provedor, (4, 32))
+            limitador = LimitadorAIMD(f"{provedor}:{endpoint}" if endpoint else provedor, inicial=inicial, maximo=maximo)
+            _limitadores[chave] = limitador
+        return limitador
+
+def _metricas_limitadores():
+    with _limitadores_lock:
+        limitadores = list(_limitadores.values())
+    for limitador in limitadores:
+        yield "limitador_janela", "gauge", {"limitador": limitador.nome}, round(limitador.limite, 2)
+        yield "limitador_em_andamento", "gauge", {"limitador": limitador.nome}, limitador.em_andamento
+
+registrar_coletor(_metricas_limitadores)
@@ -1,24 +1,60 @@
 # app.py
 
 import gradio as gr
-from get_voices import get_voices
+import importlib.util
 from header import badges, description
+from voice_registry import get_registro, load_voices, get_voice_options
+from job_workspace import novo_espaco
 import os
 from pathlib import Path
 
-# --- Imports from our new modules ---
-from utils import listar_audios, tocar_audio
-from edgeTTS import (
-    load_voices, get_voice_options, controlador_generate_audio,
-    controlador_generate_audio_from_file, controlador_process_srt_file
-)
-from tiktokTTS import (
-    TIKTOK_TTS_AVAILABLE, TIKTOK_VOICES_CATEGORIZED, get_tiktok_voice_options, 
-    controlador_generate_audio_tiktok, controlador_process_srt_file_tiktok
+# --- Módulos carregados sob demanda ---
+# Os provedores e o processamento de áudio (pydub, numpy, edge-tts, biblioteca TikTok) só são
+# importados na primeira requisição que precisar deles; a interface sobe só com o gradio e o catálogo.
+TIKTOK_TTS_AVAILABLE = (
+    (Path(__file__).parent / "TikTok_TTS" / "tiktok_voice").is_dir()
+    and all(importlib.util.find_spec(modulo) is not None for modulo in ("requests", "aiohttp"))
 )
 
+def get_tiktok_voice_options(language):
+    return get_registro().vozes_tiktok(language)
+
+def controlador_generate_audio(*args, **kwargs):
+    import edgeTTS
+    return edgeTTS.controlador_generate_audio(*args, **kwargs)
+
+def controlador_generate_audio_from_file(*args, **kwargs):
+    import edgeTTS
+    return edgeTTS.controlador_generate_audio_from_file(*args, **kwargs)
+
+def controlador_process_srt_file(*args, **kwargs):
+    import edgeTTS
+    return edgeTTS.controlador_process_srt_file(*args, **kwargs)
+
+def controlador_generate_audio_tiktok(*args, **kwargs):
+    import tiktokTTS
+    return tiktokTTS.controlador_generate_audio_tiktok(*args, **kwargs)
+
+def controlador_process_srt_file_tiktok(*args, **kwargs):
+    import tiktokTTS
+    return tiktokTTS.controlador_process_srt_file_tiktok(*args, **kwargs)
+
+def listar_audios():
+    import utils
+    return utils.listar_audios()
+
+def tocar_audio(arquivo):
+    import utils
+    return utils.tocar_audio(arquivo)
+
 # --- Global Settings ---
 srt_temp_deleta = True 
+# Cada requisição grava numa pasta própria (output/jobs/<id>), então várias podem rodar ao mesmo tempo.
+# Limites de requisições simultâneas por aba (variáveis de ambiente sobrescrevem os padrões)
+CONCORRENCIA_PADRAO = int(os.environ.get("QUICKTTS_CONCORRENCIA", "4"))
+CONCORRENCIA_TTS = int(os.environ.get("QUICKTTS_CONCORRENCIA_TTS", str(CONCORRENCIA_PADRAO)))
+CONCORRENCIA_LOTE = int(os.environ.get("QUICKTTS_CONCORRENCIA_LOTE", "2"))
+CONCORRENCIA_SRT = int(os.environ.get("QUICKTTS_CONCORRENCIA_SRT", "2"))
 
 def load_samples(sample_dir="samples"):
     """
@@ -45,8 +81,8 @@ def load_samples(sample_dir="samples"):
     return examples
     
 # --- UI Helper Functions ---
-def update_edge_voice_options(language, voices_data):
-    voice_options = get_voice_options(language, voices_data)
+def update_edge_voice_options(language):
+    voice_options = get_voice_options(language)
     if voice_options:
         return gr.update(choices=voice_options, value=voice_options[0], interactive=True)
     return gr.update(choices=[], value=None, interactive=False)
@@ -57,10 +93,12 @@ def update_tiktok_voice_options(language):
 
 def update_voices_and_refresh():
     print("Iniciando a atualização da lista de vozes...")
-    get_voices()
-    voices_data = load_voices()
-    available_languages = list(voices_data.keys())
-    initial_voices = get_voice_options(available_languages[0], voices_data) if available_languages else []
+    # A atualização roda em segundo plano; se demorar, a lista atual continua valendo
+    registro = get_registro()
+    if not registro.atualizar(esperar=15):
+        print("A atualização continua em segundo plano; clique de novo mais tarde para ver a lista nova.")
+    available_languages = registro.idiomas()
+    initial_voices = get_voice_options(available_languages[0]) if available_languages else []
     return (
         gr.update(choices=available_languages, value=available_languages[0] if available_languages else None),
         gr.update(choices=initial_voices, value=initial_voices[0] if initial_voices else None)
@@ -73,7 +111,7 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="green", secondary_hue="blue"
     
     edge_voices_data = load_voices()
     edge_available_languages = list(edge_voices_data.keys())
-    tiktok_available_categories = list(TIKTOK_VOICES_CATEGORIZED.keys())
+    tiktok_available_categories = get_registro().categorias_tiktok()
 
     with gr.Tabs():
         with gr.TabItem("TTS"):
@@ -111,7 +149,7 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="green", secondary_hue="blue"
             update_voices_btn = gr.Button(value="Atualizar Lista de Vozes (Edge-TTS)")
 
             # --- Event Handlers for TTS Tab ---
-            language_input.change(fn=lambda lang: update_edge_voice_options(lang, edge_voices_data), inputs=language_input, outputs=voice_model_input)
+            language_input.change(fn=update_edge_voice_options, inputs=language_input, outputs=voice_model_input)
             tiktok_category_input.change(fn=update_tiktok_voice_options, inputs=tiktok_category_input, outputs=tiktok_voice_model_input)
             update_voices_btn.click(fn=update_voices_and_refresh, inputs=[], outputs=[language_input, voice_model_input])
             
@@ -121,10 +159,11 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="green", secondary_hue="blue"
 
             # MODIFICADO: Função principal agora aceita o novo checkbox
             def gerar_audio_principal(provider, edge_text, edge_voice, speed, pitch, vol, cut_silence, tiktok_voice, tiktok_text, tiktok_cut_silence):
+                espaco = novo_espaco()
                 if provider == "Edge-TTS":
-                    return controlador_generate_audio(edge_text, edge_voice, speed, pitch, vol, cut_silence)
+                    return controlador_generate_audio(edge_text, edge_voice, speed, pitch, vol, cut_silence, output_file=str(espaco / "new_audio.mp3"))
                 else:
-                    return controlador_generate_audio_tiktok(tiktok_voice, tiktok_text, None, tiktok_cut_silence)
+                    return controlador_generate_audio_tiktok(tiktok_voice, tiktok_text, None, tiktok_cut_silence, output_file=str(espaco / "tiktok_audio.mp3"))
             
             # MODIFICADO: Lista de inputs do botão foi atualizada
             gerar_button.click(
@@ -133,7 +172,8 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="green", secondary_hue="blue"
                     provider_choice, audio_input, voice_model_input, speed_input, pitch_input, volume_input, checkbox_cortar_silencio, 
                     tiktok_voice_model_input, tiktok_audio_input, checkbox_cortar_silencio_tiktok
                 ], 
-                outputs=audio_output
+                outputs=audio_output,
+                concurrency_limit=CONCORRENCIA_TTS, concurrency_id="tts"
             )
 
         with gr.TabItem("Lote (Arquivo txt)"):
@@ -166,16 +206,17 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="green", secondary_hue="blue"
                 clear_button_file = gr.ClearButton(file_input, value='Limpar')
 
             # --- Event Handlers for Lote Tab ---
-            language_input_file.change(fn=lambda lang: update_edge_voice_options(lang, edge_voices_data), inputs=language_input_file, outputs=voice_model_input_file)
+            language_input_file.change(fn=update_edge_voice_options, inputs=language_input_file, outputs=voice_model_input_file)
             tiktok_category_input_file.change(fn=update_tiktok_voice_options, inputs=tiktok_category_input_file, outputs=tiktok_voice_model_input_file)
             provider_choice_file.change(fn=switch_provider_ui, inputs=provider_choice_file, outputs=[edge_tts_ui_file, tiktok_tts_ui_file])
             
             # MODIFICADO: Função principal agora aceita o novo checkbox
             def gerar_audio_lote_principal(provider, file, edge_voice, speed, pitch, vol, cut_silence, tiktok_voice, tiktok_cut_silence):
+                espaco = novo_espaco()
                 if provider == "Edge-TTS":
-                    return controlador_generate_audio_from_file(file, edge_voice, speed, pitch, vol, cut_silence)
+                    return controlador_generate_audio_from_file(file, edge_voice, speed, pitch, vol, cut_silence, output_file=str(espaco / "new_audio.mp3"))
                 else:
-                    return controlador_generate_audio_tiktok(tiktok_voice, None, file, tiktok_cut_silence)
+                    return controlador_generate_audio_tiktok(tiktok_voice, None, file, tiktok_cut_silence, output_file=str(espaco / "tiktok_audio.mp3"))
             
             # MODIFICADO: Lista de inputs do botão foi atualizada
             gerar_button_file.click(
@@ -184,7 +225,8 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="green", secondary_hue="blue"
                     provider_choice_file, file_input, voice_model_input_file, speed_input_file, pitch_input_file, volume_input_file, checkbox_cortar_silencio_file, 
                     tiktok_voice_model_input_file, checkbox_cortar_silencio_tiktok_file
                 ], 
-                outputs=audio_output_file
+                outputs=audio_output_file,
+                concurrency_limit=CONCORRENCIA_LOTE, concurrency_id="lote"
             )
 
         with gr.TabItem("Ler .SRT"):
@@ -217,6 +259,14 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="green", secondary_hue="blue"
 
                     # --- Componentes Comuns ---
                     srt_input = gr.File(label="Arquivo SRT", file_types=[".srt"], type="filepath")
+                    motor_ajuste_srt = gr.Radio(
+                        choices=[("FFmpeg (atempo)", "ffmpeg"), ("NumPy (WSOLA, mais rápido em SRTs longos)", "numpy")],
+                        value=os.environ.get("QUICKTTS_MOTOR_AJUSTE", "ffmpeg"), label="Ajuste de velocidade"
+                    )
+                    montagem_srt = gr.Radio(
+                        choices=[("Legenda por legenda", "montador"), ("FFmpeg em passada única (filter_complex)", "ffmpeg")],
+                        value=os.environ.get("QUICKTTS_MONTAGEM", "montador"), label="Montagem"
+                    )
                     audio_output_srt = gr.Audio(label="Resultado", type="filepath", interactive=False, show_download_button=True)
                     progress_bar_srt = gr.Progress(track_tqdm=True)
                     # --- ADICIONADO: Componente de Exemplos ---
@@ -238,31 +288,35 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="green", secondary_hue="blue"
                         return gr.update(visible=provider == "Edge-TTS"), gr.update(visible=provider == "TikTok")
                     
                     provider_choice_srt.change(fn=switch_provider_ui_srt, inputs=provider_choice_srt, outputs=[edge_tts_ui_srt, tiktok_tts_ui_srt])
-                    language_input_srt.change(fn=lambda lang: update_edge_voice_options(lang, edge_voices_data), inputs=language_input_srt, outputs=voice_model_input_srt)
+                    language_input_srt.change(fn=update_edge_voice_options, inputs=language_input_srt, outputs=voice_model_input_srt)
                     tiktok_category_input_srt.change(fn=update_tiktok_voice_options, inputs=tiktok_category_input_srt, outputs=tiktok_voice_model_input_srt)
 
-                    def controlador_srt_principal(provider, srt_file, edge_voice, pitch, volume, tiktok_voice, progress=gr.Progress(track_tqdm=True)):
+                    def controlador_srt_principal(provider, srt_file, edge_voice, pitch, volume, tiktok_voice, motor_ajuste, montagem, progress=gr.Progress(track_tqdm=True)):
                         """
                         Função roteadora que recebe o rastreador de progresso do Gradio
                         e o passa para os controladores específicos do provedor.
                         """
+                        # Pasta temporária exclusiva e nome final único, para SRTs com o mesmo nome não se sobrescreverem
+                        espaco = novo_espaco()
+                        output_file = f"output/srt_output/{Path(srt_file.name).stem}_final_{espaco.name[:8]}.mp3" if srt_file else None
                         if provider == "Edge-TTS":
-                            audio_file = controlador_process_srt_file(srt_file, edge_voice, pitch, volume, srt_temp_deleta, progress=progress)
+                            audio_file = controlador_process_srt_file(srt_file, edge_voice, pitch, volume, srt_temp_deleta, progress=progress, output_dir=str(espaco / "srt_temp"), output_file=output_file, motor_ajuste=motor_ajuste, montagem=montagem)
                         else: # TikTok
-                            audio_file = controlador_process_srt_file_tiktok(srt_file, tiktok_voice, srt_temp_deleta, progress=progress)
+                            audio_file = controlador_process_srt_file_tiktok(srt_file, tiktok_voice, srt_temp_deleta, progress=progress, output_dir=str(espaco / "srt_temp"), output_file=output_file, motor_ajuste=motor_ajuste, montagem=montagem)
                         
                         return audio_file, gr.update(choices=listar_audios())
                     
                     # MODIFICADO: A chamada de clique permanece a mesma, o Gradio injeta o `progress` automaticamente
                     srt_button.click(
                         fn=controlador_srt_principal, 
-                        inputs=[provider_choice_srt, srt_input, voice_model_input_srt, pitch_input_srt, volume_input_srt, tiktok_voice_model_input_srt], 
+                        inputs=[provider_choice_srt, srt_input, voice_model_input_srt, pitch_input_srt, volume_input_srt, tiktok_voice_model_input_srt, motor_ajuste_srt, montagem_srt], 
                         outputs=[audio_output_srt, audio_list_target], 
-                        queue=True
+                        queue=True, concurrency_limit=CONCORRENCIA_SRT, concurrency_id="srt"
                     )
 
                 with gr.TabItem("Arquivos gerados"):
-                    audio_list = gr.Dropdown(label="Arquivos de áudio", choices=listar_audios(), interactive=True)
+                    # A lista é preenchida quando a página carrega, não na subida do app
+                    audio_list = gr.Dropdown(label="Arquivos de áudio", choices=[], interactive=True)
                     audio_list_target.change(lambda x: x, inputs=[audio_list_target], outputs=[audio_list])
                     play_button = gr.Button(value="Tocar")
                     refresh_button = gr.Button(value="Atualizar Lista")
@@ -274,6 +328,7 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="green", secondary_hue="blue"
                         return gr.update(choices=arquivos, value=None), "Lista atualizada."
                     
                     refresh_button.click(fn=update_audio_list, outputs=[audio_list, status_message], queue=True)
+                    iface.load(fn=update_audio_list, outputs=[audio_list, status_message])
                     play_button.click(fn=tocar_audio, inputs=[audio_list], outputs=[audio_player], queue=True)
         gr.Markdown("""
         <hr>
@@ -293,4 +348,9 @@ with gr.Blocks(theme=gr.themes.Default(primary_hue="green", secondary_hue="blue"
             </p>
         </div>
         """)
-    iface.launch()
\ No newline at end of file
+
+if __name__ == "__main__":
+    # /metrics (Prometheus) e /metrics.json numa porta separada; QUICKTTS_METRICAS_PORTA=0 desativa
+    from metrics import iniciar_servidor
+    iniciar_servidor()
+    iface.queue(default_concurrency_limit=CONCORRENCIA_PADRAO).launch()
\ No newline at end of file
@@ -0,0 +1,212 @@
+# batch.py
+"""
+Processamento em lote, sem interface, de muitos arquivos .srt e .txt.
+
+Uso:
+    python batch.py legendas/ --provedor edge --voz pt-BR-FranciscaNeural
+    python batch.py manifesto.json --processos 4
+
+A entrada é um diretório (todos os .srt e .txt dele) ou um manifesto JSON: uma lista de
+jobs, ou um objeto {"padroes": {...}, "jobs": [...]}. Cada job tem "arquivo" e pode
+sobrescrever provedor, voz, saida, velocidade, tom, volume, cortar_silencio, em_memoria, motor_ajuste e montagem.
+Os jobs rodam num pool de processos e o resumo (tempos e falhas por job) vai para um JSON.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+from pathlib import Path
+from datetime import datetime
+from collections import Counter
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from metrics import get_metricas
+
+EXTENSOES = (".srt", ".txt")
+VOZES_PADRAO = {"edge": "pt-BR-FranciscaNeural", "tiktok": "BR_FEMALE_1"}
+
+def executar_job(job):
+    """Roda um job (SRT ou txt) e retorna o resultado com tempo e erro. Executa dentro do processo do pool."""
+    inicio = time.perf_counter()
+    resultado = {"arquivo": job["arquivo"], "provedor": job["provedor"], "voz": job["voz"], "saida": job["saida"]}
+    # Cada processo do pool roda um job por vez, então as métricas zeradas aqui são só deste job
+    get_metricas().zerar()
+    try:
+        arquivo = Path(job["arquivo"])
+        saida = Path(job["saida"])
+        saida.parent.mkdir(parents=True, exist_ok=True)
+
+        if arquivo.suffix.lower() == ".srt":
+            audio = _executar_srt(job, arquivo, saida)
+        else:
+            audio = _executar_txt(job, arquivo, saida)
+
+        if not audio or not Path(audio).exists():
+            raise RuntimeError("nenhum áudio foi gerado (veja o log do job)")
+        resultado.update(status="ok", saida=str(audio))
+    except Exception as e:
+        resultado.update(status="erro", erro=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    resultado["tempo_s"] = round(time.perf_counter() - inicio, 3)
+    metricas = get_metricas().como_dict()
+    resultado["metricas"] = {"etapas": metricas["etapas"], "contadores": metricas["contadores"]}
+    return resultado
+
+def _executar_srt(job, arquivo, saida):
+    import asyncio
+    # Cada job tem sua própria pasta temporária e seu manifesto, para jobs com o mesmo nome não se misturarem
+    temp_dir = saida.parent / f".{saida.stem}_temp"
+    manifesto_dir = saida.parent / ".manifesto" / saida.stem
+    if job["provedor"] == "edge":
+        from edgeTTS import process_srt_file, extract_voice_name
+        return asyncio.run(process_srt_file(
+            str(arquivo), extract_voice_name(job["voz"]), str(temp_dir), job["tom"], job["volume"], True,
+            em_memoria=job["em_memoria"], output_file=str(saida), manifesto_dir=str(manifesto_dir), motor_ajuste=job["motor_ajuste"],
+            montagem=job["montagem"]
+        ))
+    from tiktokTTS import process_srt_file_tiktok
+    return asyncio.run(process_srt_file_tiktok(
+        str(arquivo), job["voz"], str(temp_dir), True, em_memoria=job["em_memoria"], output_file=str(saida), manifesto_dir=str(manifesto_dir),
+        motor_ajuste=job["motor_ajuste"], montagem=job["montagem"]
+    ))
+
+def _executar_txt(job, arquivo, saida):
+    # Os controladores esperam um objeto de arquivo no formato do Gradio (com .name)
+    arquivo_gradio = SimpleNamespace(name=str(arquivo))
+    if job["provedor"] == "edge":
+        from edgeTTS import controlador_generate_audio_from_file
+        return controlador_generate_audio_from_file(
+            arquivo_gradio, job["voz"], job["velocidade"], job["tom"], job["volume"], job["cortar_silencio"], output_file=str(saida)
+        )
+    from tiktokTTS import controlador_generate_audio_tiktok
+    return controlador_generate_audio_tiktok(job["voz"], None, arquivo_gradio, job["cortar_silencio"], output_file=str(saida))
+
+def montar_jobs(entrada, args):
+    """Lê o diretório ou o manifesto e devolve a lista de jobs com todos os campos preenchidos."""
+    entrada = Path(entrada)
+    padroes = {
+        "provedor": args.provedor,
+        "voz": args.voz,
+        "velocidade": args.velocidade,
+        "tom": args.tom,
+        "volume": args.volume,
+        "cortar_silencio": args.cortar_silencio,
+        "em_memoria": args.em_memoria,
+        "motor_ajuste": args.motor_ajuste,
+        "montagem": args.montagem,
+    }
+    saida_dir = Path(args.saida)
+
+    if entrada.is_dir():
+        padrao = "**/*" if args.recursivo else "*"
+        arquivos = sorted(p for p in entrada.glob(padrao) if p.is_file() and p.suffix.lower() in EXTENSOES)
+        brutos = [{"arquivo": str(p), "_relativo": p.relative_to(entrada)} for p in arquivos]
+        base_manifesto = entrada
+    else:
+        with open(entrada, "r", encoding="utf-8") as f:
+            manifesto = json.load(f)
+        if isinstance(manifesto, dict):
+            padroes.update(manifesto.get("padroes", {}))
+            manifesto = manifesto.get("jobs", [])
+        brutos = [dict(item) if isinstance(item, dict) else {"arquivo": item} for item in manifesto]
+        base_manifesto = entrada.parent
+
+    jobs = []
+    saidas_padrao = [] # (job, caminho relativo) dos jobs sem "saida" explícita
+    for bruto in brutos:
+        job = {**padroes, **{k: v for k, v in bruto.items() if not k.startswith("_")}}
+        arquivo = Path(job["arquivo"])
+        if not arquivo.is_absolute() and not arquivo.exists():
+            arquivo = base_manifesto / arquivo # Caminhos do manifesto são relativos a ele
+        job["arquivo"] = str(arquivo)
+        job["provedor"] = job["provedor"].lower()
+        if job["provedor"] not in VOZES_PADRAO:
+            raise ValueError(f"Provedor inválido em {arquivo}: {job['provedor']} (use 'edge' ou 'tiktok')")
+        job["voz"] = job.get("voz") or VOZES_PADRAO[job["provedor"]]
+        if not job.get("saida"):
+            relativo = bruto.get("_relativo") or Path(arquivo.name)
+            job["saida"] = str(saida_dir / relativo.with_suffix(".mp3"))
+            saidas_padrao.append((job, relativo))
+        jobs.append(job)
+
+    # ep1.srt e ep1.txt na mesma pasta iriam para o mesmo ep1.mp3 (e para a mesma pasta temporária e
+    # o mesmo manifesto): esses jobs mantêm a extensão de origem no nome, ep1.srt.mp3 e ep1.txt.mp3
+    contagem = Counter(os.path.normpath(job["saida"]) for job, _ in saidas_padrao)
+    for job, relativo in saidas_padrao:
+        if contagem[os.path.normpath(job["saida"])] > 1:
+            job["saida"] = str(saida_dir / relativo.with_name(f"{relativo.name}.mp3"))
+    repetidas = [saida for saida, n in Counter(os.path.normpath(job["saida"]) for job in jobs).items() if n > 1]
+    if repetidas:
+        raise ValueError(f"Mais de um job grava na mesma saída: {', '.join(repetidas)}. Defina uma 'saida' diferente para cada um.")
+    return jobs
+
+def main():
+    parser = argparse.ArgumentParser(description="QuickTTS em lote: gera áudio de vários .srt/.txt sem abrir a interface.")
+    parser.add_argument("entrada", help="diretório com arquivos .srt/.txt ou manifesto .json")
+    parser.add_argument("--provedor", choices=["edge", "tiktok"], default="edge")
+    parser.add_argument("--voz", help="voz padrão (ex.: pt-BR-FranciscaNeural ou BR_FEMALE_1)")
+    parser.add_argument("--saida", default=os.path.join("output", "batch"), help="pasta de saída dos áudios")
+    parser.add_argument("--resumo", help="arquivo JSON do resumo (padrão: <saida>/resumo.json)")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1, help="processos em paralelo (padrão: número de CPUs)")
+    parser.add_argument("--velocidade", type=int, default=0, help="velocidade em %% (só txt com Edge-TTS)")
+    parser.add_argument("--tom", type=int, default=0, help="tom em Hz (Edge-TTS)")
+    parser.add_argument("--volume", type=int, default=0, help="volume em %% (Edge-TTS)")
+    parser.add_argument("--cortar-silencio", action="store_true", help="remove silêncios dos áudios de txt")
+    parser.add_argument("--em-memoria", action="store_true", help="monta os SRT em memória, sem MP3 intermediários")
+    parser.add_argument("--motor-ajuste", choices=["ffmpeg", "numpy"], help="ajuste de velocidade das legendas: atempo do FFmpeg ou WSOLA em NumPy (padrão: QUICKTTS_MOTOR_AJUSTE ou ffmpeg)")
+    parser.add_argument("--montagem", choices=["montador", "ffmpeg"], help="montagem dos SRT: legendas ajustadas uma a uma e juntadas em NumPy, ou um único grafo filter_complex do FFmpeg (padrão: QUICKTTS_MONTAGEM ou montador)")
+    parser.add_argument("--recursivo", action="store_true", help="procura arquivos também nas subpastas")
+    parser.add_argument("--pular-existentes", action="store_true", help="não refaz jobs cuja saída já existe")
+    args = parser.parse_args()
+
+    jobs = montar_jobs(args.entrada, args)
+    pulados = []
+    if args.pular_existentes:
+        pulados = [job for job in jobs if Path(job["saida"]).exists()]
+        jobs = [job for job in jobs if not Path(job["saida"]).exists()]
+    if not jobs and not pulados:
+        print("Nenhum arquivo .srt ou .txt encontrado.")
+        sys.exit(1)
+
+    processos = max(1, min(args.processos, len(jobs) or 1))
+    print(f"{len(jobs)} jobs em {processos} processos ({len(pulados)} pulados).")
+    inicio = time.perf_counter()
+    iniciado_em = datetime.now().isoformat(timespec="seconds")
+    resultados = [{"arquivo": job["arquivo"], "saida": job["saida"], "status": "pulado", "tempo_s": 0.0} for job in pulados]
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = {executor.submit(executar_job, job): job for job in jobs}
+        for n, futuro in enumerate(as_completed(futuros), start=1):
+            job = futuros[futuro]
+            try:
+                resultado = futuro.result()
+            except Exception as e: # Ex.: o processo do pool morreu
+                resultado = {"arquivo": job["arquivo"], "saida": job["saida"], "status": "erro", "erro": f"{type(e).__name__}: {e}", "tempo_s": None}
+            resultados.append(resultado)
+            detalhe = f"{resultado['tempo_s']}s" if resultado["status"] == "ok" else resultado.get("erro")
+            print(f"[{n}/{len(jobs)}] {resultado['status'].upper()} {job['arquivo']} ({detalhe})")
+
+    falhas = [r for r in resultados if r["status"] == "erro"]
+    resumo = {
+        "iniciado_em": iniciado_em,
+        "duracao_s": round(time.perf_counter() - inicio, 3),
+        "processos": processos,
+        "total": len(resultados),
+        "ok": sum(1 for r in resultados if r["status"] == "ok"),
+        "pulados": len(pulados),
+        "falhas": len(falhas),
+        "jobs": sorted(resultados, key=lambda r: r["arquivo"]),
+    }
+    caminho_resumo = Path(args.resumo) if args.resumo else Path(args.saida) / "resumo.json"
+    caminho_resumo.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho_resumo, "w", encoding="utf-8") as f:
+        json.dump(resumo, f, ensure_ascii=False, indent=4)
+
+    print(f"\n{resumo['ok']} ok, {resumo['falhas']} falhas, {resumo['pulados']} pulados em {resumo['duracao_s']}s. Resumo em {caminho_resumo}")
+    sys.exit(1 if falhas else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/bench_split_text.py
+"""
+Benchmark do _split_text da biblioteca TikTok em entradas de vários MB.
+
+Compara a implementação atual (tamanho de cada peça medido uma vez e cortes por busca binária)
+com a versão antiga (re-codifica o chunk a cada iteração e faz splice na lista)
+e mostra o tempo e o equilíbrio dos tamanhos dos chunks.
+
+Uso:
+    python benchmarks/bench_split_text.py [--mb 1 4 8] [--sem-antigo]
+"""
+
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "TikTok_TTS"))
+from tiktok_voice.src.text_to_speech import _split_text
+
+def _split_text_antigo(text: str) -> List[str]:
+    """Implementação anterior, mantida aqui só como referência de desempenho."""
+    merged_chunks: List[str] = []
+    separated_chunks: List[str] = re.findall(r'.*?[.,!?:;-]|.+', text)
+    character_limit: int = 300
+    for i, chunk in enumerate(separated_chunks):
+        if len(chunk.encode("utf-8")) > character_limit:
+            separated_chunks[i:i+1] = re.findall(r'.*?[ ]|.+', chunk)
+
+    current_chunk: str = ""
+    for separated_chunk in separated_chunks:
+        if len(current_chunk.encode("utf-8")) + len(separated_chunk.encode("utf-8")) <= character_limit:
+            current_chunk += separated_chunk
+        else:
+            merged_chunks.append(current_chunk)
+            current_chunk = separated_chunk
+
+    merged_chunks.append(current_chunk)
+    return merged_chunks
+
+def gerar_texto(megabytes, seed=0):
+    """Gera texto com frases de tamanhos variados, acentos e trechos longos sem pontuação."""
+    rng = random.Random(seed)
+    palavras = ["tangerina", "laranja", "ação", "canção", "sincronização", "legenda", "áudio", "voz", "de", "a", "o"]
+    partes = []
+    tamanho = 0
+    while tamanho < megabytes * 1024 * 1024:
+        n = rng.choice([3, 8, 20, 60, 120]) # Frases longas forçam a quebra por espaços
+        frase = " ".join(rng.choice(palavras) for _ in range(n)) + rng.choice([". ", ", ", "! ", "? ", " "])
+        partes.append(frase)
+        tamanho += len(frase)
+    return "".join(partes)
+
+def medir(funcao, texto):
+    inicio = time.perf_counter()
+    chunks = funcao(texto)
+    duracao = time.perf_counter() - inicio
+    tamanhos = [len(c.encode("utf-8")) for c in chunks]
+    return duracao, len(chunks), statistics.mean(tamanhos), statistics.pstdev(tamanhos), max(tamanhos)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do _split_text")
+    parser.add_argument("--mb", type=float, nargs="+", default=[1, 4, 8], help="tamanhos de entrada em MB")
+    parser.add_argument("--sem-antigo", action="store_true", help="não roda a implementação antiga (lenta em entradas grandes)")
+    args = parser.parse_args()
+
+    print(f"{'entrada':>8} {'versão':>7} {'tempo (s)':>10} {'chunks':>8} {'média':>7} {'desvio':>7} {'máx':>5}")
+    for mb in args.mb:
+        texto = gerar_texto(mb)
+        versoes = [("atual", _split_text)]
+        if not args.sem_antigo:
+            versoes.append(("antiga", _split_text_antigo))
+        chunks = {}
+        for nome, funcao in versoes:
+            duracao, n, media, desvio, maximo = medir(funcao, texto)
+            chunks[nome] = n
+            print(f"{mb:>6}MB {nome:>7} {duracao:>10.3f} {n:>8} {media:>7.1f} {desvio:>7.1f} {maximo:>5}")
+        # Cada chunk é uma requisição: equilibrar os tamanhos não pode custar chunks a mais
+        if "antiga" in chunks and chunks["atual"] > chunks["antiga"]:
+            print(f"{'':>8} aviso: a versão atual gerou {chunks['atual'] - chunks['antiga']} chunks a mais que a antiga")
+
+if __name__ == "__main__":
+    main()
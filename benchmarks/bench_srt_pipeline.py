@@ -0,0 +1,235 @@
+# benchmarks/bench_srt_pipeline.py
+"""
+Benchmark ponta a ponta do pipeline de SRT (process_srt_file, process_srt_file_tiktok e a mesclagem)
+contra provedores falsos locais (ver mock_providers.py), sem tocar nos serviços reais.
+
+Cada cenário (provedor x número de legendas) roda num processo próprio, para o pico de RSS e o
+estado dos módulos (cache, saúde dos endpoints) não vazarem de um cenário para o outro.
+O cache de síntese e o manifesto incremental ficam desligados: toda legenda é sintetizada.
+
+Mostra legendas/s, tempo total, pico de RSS (do processo e dos filhos, ex.: FFmpeg) e o tempo
+por etapa (síntese, ajuste de velocidade, montagem). Com --baseline, compara com um JSON salvo
+por --json e falha se algum cenário ficar mais lento que a tolerância.
+
+Uso:
+    python benchmarks/bench_srt_pipeline.py --legendas 10 100 1000 --provedores edge tiktok
+    python benchmarks/bench_srt_pipeline.py --latencia-ms 300 --jitter-ms 100 --taxa-erro 0.05
+    python benchmarks/bench_srt_pipeline.py --json atual.json --baseline anterior.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_providers import ServidoresFalsos
+from srt_fixtures import TAMANHOS_PADRAO, gerar_srt
+
+# --- Execução de um cenário (processo filho) ---
+
+def _instrumentar(modulo, nome, etapa, tempos, falhas, vazio_e_falha=False):
+    """Troca modulo.nome por uma versão que soma o tempo gasto na etapa e conta as falhas."""
+    original = getattr(modulo, nome)
+
+    async def medido(*args, **kwargs):
+        inicio = time.perf_counter()
+        falhou = True
+        try:
+            resultado = await original(*args, **kwargs)
+            falhou = vazio_e_falha and not resultado
+            return resultado
+        finally:
+            tempos.setdefault(etapa, []).append(time.perf_counter() - inicio)
+            if falhou:
+                falhas[etapa] = falhas.get(etapa, 0) + 1
+
+    setattr(modulo, nome, medido)
+
+def executar_cenario(args):
+    import asyncio
+    import resource
+
+    # Antes de importar o pipeline: sem cache, sem barras de progresso
+    os.environ["QUICKTTS_CACHE"] = "0"
+    os.environ["TQDM_DISABLE"] = "1"
+    sys.path.insert(0, str(RAIZ))
+    sys.path.insert(0, str(RAIZ / "TikTok_TTS"))
+    import srt_manifest
+
+    tempos = {}
+    falhas = {}
+    _instrumentar(srt_manifest, "adjust_audio_speed", "ajuste", tempos, falhas)
+    _instrumentar(srt_manifest, "ajustar_velocidade_pcm", "ajuste", tempos, falhas)
+
+    with tempfile.TemporaryDirectory() as temp:
+        temp = Path(temp)
+        saida = temp / "final.mp3"
+        if args.provedor == "edge":
+            import edge_tts.communicate
+            edge_tts.communicate.WSS_URL = f"ws://127.0.0.1:{args.porta}/edge/v1?TrustedClientToken=falso"
+            import edgeTTS as pipeline
+            _instrumentar(pipeline, "sintetizar_edge_bytes", "sintese", tempos, falhas, vazio_e_falha=True)
+            processar = pipeline.process_srt_file(
+                args.srt, "pt-BR-FranciscaNeural", str(temp / "srt_temp"), 0, 0, True,
+                max_concorrencia=args.concorrencia or pipeline.SRT_MAX_CONCORRENCIA,
+                em_memoria=args.em_memoria, output_file=str(saida), incremental=False, motor_ajuste=args.motor_ajuste,
+                montagem=args.montagem
+            )
+        else:
+            # Mesmo caminho de import usado pelo tiktokTTS (senão seria outro objeto de módulo)
+            from TikTok_TTS.tiktok_voice.src import text_to_speech
+            text_to_speech._load_endpoints = lambda: [
+                {"url": f"http://127.0.0.1:{args.porta}/api/generation", "response": "data"},
+                {"url": f"http://127.0.0.1:{args.porta}/api/tiktok-tts", "response": "base64"},
+            ]
+            import tiktokTTS as pipeline
+            _instrumentar(pipeline, "tts_async", "sintese", tempos, falhas, vazio_e_falha=True)
+            processar = pipeline.process_srt_file_tiktok(
+                args.srt, "BR_FEMALE_1", str(temp / "srt_temp"), True,
+                max_concorrencia=args.concorrencia or pipeline.SRT_MAX_CONCORRENCIA_TIKTOK,
+                em_memoria=args.em_memoria, output_file=str(saida), incremental=False, motor_ajuste=args.motor_ajuste,
+                montagem=args.montagem
+            )
+        _instrumentar(pipeline, "merge_audio_files", "montagem", tempos, falhas)
+        _instrumentar(pipeline, "merge_audio_pcm", "montagem", tempos, falhas)
+        _instrumentar(pipeline, "merge_audio_ffmpeg", "montagem", tempos, falhas)
+
+        inicio = time.perf_counter()
+        final = asyncio.run(processar)
+        wall = time.perf_counter() - inicio
+        ok = bool(final) and Path(final).exists() and Path(final).stat().st_size > 0
+
+    uso = resource.getrusage(resource.RUSAGE_SELF)
+    uso_filhos = resource.getrusage(resource.RUSAGE_CHILDREN)
+    resultado = {
+        "provedor": args.provedor,
+        "legendas": args.legendas,
+        "ok": ok,
+        # Legendas que ficaram sem áudio mesmo após as tentativas (viraram silêncio no resultado)
+        "legendas_silenciadas": max(0, args.legendas - (len(tempos.get("sintese", [])) - falhas.get("sintese", 0))),
+        "wall_s": round(wall, 3),
+        "legendas_por_s": round(args.legendas / wall, 2) if wall > 0 else None,
+        # ru_maxrss está em KB no Linux
+        "pico_rss_mb": round(uso.ru_maxrss / 1024, 1),
+        "pico_rss_filhos_mb": round(uso_filhos.ru_maxrss / 1024, 1),
+        "cpu_s": round(uso.ru_utime + uso.ru_stime, 3),
+        "etapas": {
+            etapa: {"chamadas": len(duracoes), "falhas": falhas.get(etapa, 0), "soma_s": round(sum(duracoes), 3), "p50_ms": round(_quantil(duracoes, 0.5) * 1000, 1), "p95_ms": round(_quantil(duracoes, 0.95) * 1000, 1)}
+            for etapa, duracoes in tempos.items()
+        },
+    }
+    Path(args.resultado).write_text(json.dumps(resultado), encoding="utf-8")
+
+def _quantil(valores, q):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(q * (len(ordenados) - 1))))]
+
+# --- Orquestração (processo principal) ---
+
+def rodar_cenario(provedor, num_legendas, srt, porta, args):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        arquivo_resultado = f.name
+    comando = [
+        sys.executable, __file__, "--cenario", provedor, "--srt", str(srt), "--porta", str(porta),
+        "--num-legendas", str(num_legendas), "--resultado", arquivo_resultado, "--concorrencia", str(args.concorrencia),
+    ]
+    if args.em_memoria:
+        comando.append("--em-memoria")
+    comando += ["--motor-ajuste", args.motor_ajuste, "--montagem", args.montagem]
+    processo = subprocess.run(comando, cwd=RAIZ, capture_output=True, text=True)
+    try:
+        if processo.returncode != 0:
+            linhas = (processo.stderr or processo.stdout).strip().splitlines()
+            return {"provedor": provedor, "legendas": num_legendas, "ok": False, "erro": linhas[-1] if linhas else f"código {processo.returncode}"}
+        return json.loads(Path(arquivo_resultado).read_text(encoding="utf-8"))
+    finally:
+        os.remove(arquivo_resultado)
+
+def imprimir_tabela(resultados):
+    print(f"\n{'provedor':>8} {'legendas':>8} {'wall (s)':>9} {'leg/s':>8} {'RSS MB':>7} {'filhos MB':>9} {'síntese s':>9} {'ajuste s':>9} {'montagem s':>10}")
+    for r in resultados:
+        if not r.get("ok"):
+            print(f"{r['provedor']:>8} {r['legendas']:>8}  FALHOU: {r.get('erro', 'sem áudio final')}")
+            continue
+        if r.get("legendas_silenciadas"):
+            print(f"{'':>8} {'':>8}  aviso: {r['legendas_silenciadas']} legendas sem áudio após as tentativas")
+        etapas = r["etapas"]
+        soma = lambda etapa: etapas.get(etapa, {}).get("soma_s", 0.0)
+        print(f"{r['provedor']:>8} {r['legendas']:>8} {r['wall_s']:>9.2f} {r['legendas_por_s']:>8.1f} {r['pico_rss_mb']:>7.1f} {r['pico_rss_filhos_mb']:>9.1f} "
+              f"{soma('sintese'):>9.2f} {soma('ajuste'):>9.2f} {soma('montagem'):>10.2f}")
+    print("\nSíntese e ajuste rodam em paralelo, então somam mais que o tempo total; a montagem é sequencial.")
+
+def comparar(resultados, baseline, tolerancia):
+    """Retorna os cenários cujo legendas/s caiu mais que a tolerância em relação ao baseline."""
+    anteriores = {(r["provedor"], r["legendas"]): r for r in baseline.get("resultados", []) if r.get("ok")}
+    regressoes = []
+    for r in resultados:
+        anterior = anteriores.get((r["provedor"], r["legendas"]))
+        if not anterior or not r.get("ok"):
+            continue
+        if r["legendas_por_s"] < anterior["legendas_por_s"] * (1 - tolerancia):
+            regressoes.append(f"{r['provedor']}/{r['legendas']}: {anterior['legendas_por_s']} -> {r['legendas_por_s']} leg/s")
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de SRT com provedores falsos")
+    parser.add_argument("--legendas", type=int, nargs="+", default=TAMANHOS_PADRAO, help="tamanhos dos SRT gerados")
+    parser.add_argument("--provedores", nargs="+", choices=["edge", "tiktok"], default=["edge", "tiktok"])
+    parser.add_argument("--latencia-ms", type=float, default=150)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração das requisições que falham (0 a 1)")
+    parser.add_argument("--concorrencia", type=int, default=0, help="legendas em paralelo (0 = padrão do pipeline)")
+    parser.add_argument("--em-memoria", action="store_true", help="usa o modo em memória do pipeline")
+    parser.add_argument("--motor-ajuste", choices=["ffmpeg", "numpy"], default="ffmpeg", help="ajuste de velocidade das legendas")
+    parser.add_argument("--montagem", choices=["montador", "ffmpeg"], default="montador", help="montagem do SRT (ffmpeg: um único grafo filter_complex, que também faz o ajuste)")
+    parser.add_argument("--json", help="salva os resultados neste arquivo")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="queda máxima aceita de legendas/s (fração)")
+    # Uso interno: execução de um cenário no processo filho
+    parser.add_argument("--cenario", dest="provedor", help=argparse.SUPPRESS)
+    parser.add_argument("--srt", help=argparse.SUPPRESS)
+    parser.add_argument("--porta", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--num-legendas", dest="num_legendas", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--resultado", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.provedor:
+        args.legendas = args.num_legendas
+        executar_cenario(args)
+        return
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as fixtures, ServidoresFalsos(args.latencia_ms, args.jitter_ms, args.taxa_erro) as servidores:
+        for num_legendas in args.legendas:
+            srt = gerar_srt(num_legendas, Path(fixtures) / f"bench_{num_legendas}.srt")
+            for provedor in args.provedores:
+                print(f"Rodando {provedor} com {num_legendas} legendas...", flush=True)
+                resultados.append(rodar_cenario(provedor, num_legendas, srt, servidores.porta, args))
+        erros_simulados = servidores.falhas_edge.erros + servidores.falhas_tiktok.erros
+
+    imprimir_tabela(resultados)
+    print(f"Erros simulados pelos provedores falsos: {erros_simulados}")
+
+    if args.json:
+        configuracao = {k: getattr(args, k) for k in ("latencia_ms", "jitter_ms", "taxa_erro", "concorrencia", "em_memoria", "motor_ajuste", "montagem")}
+        Path(args.json).write_text(json.dumps({"configuracao": configuracao, "resultados": resultados}, indent=2), encoding="utf-8")
+
+    falhou = any(not r.get("ok") for r in resultados)
+    if args.baseline:
+        regressoes = comparar(resultados, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerancia)
+        for regressao in regressoes:
+            print(f"REGRESSÃO: {regressao}")
+        falhou = falhou or bool(regressoes)
+    sys.exit(1 if falhou else 0)
+
+if __name__ == "__main__":
+    main()
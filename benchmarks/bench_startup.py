@@ -0,0 +1,100 @@
+# benchmarks/bench_startup.py
+"""
+Benchmark do tempo de subida do app.
+
+Importa o módulo num processo novo com `python -X importtime` e soma o tempo
+cumulativo dos imports de primeiro nível. A subida é dominada pelo próprio gradio,
+então o orçamento é relativo: na mesma execução mede um `import gradio` puro e
+falha (código de saída 1) se o app passar dele por mais que a folga, ou se algum
+módulo do próprio app que deveria ser carregado sob demanda já vier na subida.
+
+Uso:
+    python benchmarks/bench_startup.py [--modulo app] [--folga-ms 500] [--repeticoes 5]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Módulos que só devem ser importados na primeira requisição que precisar deles. Só entram módulos
+# que o gradio não importa por conta própria (pydub, numpy, tqdm e requests já vêm com ele)
+MODULOS_PREGUICOSOS = ["edgeTTS", "tiktokTTS", "utils", "edge_tts", "pysrt", "aiohttp"]
+
+_LINHA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def medir_importacao(modulo):
+    """Importa o módulo num processo limpo e retorna (total_us, {modulo: cumulativo_us})."""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ, capture_output=True, text=True, env={**os.environ, "PYTHONWARNINGS": "ignore"}
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(f"Falha ao importar '{modulo}':\n{resultado.stderr.strip().splitlines()[-1]}")
+
+    cumulativos = {}
+    total_us = 0
+    for linha in resultado.stderr.splitlines():
+        casamento = _LINHA.match(linha)
+        if not casamento:
+            continue
+        _, cumulativo, recuo, nome = casamento.groups()
+        cumulativos[nome] = int(cumulativo)
+        if len(recuo) == 1: # Import de primeiro nível
+            total_us += int(cumulativo)
+    return total_us, cumulativos
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do tempo de importação do app")
+    parser.add_argument("--modulo", default="app", help="módulo a importar (padrão: app)")
+    parser.add_argument("--base", default="gradio", help="import de referência medido na mesma execução (padrão: gradio)")
+    parser.add_argument("--folga-ms", type=float, default=float(os.environ.get("QUICKTTS_FOLGA_SUBIDA_MS", "500")),
+                        help="quanto a mediana do app pode passar da mediana da base, em ms")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="quantos imports mais lentos mostrar")
+    args = parser.parse_args()
+
+    try:
+        # Aquecimento: gera os .pyc
+        medir_importacao(args.base)
+        medir_importacao(args.modulo)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(2)
+    totais, totais_base = [], []
+    cumulativos = {}
+    for _ in range(args.repeticoes):
+        # Alternados, para uma variação da máquina afetar os dois igualmente
+        totais_base.append(medir_importacao(args.base)[0] / 1000)
+        total_us, cumulativos = medir_importacao(args.modulo)
+        totais.append(total_us / 1000)
+
+    mediana = statistics.median(totais)
+    mediana_base = statistics.median(totais_base)
+    orcamento = mediana_base + args.folga_ms
+    print(f"import {args.base}: mediana {mediana_base:.1f} ms ({args.repeticoes} repetições)")
+    print(f"import {args.modulo}: mediana {mediana:.1f} ms, mín {min(totais):.1f} ms, máx {max(totais):.1f} ms "
+          f"({mediana - mediana_base:+.1f} ms em relação a {args.base})")
+    print("\nImports mais lentos (cumulativo):")
+    for nome, us in sorted(cumulativos.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {us / 1000:>9.1f} ms  {nome}")
+
+    falhou = False
+    carregados = [nome for nome in MODULOS_PREGUICOSOS if nome in cumulativos and nome != args.modulo]
+    if carregados:
+        print(f"\nERRO: módulos que deveriam ser carregados sob demanda foram importados na subida: {', '.join(carregados)}")
+        falhou = True
+    if mediana > orcamento:
+        print(f"\nERRO: a subida levou {mediana:.1f} ms, acima do orçamento de {orcamento:.0f} ms ({args.base} + {args.folga_ms:.0f} ms)")
+        falhou = True
+    if not falhou:
+        print(f"\nOK: dentro do orçamento de {orcamento:.0f} ms ({args.base} + {args.folga_ms:.0f} ms)")
+    sys.exit(1 if falhou else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# benchmarks/mock_providers.py
+"""
+Provedores falsos, locais, para os benchmarks: um websocket que fala o protocolo do Edge-TTS
+e um endpoint HTTP no formato do config.json da biblioteca TikTok. Ambos devolvem MP3 sintético
+(frames válidos de silêncio) com duração proporcional ao texto, e têm latência, jitter e taxa
+de erro configuráveis.
+"""
+
+import asyncio
+import base64
+import random
+import re
+import threading
+import uuid
+from html import unescape
+
+from aiohttp import web
+
+# Formato igual ao do Edge-TTS: MPEG-2 Layer III, 24 kHz, 48 kbps, mono (frames de 144 bytes / 24 ms)
+_FRAME_MS = 24
+_FRAME_MP3 = bytes([0xFF, 0xF3, 0x64, 0xC0]) + bytes(140)
+# Velocidade de fala simulada
+MS_POR_CARACTERE = 65
+DURACAO_MINIMA_MS = 300
+
+def duracao_fala_ms(texto):
+    """Duração simulada da fala de um texto, a mesma usada pelos provedores falsos e pelos fixtures."""
+    return max(DURACAO_MINIMA_MS, len(texto) * MS_POR_CARACTERE)
+
+def gerar_mp3_sintetico(duracao_ms):
+    """MP3 válido (só silêncio) com a duração pedida, arredondada para frames de 24 ms."""
+    return _FRAME_MP3 * max(1, -(-int(duracao_ms) // _FRAME_MS))
+
+
+class Falhas:
+    """Latência, jitter e taxa de erro de um provedor falso."""
+
+    def __init__(self, latencia_ms=150, jitter_ms=50, taxa_erro=0.0, seed=None):
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.taxa_erro = taxa_erro
+        self._rng = random.Random(seed)
+        self.requisicoes = 0
+        self.erros = 0
+
+    async def esperar(self):
+        atraso = self.latencia_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(0.0, atraso) / 1000)
+
+    def sortear_erro(self):
+        self.requisicoes += 1
+        if self._rng.random() < self.taxa_erro:
+            self.erros += 1
+            return True
+        return False
+
+
+class EdgeFalso:
+    """Websocket com o protocolo do Edge-TTS (speech.config, ssml -> turn.start, audio, turn.end)."""
+
+    def __init__(self, falhas):
+        self.falhas = falhas
+
+    async def handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            if msg.type != web.WSMsgType.TEXT or "Path:ssml" not in msg.data:
+                continue # speech.config não tem resposta
+            texto = unescape(re.sub(r"<[^>]+>", "", msg.data.split("\r\n\r\n", 1)[-1]))
+            await self.falhas.esperar()
+            if self.falhas.sortear_erro():
+                await ws.close() # O cliente vê a conexão fechar sem áudio (NoAudioReceived)
+                return ws
+
+            request_id = uuid.uuid4().hex
+            await ws.send_str(f"X-RequestId:{request_id}\r\nContent-Type:application/json; charset=utf-8\r\nPath:turn.start\r\n\r\n{{}}")
+            cabecalho = f"X-RequestId:{request_id}\r\nContent-Type:audio/mpeg\r\nPath:audio\r\n".encode()
+            audio = gerar_mp3_sintetico(duracao_fala_ms(texto))
+            for inicio in range(0, len(audio), 4032): # Em pedaços, como o serviço real
+                await ws.send_bytes(len(cabecalho).to_bytes(2, "big") + cabecalho + audio[inicio:inicio + 4032])
+            await ws.send_str(f"X-RequestId:{request_id}\r\nContent-Type:application/json; charset=utf-8\r\nPath:turn.end\r\n\r\n{{}}")
+        return ws
+
+
+class TikTokFalso:
+    """Endpoint HTTP que responde {"<campo>": "<mp3 em base64>"}, como os do config.json."""
+
+    def __init__(self, falhas, campo):
+        self.falhas = falhas
+        self.campo = campo
+
+    async def handler(self, request):
+        corpo = await request.json()
+        await self.falhas.esperar()
+        if self.falhas.sortear_erro():
+            return web.json_response({"error": "falha simulada"}, status=500)
+        audio = gerar_mp3_sintetico(duracao_fala_ms(corpo.get("text", "")))
+        return web.json_response({self.campo: base64.b64encode(audio).decode("ascii")})
+
+
+class ServidoresFalsos:
+    """Sobe os provedores falsos numa thread com event loop próprio, fora do loop do código medido."""
+
+    def __init__(self, latencia_ms=150, jitter_ms=50, taxa_erro=0.0, seed=0):
+        self.falhas_edge = Falhas(latencia_ms, jitter_ms, taxa_erro, seed)
+        self.falhas_tiktok = Falhas(latencia_ms, jitter_ms, taxa_erro, seed + 1)
+        self.porta = None
+        self._loop = asyncio.new_event_loop()
+        self._pronto = threading.Event()
+        self._runner = None
+
+    @property
+    def url_edge(self):
+        return f"ws://127.0.0.1:{self.porta}/edge/v1?TrustedClientToken=falso"
+
+    @property
+    def endpoints_tiktok(self):
+        """Lista no mesmo formato do config.json da biblioteca TikTok."""
+        return [
+            {"url": f"http://127.0.0.1:{self.porta}/api/generation", "response": "data"},
+            {"url": f"http://127.0.0.1:{self.porta}/api/tiktok-tts", "response": "base64"},
+        ]
+
+    async def _iniciar(self):
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_get("/edge/v1", EdgeFalso(self.falhas_edge).handler)
+        app.router.add_post("/api/generation", TikTokFalso(self.falhas_tiktok, "data").handler)
+        app.router.add_post("/api/tiktok-tts", TikTokFalso(self.falhas_tiktok, "base64").handler)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0, backlog=1024)
+        await site.start()
+        self.porta = site._server.sockets[0].getsockname()[1]
+
+    def _rodar(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._iniciar())
+        self._pronto.set()
+        self._loop.run_forever()
+
+    def __enter__(self):
+        threading.Thread(target=self._rodar, name="provedores-falsos", daemon=True).start()
+        self._pronto.wait()
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -0,0 +1,56 @@
+# benchmarks/srt_fixtures.py
+"""
+Gera arquivos SRT sintéticos para os benchmarks, de forma determinística (mesma seed, mesmo arquivo).
+
+A duração de cada legenda varia em torno da duração simulada da fala, então o ajuste de
+velocidade acelera umas e desacelera outras, e há legendas sobrepostas às seguintes.
+
+Uso:
+    python benchmarks/srt_fixtures.py benchmarks/fixtures --legendas 10 100 1000 5000
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+from mock_providers import duracao_fala_ms
+
+TAMANHOS_PADRAO = [10, 100, 1000, 5000]
+_PALAVRAS = [
+    "olá", "tudo", "bem", "hoje", "vamos", "falar", "sobre", "legendas", "sincronizadas", "com",
+    "áudio", "gerado", "por", "voz", "sintética", "e", "o", "a", "de", "que", "não", "isso", "muito",
+]
+
+def _formatar_tempo(ms):
+    horas, ms = divmod(int(ms), 3_600_000)
+    minutos, ms = divmod(ms, 60_000)
+    segundos, ms = divmod(ms, 1000)
+    return f"{horas:02d}:{minutos:02d}:{segundos:02d},{ms:03d}"
+
+def gerar_srt(num_legendas, caminho, seed=0):
+    """Escreve um SRT com num_legendas legendas em caminho e retorna o caminho."""
+    rng = random.Random(seed + num_legendas)
+    linhas = []
+    inicio = 0
+    for indice in range(1, num_legendas + 1):
+        texto = " ".join(rng.choice(_PALAVRAS) for _ in range(rng.randint(2, 14))).capitalize() + rng.choice([".", "!", "?", "..."])
+        # Entre 60% e 140% da fala: o ajuste de velocidade roda nos dois sentidos
+        duracao = int(duracao_fala_ms(texto) * rng.uniform(0.6, 1.4))
+        linhas.append(f"{indice}\n{_formatar_tempo(inicio)} --> {_formatar_tempo(inicio + duracao)}\n{texto}\n")
+        inicio += duracao + rng.randint(0, 400)
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    caminho.write_text("\n".join(linhas), encoding="utf-8")
+    return caminho
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera SRTs sintéticos para os benchmarks")
+    parser.add_argument("destino", help="pasta onde os arquivos serão escritos")
+    parser.add_argument("--legendas", type=int, nargs="+", default=TAMANHOS_PADRAO)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for n in args.legendas:
+        print(gerar_srt(n, Path(args.destino) / f"bench_{n}.srt", args.seed))
+
+if __name__ == "__main__":
+    main()
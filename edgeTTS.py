@@ -1,8 +1,8 @@
 # edgeTTS.py
 
-import subprocess
 import os
-import json
+import re
+import time
 import asyncio
 from pathlib import Path
 import pysrt
@@ -10,135 +10,314 @@ from tqdm import tqdm
 import shutil
 
 # Importa funções do nosso arquivo de utilidades
-from utils import remove_silence, timetoms, merge_audio_files, adjust_audio_speed
+from utils import remove_silence, timetoms, merge_audio_files, merge_audio_pcm, merge_audio_ffmpeg, escolher_montagem
+from tts_cache import get_cache, chave_cache
+from voice_registry import load_voices, get_voice_options
+from srt_manifest import ManifestoSRT, renderizar_legenda, bruto_em_arquivo, trava_manifesto
+from metrics import medir, contar
+from adaptive_limiter import get_limitador, espera_retentativa
 
 # --- Funções de Gerenciamento de Voz ---
-def load_voices():
-    with open('voices.json', 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-def get_voice_options(language, voices_data):
-    if language in voices_data:
-        return [f"{voice['name']} | {voice['gender']}" for voice in voices_data[language]]
-    return []
-
 def extract_voice_name(formatted_voice):
     return formatted_voice.split(" | ")[0]
 
 # --- Funções de Geração de Áudio (Edge-TTS) ---
-def generate_audio(texto, modelo_de_voz, velocidade, tom, volume):
+async def sintetizar_edge(texto, voz, rate_str, pitch_str, volume_str, output_file):
+    """Sintetiza o texto com o motor do edge-tts no próprio processo e salva o MP3 em output_file."""
+    audio = await sintetizar_edge_bytes(texto, voz, rate_str, pitch_str, volume_str)
+    if not audio:
+        raise RuntimeError("O Edge-TTS não retornou áudio.")
+    Path(output_file).write_bytes(audio)
+
+async def sintetizar_edge_bytes(texto, voz, rate_str, pitch_str, volume_str):
+    """
+    Sintetiza o texto com o edge-tts e retorna o MP3 em memória.
+    Todas as chamadas ao Edge-TTS passam por aqui e dividem o mesmo limitador adaptativo.
+    """
+    from edge_tts import Communicate as EdgeTTS
+    tts_edge = EdgeTTS(text=texto, voice=voz, rate=rate_str, pitch=pitch_str, volume=volume_str)
+    audio = bytearray()
+    try:
+        async with get_limitador("edge").vaga() as vaga:
+            with medir("sintese", provedor="edge"):
+                inicio = time.monotonic()
+                async for chunk in tts_edge.stream():
+                    if chunk["type"] == "audio":
+                        if not audio:
+                            # O tempo até o primeiro áudio não depende do tamanho do texto: é ele que indica sobrecarga
+                            vaga.latencia(time.monotonic() - inicio)
+                        audio.extend(chunk["data"])
+            if not audio:
+                vaga.falhou()
+    except Exception:
+        contar("falhas_sintese", provedor="edge")
+        raise
+    if not audio:
+        contar("falhas_sintese", provedor="edge")
+    return bytes(audio)
+
+# --- Síntese Fragmentada (arquivos .txt longos) ---
+# Tamanho máximo (em caracteres) de cada fragmento e quantos são sintetizados ao mesmo tempo
+FRAGMENTO_MAX_CARACTERES = 2000
+
+def dividir_em_fragmentos(texto, max_caracteres=FRAGMENTO_MAX_CARACTERES):
+    """Divide o texto em fragmentos de até max_caracteres, cortando em fim de parágrafo ou de frase."""
+    fragmentos = []
+    atual = ""
+
+    def fechar():
+        nonlocal atual
+        if atual.strip():
+            fragmentos.append(atual.strip())
+        atual = ""
+
+    for paragrafo in re.split(r"\n\s*\n", texto):
+        paragrafo = " ".join(paragrafo.split())
+        if not paragrafo:
+            continue
+        # Prefere terminar o fragmento num fim de parágrafo se ele já estiver razoavelmente cheio
+        if len(atual) >= max_caracteres // 2:
+            fechar()
+        for frase in re.split(r"(?<=[.!?…;:])\s+", paragrafo):
+            # Frases maiores que o limite são quebradas nos espaços
+            while len(frase) > max_caracteres:
+                corte = frase.rfind(" ", 0, max_caracteres)
+                if corte <= 0:
+                    corte = max_caracteres
+                pedaco, frase = frase[:corte], frase[corte:].lstrip()
+                fechar()
+                atual = pedaco
+                fechar()
+            if atual and len(atual) + 1 + len(frase) > max_caracteres:
+                fechar()
+            atual = f"{atual} {frase}" if atual else frase
+        atual += "\n"
+    fechar()
+    return fragmentos
+
+async def sintetizar_fragmentos(fragmentos, voz, rate_str, pitch_str, volume_str, max_concorrencia=None, max_retries=3):
+    """
+    Sintetiza os fragmentos em paralelo e retorna os MP3 na ordem original. Cada fragmento tem suas próprias tentativas.
+    Quantos rodam ao mesmo tempo é decidido pelo limitador adaptativo do Edge-TTS; max_concorrencia é só um teto opcional.
+    """
+    cache = get_cache()
+    semaforo = asyncio.Semaphore(max(1, int(max_concorrencia or len(fragmentos) or 1)))
+
+    async def sintetizar(indice, fragmento, pbar):
+        chave = chave_cache("edge", voz, fragmento, rate=rate_str, pitch=pitch_str, volume=volume_str)
+        audio = cache.get(chave) if cache else None
+        if audio is None:
+            async with semaforo:
+                for attempt in range(max_retries):
+                    try:
+                        audio = await sintetizar_edge_bytes(fragmento, voz, rate_str, pitch_str, volume_str)
+                        if audio:
+                            break
+                        print(f"Aviso: Tentativa {attempt + 1} para o fragmento {indice + 1} não retornou áudio. Retentando...")
+                    except Exception as e:
+                        print(f"Aviso: Tentativa {attempt + 1} para o fragmento {indice + 1} falhou com erro: {e}. Retentando...")
+                    contar("retentativas", provedor="edge")
+                    if attempt + 1 < max_retries:
+                        await asyncio.sleep(espera_retentativa(attempt))
+            if not audio:
+                raise RuntimeError(f"Todas as {max_retries} tentativas falharam para o fragmento {indice + 1}.")
+            # Fragmentos prontos ficam no cache, então uma nova execução só refaz os que falharam
+            if cache: cache.put(chave, audio)
+        pbar.update(1)
+        return audio
+
+    with tqdm(total=len(fragmentos), desc="Gerando fragmentos com EdgeTTS", unit="fragmento") as pbar:
+        return await asyncio.gather(*(sintetizar(i, f, pbar) for i, f in enumerate(fragmentos)))
+
+def generate_audio(texto, modelo_de_voz, velocidade, tom, volume, output_file=None):
     actual_voice = extract_voice_name(modelo_de_voz)
     rate_str = f"+{velocidade}%" if velocidade >= 0 else f"{velocidade}%"
     pitch_str = f"+{tom}Hz" if tom >= 0 else f"{tom}Hz"
     volume_str = f"+{volume}%" if volume >= 0 else f"{volume}%"
     
-    output_dir = "output"
-    os.makedirs(output_dir, exist_ok=True)
-    output_file = os.path.join(output_dir, "new_audio.mp3")
-    
-    cmd = ["edge-tts", "--rate=" + rate_str, "--pitch=" + pitch_str, "--volume=" + volume_str,
-           "-v", actual_voice, "-t", texto, "--write-media", output_file]
+    if output_file is None:
+        output_file = os.path.join("output", "new_audio.mp3")
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+
+    cache = get_cache()
+    chave = chave_cache("edge", actual_voice, texto, rate=rate_str, pitch=pitch_str, volume=volume_str)
+    if cache and cache.copiar_para(chave, output_file):
+        print("Áudio encontrado no cache.")
+        return output_file
     
     print("Gerando áudio com Edge-TTS...")
     try:
-        subprocess.run(cmd, check=True, capture_output=True, text=True)
+        asyncio.run(sintetizar_edge(texto, actual_voice, rate_str, pitch_str, volume_str, output_file))
         print("Áudio gerado com sucesso!")
+        if cache: cache.salvar_arquivo(chave, output_file)
         return output_file
-    except subprocess.CalledProcessError as e:
-        print(f"Erro ao gerar áudio: {e.stderr}")
+    except Exception as e:
+        print(f"Erro ao gerar áudio: {e}")
         return None
 
-def generate_audio_from_file(file_path, modelo_de_voz, velocidade, tom, volume):
+def generate_audio_from_file(file_path, modelo_de_voz, velocidade, tom, volume, fragmentado=None, output_file=None):
     actual_voice = extract_voice_name(modelo_de_voz)
     rate_str = f"+{velocidade}%" if velocidade >= 0 else f"{velocidade}%"
     pitch_str = f"+{tom}Hz" if tom >= 0 else f"{tom}Hz"
     volume_str = f"+{volume}%" if volume >= 0 else f"{volume}%"
     
-    output_dir = "output"
-    os.makedirs(output_dir, exist_ok=True)
-    output_file = os.path.join(output_dir, "new_audio.mp3")
-    
-    cmd = ["edge-tts", "-f", file_path, "--rate=" + rate_str, "--pitch=" + pitch_str,
-           "--volume=" + volume_str, "-v", actual_voice, "--write-media", output_file]
+    if output_file is None:
+        output_file = os.path.join("output", "new_audio.mp3")
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+
+    cache = get_cache()
+    texto = Path(file_path).read_text(encoding="utf-8")
+    chave = chave_cache("edge", actual_voice, texto, rate=rate_str, pitch=pitch_str, volume=volume_str)
+    if cache and cache.copiar_para(chave, output_file):
+        print("Áudio do arquivo encontrado no cache.")
+        return output_file
     
+    # Por padrão só fragmenta textos que não cabem num único fragmento
+    if fragmentado is None:
+        fragmentado = len(texto) > FRAGMENTO_MAX_CARACTERES
+
     print("Gerando áudio do arquivo com Edge-TTS...")
     try:
-        subprocess.run(cmd, check=True, capture_output=True, text=True)
+        if fragmentado:
+            fragmentos = dividir_em_fragmentos(texto)
+            print(f"Texto dividido em {len(fragmentos)} fragmentos.")
+            audios = asyncio.run(sintetizar_fragmentos(fragmentos, actual_voice, rate_str, pitch_str, volume_str))
+            # Os MP3 do Edge-TTS têm o mesmo formato, então podem ser concatenados diretamente
+            with open(output_file, "wb") as f:
+                for audio in audios:
+                    f.write(audio)
+        else:
+            asyncio.run(sintetizar_edge(texto, actual_voice, rate_str, pitch_str, volume_str, output_file))
         print("Áudio gerado com sucesso!")
+        if cache: cache.salvar_arquivo(chave, output_file)
         return output_file
-    except subprocess.CalledProcessError as e:
-        print(f"Erro ao gerar áudio do arquivo: {e.stderr}")
+    except Exception as e:
+        print(f"Erro ao gerar áudio do arquivo: {e}")
         return None
 
 # --- Funções Controladoras (Edge-TTS) ---
-def controlador_generate_audio(audio_input, voice_model_input, speed, pitch, volume, cut_silence):
-    audio_file = generate_audio(audio_input, voice_model_input, speed, pitch, volume)
+def controlador_generate_audio(audio_input, voice_model_input, speed, pitch, volume, cut_silence, output_file=None):
+    audio_file = generate_audio(audio_input, voice_model_input, speed, pitch, volume, output_file=output_file)
     if audio_file and cut_silence:
         print("Removendo silêncio...")
-        remove_silence(audio_file, audio_file)
+        with medir("remover_silencio"):
+            remove_silence(audio_file, audio_file)
         print("Silêncio removido.")
     return audio_file
 
-def controlador_generate_audio_from_file(file, voice_model_input, speed, pitch, volume, cut_silence):
+def controlador_generate_audio_from_file(file, voice_model_input, speed, pitch, volume, cut_silence, fragmentado=None, output_file=None):
     if not file: return None
-    audio_file = generate_audio_from_file(file.name, voice_model_input, speed, pitch, volume)
+    audio_file = generate_audio_from_file(file.name, voice_model_input, speed, pitch, volume, fragmentado=fragmentado, output_file=output_file)
     if audio_file and cut_silence:
         print("Cortando silêncio...")
-        remove_silence(audio_file, audio_file)
+        with medir("remover_silencio"):
+            remove_silence(audio_file, audio_file)
         print("Silêncio removido com sucesso!")
     return audio_file
 
 # --- Lógica de Processamento de SRT (Usa Edge-TTS) ---
-async def process_srt_file(srt_file_path, voice, output_dir_str, pitch, volume, srt_temp_deleta, progress=None):
-    from edge_tts import Communicate as EdgeTTS
+# Número padrão de legendas em andamento ao mesmo tempo (síntese + ajuste). Quantas chamadas ao
+# Edge-TTS saem de fato ao mesmo tempo é decidido pelo limitador adaptativo (adaptive_limiter)
+SRT_MAX_CONCORRENCIA = 32
+
+async def process_srt_file(srt_file_path, voice, output_dir_str, pitch, volume, srt_temp_deleta, progress=None, max_concorrencia=SRT_MAX_CONCORRENCIA, em_memoria=False, output_file=None, incremental=True, manifesto_dir=None, motor_ajuste=None, montagem=None):
+    """
+    Gera o áudio sincronizado de um SRT com o Edge-TTS.
+    Com em_memoria=True, cada legenda é decodificada uma única vez para PCM, ajustada via pipes
+    e mantida em memória até a montagem; só o arquivo final é codificado (sem MP3 intermediários).
+    Com incremental=True, um manifesto por SRT (ver srt_manifest) guarda o áudio de cada legenda entre
+    execuções: só legendas com texto novo são sintetizadas e só as com tempo novo são reajustadas.
+    motor_ajuste escolhe o ajuste de velocidade: "ffmpeg" (atempo) ou "numpy" (WSOLA no próprio processo);
+    sem ele vale QUICKTTS_MOTOR_AJUSTE.
+    Com montagem="ffmpeg" (ou QUICKTTS_MONTAGEM), as legendas não são ajustadas uma a uma: os áudios brutos
+    vão para um único grafo do FFmpeg que ajusta, posiciona e mistura tudo (em_memoria e motor_ajuste não se aplicam).
+    """
     from pydub import AudioSegment # Adicionado para gerar silêncio
 
+    montagem = escolher_montagem(montagem)
     subs = pysrt.open(srt_file_path)
     output_dir = Path(output_dir_str)
-    output_dir.mkdir(parents=True, exist_ok=True)
+    if not em_memoria or montagem == "ffmpeg":
+        output_dir.mkdir(parents=True, exist_ok=True)
     
     pitch_str = f"+{pitch}Hz" if pitch >= 0 else f"{pitch}Hz"
     volume_str = f"+{volume}%" if volume >= 0 else f"{volume}%"
     max_retries = 3 # Número de tentativas para cada legenda
+    cache = get_cache()
+    audios = {} # Modo em memória: índice da legenda -> PCM já ajustado
+    brutos = {} # Montagem "ffmpeg": índice da legenda -> caminho do MP3 bruto
+    manifesto = ManifestoSRT.para_srt(srt_file_path, manifesto_dir) if incremental else None
+    # Limita quantas legendas ficam em andamento ao mesmo tempo (1 = modo sequencial)
+    semaforo = asyncio.Semaphore(max(1, int(max_concorrencia or 1)))
 
-    with tqdm(total=len(subs), desc="Gerando e ajustando áudios com EdgeTTS", unit="segmento") as pbar:
-        for sub in subs:
-            output_file = output_dir / f"{sub.index:02d}.mp3"
-            temp_file = output_dir / f"{sub.index:02d}_temp.mp3"
-            target_duration_ms = timetoms(sub.end) - timetoms(sub.start)
+    async def processar_legenda(sub, pbar):
+        legenda_file = output_dir / f"{sub.index:02d}.mp3"
+        target_duration_ms = timetoms(sub.end) - timetoms(sub.start)
+        # Chave do cache e do manifesto, usada também pelo obter_bruto abaixo
+        chave = chave_cache("edge", voice, sub.text, rate="+0%", pitch=pitch_str, volume=volume_str)
 
-            # Só processa se o arquivo final não existir
-            if not output_file.exists() or output_file.stat().st_size == 0:
+        async def obter_bruto():
+            # O áudio bruto (antes do ajuste de velocidade) é o que fica no cache
+            dados = cache.get(chave) if cache else None
+            if dados is None:
+                dados = await sintetizar_edge_bytes(sub.text, voice, "+0%", pitch_str, volume_str)
+                if dados and cache: cache.put(chave, dados)
+            return dados
+
+        # Sem manifesto, só processa se o arquivo da legenda não existir (com manifesto a reutilização é por hash)
+        if em_memoria or manifesto is not None or montagem == "ffmpeg" or not legenda_file.exists() or legenda_file.stat().st_size == 0:
+            async with semaforo:
                 success = False
                 # Loop de retentativa
                 for attempt in range(max_retries):
                     try:
-                        tts_edge = EdgeTTS(text=sub.text, voice=voice, pitch=pitch_str, volume=volume_str)
-                        await tts_edge.save(str(temp_file))
+                        if montagem == "ffmpeg":
+                            resultado = await bruto_em_arquivo(manifesto, chave, obter_bruto, output_dir / f"{sub.index:02d}_bruto.mp3")
+                        else:
+                            resultado = await renderizar_legenda(manifesto, chave, target_duration_ms, obter_bruto, legenda_file, em_memoria, motor_ajuste)
                         
-                        # Verifica se o arquivo foi realmente criado e não está vazio
-                        if temp_file.exists() and temp_file.stat().st_size > 0:
-                            await adjust_audio_speed(str(temp_file), str(output_file), target_duration_ms)
-                            os.remove(temp_file)
+                        # Verifica se o provedor realmente retornou áudio
+                        if resultado is not None:
+                            if montagem == "ffmpeg":
+                                brutos[sub.index] = resultado
+                            elif em_memoria:
+                                audios[sub.index] = resultado
                             success = True
                             break # Sai do loop de retentativa se tiver sucesso
                         else:
-                            print(f"Aviso: Tentativa {attempt + 1} para o índice {sub.index} falhou (arquivo não criado). Retentando...")
+                            print(f"Aviso: Tentativa {attempt + 1} para o índice {sub.index} falhou (áudio vazio). Retentando...")
 
                     except Exception as e:
                         print(f"Aviso: Tentativa {attempt + 1} para o índice {sub.index} falhou com erro: {e}. Retentando...")
                     
-                    await asyncio.sleep(1) # Espera 1 segundo antes da próxima tentativa
+                    contar("retentativas", provedor="edge")
+                    if attempt + 1 < max_retries:
+                        await asyncio.sleep(espera_retentativa(attempt)) # Espera crescente antes da próxima tentativa
                 
-                # Se todas as tentativas falharem, gera silêncio
+                # Se todas as tentativas falharem, gera silêncio (em memória e na montagem "ffmpeg" a montagem já preenche com silêncio)
                 if not success:
                     print(f"ERRO: Todas as {max_retries} tentativas falharam para o índice {sub.index}. Gerando silêncio.")
-                    silent_segment = AudioSegment.silent(duration=target_duration_ms)
-                    silent_segment.export(str(output_file), format="mp3")
+                    contar("silencio", provedor="edge")
+                    if not em_memoria and montagem != "ffmpeg":
+                        silent_segment = AudioSegment.silent(duration=target_duration_ms)
+                        silent_segment.export(str(legenda_file), format="mp3")
+
+        pbar.update(1)
+
+    with tqdm(total=len(subs), desc="Gerando e ajustando áudios com EdgeTTS", unit="segmento") as pbar:
+        # Todas as legendas são agendadas de uma vez; o semáforo controla quantas rodam em paralelo.
+        # Cada legenda escreve no seu próprio arquivo ({index:02d}.mp3), então a ordem de término não importa.
+        await asyncio.gather(*(processar_legenda(sub, pbar) for sub in subs))
 
-            pbar.update(1)
+    if manifesto is not None:
+        manifesto.podar()
 
-    final_audio = await merge_audio_files(output_dir, srt_file_path)
+    if montagem == "ffmpeg":
+        final_audio = await merge_audio_ffmpeg(brutos, srt_file_path, output_file)
+    elif em_memoria:
+        return await merge_audio_pcm(audios, srt_file_path, output_file)
+    else:
+        final_audio = await merge_audio_files(output_dir, srt_file_path, output_file)
     
     if srt_temp_deleta:
         shutil.rmtree(output_dir, ignore_errors=True)
@@ -146,10 +325,11 @@ async def process_srt_file(srt_file_path, voice, output_dir_str, pitch, volume,
     
     return final_audio
 
-def controlador_process_srt_file(srt_file, voice_model_input, pitch, volume, srt_temp_deleta, progress=None):
+def controlador_process_srt_file(srt_file, voice_model_input, pitch, volume, srt_temp_deleta, progress=None, max_concorrencia=SRT_MAX_CONCORRENCIA, em_memoria=False, incremental=True, output_dir=None, output_file=None, motor_ajuste=None, montagem=None):
     if not srt_file: return None
     actual_voice = extract_voice_name(voice_model_input)
-    srt_filename_stem = Path(srt_file.name).stem
-    output_dir = f"output/srt_temp_{srt_filename_stem}"
+    if output_dir is None:
+        output_dir = f"output/srt_temp_{Path(srt_file.name).stem}"
     
-    return asyncio.run(process_srt_file(srt_file.name, actual_voice, output_dir, pitch, volume, srt_temp_deleta))
\ No newline at end of file
+    with trava_manifesto(srt_file.name):
+        return asyncio.run(process_srt_file(srt_file.name, actual_voice, output_dir, pitch, volume, srt_temp_deleta, max_concorrencia=max_concorrencia, em_memoria=em_memoria, output_file=output_file, incremental=incremental, motor_ajuste=motor_ajuste, montagem=montagem))
\ No newline at end of file
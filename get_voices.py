@@ -1,3 +1,4 @@
+import os
 import subprocess
 import asyncio
 import json
@@ -84,7 +85,7 @@ language_mapping = {
     "zu": "Zulu"
 }
 
-async def generate_voices_json():
+async def generate_voices_json(caminho="voices.json"):
     """
     Usa a biblioteca edge-tts para obter a lista de vozes diretamente,
     agrupa por nome de idioma mapeado e salva em voices.json.
@@ -115,10 +116,13 @@ async def generate_voices_json():
         # Ordena o dicionário final pelo nome do idioma para consistência
         sorted_voices = dict(sorted(voices_by_lang_name.items()))
 
-        with open("voices.json", "w", encoding="utf-8") as f:
+        # Escreve num arquivo temporário e troca de uma vez, para quem lê nunca ver um JSON pela metade
+        temp = f"{caminho}.{os.getpid()}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
             json.dump(sorted_voices, f, ensure_ascii=False, indent=4)
+        os.replace(temp, caminho)
             
-        print(f"Lista de vozes salva com sucesso em 'voices.json'.")
+        print(f"Lista de vozes salva com sucesso em '{caminho}'.")
         print(f"Total de {len(voices_manager.voices)} vozes em {len(sorted_voices)} idiomas.")
 
     except Exception as e:
@@ -0,0 +1,95 @@
+# job_workspace.py
+
+import os
+import re
+import sys
+import time
+import uuid
+import shutil
+import threading
+from pathlib import Path
+
+# --- Configuração (pode ser sobrescrita por variáveis de ambiente) ---
+JOBS_DIR = os.environ.get("QUICKTTS_JOBS_DIR", os.path.join("output", "jobs"))
+# Tempo que a pasta de um job fica disponível (para o usuário baixar o resultado) antes de ser apagada
+JOBS_TTL_HORAS = float(os.environ.get("QUICKTTS_JOBS_TTL_H", "6"))
+# Manifestos de redublagem incremental (ver srt_manifest) e por quanto tempo um manifesto sem uso é mantido
+MANIFESTO_DIR = os.environ.get("QUICKTTS_MANIFESTO_DIR", os.path.join("output", "srt_manifest"))
+MANIFESTO_TTL_HORAS = float(os.environ.get("QUICKTTS_MANIFESTO_TTL_H", "168"))
+# Pasta dos áudios finais de SRT da interface, nomeados {nome}_final_{id do job}.mp3
+SRT_SAIDA_DIR = os.path.join("output", "srt_output")
+_SAIDA_DE_JOB = re.compile(r".+_final_[0-9a-f]{8}\.mp3$")
+# Intervalo mínimo entre varreduras de limpeza
+_INTERVALO_LIMPEZA_S = 300
+
+_ultima_limpeza = 0.0
+_limpeza_lock = threading.Lock()
+
+def limpar_espacos_expirados(diretorio=JOBS_DIR, ttl_horas=JOBS_TTL_HORAS):
+    """Apaga as pastas de jobs que não são modificadas há mais do que o TTL."""
+    limite = time.time() - ttl_horas * 3600
+    base = Path(diretorio)
+    if not base.exists():
+        return
+    for pasta in base.iterdir():
+        try:
+            if pasta.is_dir() and pasta.stat().st_mtime < limite:
+                shutil.rmtree(pasta, ignore_errors=True)
+        except OSError:
+            pass
+
+def limpar_manifestos_expirados(diretorio=MANIFESTO_DIR, ttl_horas=MANIFESTO_TTL_HORAS):
+    """Apaga os manifestos de SRT não usados há mais do que o TTL (o manifesto é regravado a cada execução)."""
+    limite = time.time() - ttl_horas * 3600
+    base = Path(diretorio)
+    if not base.exists():
+        return
+    # Se o srt_manifest nunca foi importado, nenhum job deste processo está usando manifesto
+    srt_manifest = sys.modules.get("srt_manifest")
+    for pasta in base.iterdir():
+        try:
+            if not pasta.is_dir() or pasta.stat().st_mtime >= limite:
+                continue
+        except OSError:
+            continue
+        trava = srt_manifest.trava_manifesto(None, pasta) if srt_manifest else None
+        if trava is not None and not trava.acquire(blocking=False):
+            continue # Em uso agora: fica para a próxima varredura
+        try:
+            shutil.rmtree(pasta, ignore_errors=True)
+        finally:
+            if trava is not None:
+                trava.release()
+
+def limpar_saidas_expiradas(diretorio=SRT_SAIDA_DIR, ttl_horas=JOBS_TTL_HORAS):
+    """Apaga os áudios finais de SRT gerados pela interface depois do mesmo TTL das pastas de jobs."""
+    limite = time.time() - ttl_horas * 3600
+    base = Path(diretorio)
+    if not base.exists():
+        return
+    for arquivo in base.iterdir():
+        try:
+            if _SAIDA_DE_JOB.match(arquivo.name) and arquivo.is_file() and arquivo.stat().st_mtime < limite:
+                arquivo.unlink()
+        except OSError:
+            pass
+
+def novo_espaco(diretorio=JOBS_DIR):
+    """
+    Cria a pasta exclusiva de um job (output/jobs/<id>) e, de tempos em tempos, limpa as pastas,
+    os áudios finais de SRT e os manifestos expirados.
+    """
+    global _ultima_limpeza
+    agora = time.monotonic()
+    with _limpeza_lock:
+        limpar = agora - _ultima_limpeza >= _INTERVALO_LIMPEZA_S
+        if limpar:
+            _ultima_limpeza = agora
+    if limpar:
+        limpar_espacos_expirados(diretorio)
+        limpar_saidas_expiradas()
+        limpar_manifestos_expirados()
+
+    pasta = Path(diretorio) / uuid.uuid4().hex
+    pasta.mkdir(parents=True, exist_ok=True)
+    return pasta
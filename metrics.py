@@ -0,0 +1,217 @@
+# metrics.py
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# --- Configuração (pode ser sobrescrita por variáveis de ambiente) ---
+# Porta do endpoint de métricas que sobe junto com a interface; 0 desativa
+METRICAS_PORTA = int(os.environ.get("QUICKTTS_METRICAS_PORTA", "9464"))
+METRICAS_HOST = os.environ.get("QUICKTTS_METRICAS_HOST", "127.0.0.1")
+# Quantas medições recentes de cada etapa entram no cálculo dos percentis
+METRICAS_JANELA = int(os.environ.get("QUICKTTS_METRICAS_JANELA", "1024"))
+
+_PREFIXO = "quicktts"
+_QUANTIS = (0.5, 0.9, 0.99)
+_AJUDA = {
+    "etapa_segundos": "Duração de cada etapa do pipeline (síntese, ffprobe, atempo, decodificação, montagem, exportação, render_ffmpeg).",
+    "retentativas_total": "Tentativas de síntese que falharam (as seguintes repetem; depois da última vem o silêncio).",
+    "silencio_total": "Legendas que viraram silêncio depois de esgotar as tentativas.",
+    "cache_total": "Consultas ao cache de síntese, por resultado (acerto ou falta).",
+    "falhas_sintese_total": "Chamadas ao provedor que falharam ou não retornaram áudio.",
+    "duracao_total": "Leituras de duração de MP3, por método (cabecalho, ffprobe ou pydub).",
+    "endpoint_requisicoes_total": "Requisições feitas a cada endpoint do TikTok.",
+    "endpoint_falhas_total": "Requisições que falharam em cada endpoint do TikTok.",
+    "endpoint_circuito_aberto": "1 se o circuito do endpoint do TikTok está aberto (endpoint evitado).",
+    "limitador_cortes_total": "Vezes que o limitador adaptativo cortou a janela, por motivo (erro, 429 ou latência).",
+    "limitador_janela": "Janela atual de requisições simultâneas do limitador adaptativo.",
+    "limitador_em_andamento": "Requisições em andamento no limitador adaptativo.",
+}
+
+
+def _chave_rotulos(rotulos):
+    return tuple(sorted((nome, str(valor)) for nome, valor in rotulos.items()))
+
+def _formatar_rotulos(rotulos, extra=()):
+    pares = list(rotulos) + list(extra)
+    if not pares:
+        return ""
+    escapar = lambda valor: valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{nome}="{escapar(valor)}"' for nome, valor in pares) + "}"
+
+def _quantil(ordenados, q):
+    return ordenados[min(len(ordenados) - 1, int(round(q * (len(ordenados) - 1))))]
+
+
+class Metricas:
+    """
+    Contadores e durações das etapas do pipeline, só em memória e só deste processo.
+    Cada etapa guarda contagem e soma acumuladas (como um summary do Prometheus) e uma janela
+    das últimas medições para os percentis.
+    """
+
+    def __init__(self, janela=METRICAS_JANELA):
+        self.janela = janela
+        self._lock = threading.Lock()
+        self._contadores = {} # (nome, rótulos) -> valor
+        self._etapas = {} # rótulos -> [contagem, soma, deque das durações recentes]
+        self._coletores = []
+
+    def contar(self, nome, valor=1, **rotulos):
+        chave = (nome, _chave_rotulos(rotulos))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def observar(self, etapa, segundos, **rotulos):
+        chave = _chave_rotulos({"etapa": etapa, **rotulos})
+        with self._lock:
+            serie = self._etapas.get(chave)
+            if serie is None:
+                serie = self._etapas[chave] = [0, 0.0, deque(maxlen=self.janela)]
+            serie[0] += 1
+            serie[1] += segundos
+            serie[2].append(segundos)
+
+    @contextmanager
+    def medir(self, etapa, **rotulos):
+        """Mede o tempo do bloco (inclusive os awaits dentro dele) como uma execução da etapa."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(etapa, time.perf_counter() - inicio, **rotulos)
+
+    def registrar_coletor(self, coletor):
+        """
+        Registra uma função chamada a cada leitura das métricas, para valores que vivem em outro
+        lugar (ex.: saúde dos endpoints do TikTok). Ela retorna tuplas (nome, tipo, rótulos, valor),
+        com tipo "counter" ou "gauge".
+        """
+        with self._lock:
+            if coletor not in self._coletores:
+                self._coletores.append(coletor)
+
+    def _instantaneo(self):
+        with self._lock:
+            contadores = dict(self._contadores)
+            etapas = {chave: (serie[0], serie[1], sorted(serie[2])) for chave, serie in self._etapas.items()}
+            coletores = list(self._coletores)
+        coletados = []
+        for coletor in coletores:
+            try:
+                coletados.extend(coletor())
+            except Exception as e:
+                print(f"Aviso: coletor de métricas falhou: {e}")
+        return contadores, etapas, coletados
+
+    def texto_prometheus(self):
+        """Métricas no formato de texto do Prometheus (versão 0.0.4)."""
+        contadores, etapas, coletados = self._instantaneo()
+        linhas = []
+
+        def cabecalho(nome, tipo):
+            if nome in _AJUDA:
+                linhas.append(f"# HELP {_PREFIXO}_{nome} {_AJUDA[nome]}")
+            linhas.append(f"# TYPE {_PREFIXO}_{nome} {tipo}")
+
+        if etapas:
+            cabecalho("etapa_segundos", "summary")
+            for rotulos, (contagem, soma, ordenados) in sorted(etapas.items()):
+                nome = f"{_PREFIXO}_etapa_segundos"
+                for q in _QUANTIS if ordenados else ():
+                    linhas.append(f"{nome}{_formatar_rotulos(rotulos, [('quantile', str(q))])} {_quantil(ordenados, q):.6f}")
+                linhas.append(f"{nome}_sum{_formatar_rotulos(rotulos)} {soma:.6f}")
+                linhas.append(f"{nome}_count{_formatar_rotulos(rotulos)} {contagem}")
+
+        series = {}
+        for (nome, rotulos), valor in contadores.items():
+            series.setdefault((f"{nome}_total", "counter"), []).append((rotulos, valor))
+        for nome, tipo, rotulos, valor in coletados:
+            series.setdefault((nome, tipo), []).append((_chave_rotulos(rotulos), valor))
+        for (nome, tipo), valores in sorted(series.items()):
+            cabecalho(nome, tipo)
+            for rotulos, valor in sorted(valores):
+                linhas.append(f"{_PREFIXO}_{nome}{_formatar_rotulos(rotulos)} {valor}")
+        return "\n".join(linhas) + "\n"
+
+    def como_dict(self):
+        """As mesmas métricas como dicionário (para o endpoint JSON e para o resumo do batch)."""
+        contadores, etapas, coletados = self._instantaneo()
+        resultado = {"etapas": [], "contadores": [], "medidores": []}
+        for rotulos, (contagem, soma, ordenados) in sorted(etapas.items()):
+            entrada = {**dict(rotulos), "contagem": contagem, "soma_s": round(soma, 6)}
+            for q in _QUANTIS if ordenados else ():
+                entrada[f"p{int(q * 100)}_ms"] = round(_quantil(ordenados, q) * 1000, 3)
+            resultado["etapas"].append(entrada)
+        for (nome, rotulos), valor in sorted(contadores.items()):
+            resultado["contadores"].append({"nome": f"{nome}_total", "rotulos": dict(rotulos), "valor": valor})
+        for nome, tipo, rotulos, valor in coletados:
+            resultado["contadores" if tipo == "counter" else "medidores"].append({"nome": nome, "rotulos": dict(rotulos), "valor": valor})
+        return resultado
+
+    def zerar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._etapas.clear()
+
+
+_metricas_padrao = Metricas()
+
+def get_metricas():
+    """Retorna as métricas compartilhadas pelo processo."""
+    return _metricas_padrao
+
+def medir(etapa, **rotulos):
+    return _metricas_padrao.medir(etapa, **rotulos)
+
+def contar(nome, valor=1, **rotulos):
+    _metricas_padrao.contar(nome, valor, **rotulos)
+
+def registrar_coletor(coletor):
+    _metricas_padrao.registrar_coletor(coletor)
+
+
+# --- Endpoint HTTP (Prometheus e JSON) ---
+_servidor = None
+_servidor_lock = threading.Lock()
+
+def iniciar_servidor(porta=METRICAS_PORTA, host=METRICAS_HOST):
+    """
+    Sobe, numa thread, um servidor HTTP com /metrics (texto do Prometheus) e /metrics.json.
+    Chamadas repetidas reaproveitam o mesmo servidor. Retorna o servidor, ou None se porta for 0.
+    """
+    global _servidor
+    if not porta:
+        return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            caminho = self.path.split("?", 1)[0]
+            if caminho == "/metrics":
+                corpo, tipo = _metricas_padrao.texto_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+            elif caminho == "/metrics.json":
+                corpo, tipo = json.dumps(_metricas_padrao.como_dict(), ensure_ascii=False), "application/json; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            dados = corpo.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def log_message(self, *args):
+            pass # Sem uma linha de log por coleta
+
+    with _servidor_lock:
+        if _servidor is None:
+            _servidor = ThreadingHTTPServer((host, porta), Handler)
+            _servidor.daemon_threads = True
+            threading.Thread(target=_servidor.serve_forever, name="metricas", daemon=True).start()
+            print(f"Métricas disponíveis em http://{host}:{_servidor.server_address[1]}/metrics (JSON em /metrics.json)")
+        return _servidor
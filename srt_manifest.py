@@ -0,0 +1,246 @@
+# srt_manifest.py
+
+import os
+import json
+import time
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from utils import adjust_audio_speed, ajustar_velocidade_pcm, escolher_motor_ajuste
+from job_workspace import MANIFESTO_DIR, MANIFESTO_TTL_HORAS # A limpeza por TTL dos manifestos fica no job_workspace
+
+_VERSAO = 3 # 3: cada bruto/renderização guarda quando foi usado pela última vez
+
+
+def diretorio_manifesto(srt_file_path):
+    """
+    Pasta padrão do manifesto de um SRT: output/srt_manifest/{nome do srt}. É a mesma para todas as
+    versões do arquivo, senão uma legenda editada não reaproveitaria nada das anteriores.
+    """
+    return Path(MANIFESTO_DIR) / Path(srt_file_path).stem
+
+
+class ManifestoSRT:
+    """
+    Manifesto por SRT para redublagem incremental.
+
+    Cada legenda é identificada pelo hash do texto, voz e prosódia (a mesma chave do cache de síntese),
+    não pelo índice, então renumerar legendas não invalida nada. Para cada hash guarda o áudio bruto
+    do provedor e as renderizações já ajustadas, uma por duração alvo e motor de ajuste:
+      - texto/voz/prosódia mudou  -> hash novo, sintetiza de novo
+      - só o tempo mudou          -> reaproveita o bruto, só reajusta a velocidade
+      - nada mudou                -> reaproveita a renderização
+
+    SRTs diferentes com o mesmo nome (ex.: de usuários diferentes da interface) dividem o manifesto sem
+    conflito, porque as legendas são identificadas pelo hash; por isso podar só apaga o que ficou sem uso
+    por mais do que o TTL, e não o que a execução atual deixou de usar.
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = Path(diretorio)
+        self._arquivo = self.diretorio / "manifest.json"
+        self._legendas = {} # hash -> {"bruto": último uso, "renders": {nome do arquivo: último uso}}
+        self._usados = set() # Arquivos usados nesta execução (ganham o horário atual em podar)
+        try:
+            with open(self._arquivo, "r", encoding="utf-8") as f:
+                salvo = json.load(f)
+            if salvo.get("versao") == _VERSAO:
+                self._legendas = salvo.get("legendas", {})
+        except (OSError, ValueError):
+            pass
+
+    @classmethod
+    def para_srt(cls, srt_file_path, diretorio=None):
+        """Manifesto do SRT em diretorio ou, sem ele, na pasta padrão (ver diretorio_manifesto)."""
+        return cls(diretorio or diretorio_manifesto(srt_file_path))
+
+    def _caminho_bruto(self, chave):
+        return self.diretorio / "brutos" / f"{chave}.mp3"
+
+    def _caminho_render(self, chave, target_duration_ms, extensao, motor):
+        return self.diretorio / "renders" / f"{chave}_{motor}_{int(target_duration_ms)}{extensao}"
+
+    def bruto(self, chave):
+        """Bytes do áudio bruto da legenda, ou None se ainda não foi sintetizada."""
+        caminho = self._caminho_bruto(chave)
+        try:
+            dados = caminho.read_bytes()
+        except OSError:
+            return None
+        self._usar(chave, caminho.name)
+        return dados or None
+
+    def caminho_bruto(self, chave):
+        """Caminho do áudio bruto da legenda, ou None se ainda não foi sintetizada."""
+        caminho = self._caminho_bruto(chave)
+        if caminho.exists() and caminho.stat().st_size > 0:
+            self._usar(chave, caminho.name)
+            return caminho
+        return None
+
+    def salvar_bruto(self, chave, dados):
+        caminho = self._caminho_bruto(chave)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temp = caminho.with_name(f"{caminho.name}.{os.getpid()}.tmp")
+        temp.write_bytes(dados)
+        os.replace(temp, caminho)
+        self._usar(chave, caminho.name)
+
+    def render(self, chave, target_duration_ms, extensao, motor):
+        """Caminho da renderização já ajustada para essa duração pelo motor dado, ou None."""
+        caminho = self._caminho_render(chave, target_duration_ms, extensao, motor)
+        if caminho.name in self._legendas.get(chave, {}).get("renders", {}) and caminho.exists() and caminho.stat().st_size > 0:
+            # O bruto continua guardado para um futuro reajuste se só o tempo mudar
+            self._usar(chave, caminho.name, self._caminho_bruto(chave).name)
+            return caminho
+        return None
+
+    def novo_render(self, chave, target_duration_ms, extensao, motor):
+        """Reserva o caminho de uma renderização nova; chame registrar_render depois de escrevê-la."""
+        caminho = self._caminho_render(chave, target_duration_ms, extensao, motor)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        return caminho
+
+    def registrar_render(self, chave, caminho):
+        self._legendas.setdefault(chave, {"renders": {}})["renders"].setdefault(caminho.name, 0)
+        self._usar(chave, caminho.name)
+
+    def _usar(self, chave, *nomes):
+        # Também registra a legenda: um bruto lido de um manifesto de versão antiga não é perdido em podar
+        self._legendas.setdefault(chave, {"renders": {}})
+        self._usados.update(nomes)
+
+    def podar(self, ttl_horas=MANIFESTO_TTL_HORAS):
+        """Grava o manifesto e apaga os brutos e renderizações que nenhuma execução usou dentro do TTL."""
+        agora = int(time.time())
+        limite = agora - ttl_horas * 3600
+        manter = set()
+        for chave in list(self._legendas):
+            legenda = self._legendas[chave]
+            if f"{chave}.mp3" in self._usados:
+                legenda["bruto"] = agora
+            legenda["renders"] = {
+                nome: agora if nome in self._usados else usado
+                for nome, usado in legenda["renders"].items()
+                if nome in self._usados or usado >= limite
+            }
+            if legenda["renders"] or legenda.get("bruto", 0) >= limite:
+                manter.add(f"{chave}.mp3")
+                manter.update(legenda["renders"])
+            else:
+                del self._legendas[chave]
+        for pasta in ("brutos", "renders"):
+            for arquivo in (self.diretorio / pasta).glob("*"):
+                if arquivo.name not in manter:
+                    try:
+                        arquivo.unlink()
+                    except OSError:
+                        pass
+        self.salvar()
+
+    def salvar(self):
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        temp = self._arquivo.with_name(f"manifest.json.{os.getpid()}.tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump({"versao": _VERSAO, "legendas": self._legendas}, f, indent=1)
+        os.replace(temp, self._arquivo)
+
+
+_travas = {}
+_travas_lock = threading.Lock()
+
+def trava_manifesto(srt_file_path, diretorio=None):
+    """Trava do manifesto de um SRT, para duas execuções do mesmo SRT no mesmo processo não se atropelarem."""
+    chave = str(Path(diretorio or diretorio_manifesto(srt_file_path)).resolve())
+    with _travas_lock:
+        return _travas.setdefault(chave, threading.Lock())
+
+
+def _copiar_ou_linkar(origem, destino):
+    # Hard link quando possível (mesmo disco), senão cópia; o render do manifesto nunca é movido
+    destino = Path(destino)
+    if destino.exists():
+        destino.unlink()
+    try:
+        os.link(origem, destino)
+    except OSError:
+        shutil.copyfile(origem, destino)
+
+async def renderizar_legenda(manifesto, chave, target_duration_ms, obter_bruto, output_file=None, em_memoria=False, motor=None):
+    """
+    Produz o áudio de uma legenda já ajustado à duração alvo, reaproveitando o que o manifesto tiver.
+    motor escolhe o ajuste de velocidade ("ffmpeg" ou "numpy", ver utils.MOTORES_AJUSTE).
+
+    obter_bruto é uma corrotina sem argumentos que retorna o MP3 bruto do provedor (ou None).
+    Em memória retorna o PCM ajustado; em disco escreve output_file e retorna True.
+    Retorna None se não houver áudio. Sem manifesto, só ajusta (comportamento antigo).
+    """
+    extensao = ".npy" if em_memoria else ".mp3"
+    # Cada motor tem as suas renderizações: trocar de motor não reaproveita o resultado do outro
+    motor = escolher_motor_ajuste(motor)
+    # Legendas repetidas têm o mesmo hash e podem ser renderizadas ao mesmo tempo: temporários por legenda
+    sufixo_temp = Path(output_file).stem if output_file else str(os.getpid())
+    if manifesto is not None:
+        pronto = manifesto.render(chave, target_duration_ms, extensao, motor)
+        if pronto is not None:
+            if em_memoria:
+                return np.load(pronto)
+            _copiar_ou_linkar(pronto, output_file)
+            return True
+
+    dados = manifesto.bruto(chave) if manifesto is not None else None
+    if dados is None:
+        dados = await obter_bruto()
+        if not dados:
+            return None
+        if manifesto is not None:
+            manifesto.salvar_bruto(chave, dados)
+
+    if em_memoria:
+        # Em caso de falha lança exceção: nada vai para o manifesto e a legenda é refeita
+        amostras = await ajustar_velocidade_pcm(dados, target_duration_ms, motor=motor)
+        if manifesto is not None:
+            destino = manifesto.novo_render(chave, target_duration_ms, extensao, motor)
+            temp = destino.with_name(f"{destino.name}.{sufixo_temp}.tmp")
+            with open(temp, "wb") as f:
+                np.save(f, amostras)
+            os.replace(temp, destino)
+            manifesto.registrar_render(chave, destino)
+        return amostras
+
+    destino = manifesto.novo_render(chave, target_duration_ms, extensao, motor) if manifesto is not None else Path(output_file)
+    temp_file = destino.with_name(f"{destino.stem}_{sufixo_temp}_temp.mp3")
+    temp_file.write_bytes(dados)
+    try:
+        # Em caso de falha lança exceção sem escrever destino: nada vai para o manifesto e a legenda é refeita
+        await adjust_audio_speed(str(temp_file), str(destino), target_duration_ms, motor=motor)
+    finally:
+        # adjust_audio_speed pode ter apenas renomeado o arquivo temporário
+        if temp_file.exists():
+            os.remove(temp_file)
+    if manifesto is not None:
+        manifesto.registrar_render(chave, destino)
+        _copiar_ou_linkar(destino, output_file)
+    return True
+
+async def bruto_em_arquivo(manifesto, chave, obter_bruto, destino):
+    """
+    Para a montagem "ffmpeg" (ver utils.merge_audio_ffmpeg): o MP3 bruto da legenda num arquivo, sem
+    ajuste de velocidade. Com manifesto é o próprio bruto guardado nele; sem, é escrito em destino.
+    Retorna o caminho, ou None se não houver áudio.
+    """
+    caminho = manifesto.caminho_bruto(chave) if manifesto is not None else None
+    if caminho is not None:
+        return caminho
+    dados = await obter_bruto()
+    if not dados:
+        return None
+    if manifesto is not None:
+        manifesto.salvar_bruto(chave, dados)
+        return manifesto.caminho_bruto(chave)
+    destino = Path(destino)
+    destino.write_bytes(dados)
+    return destino
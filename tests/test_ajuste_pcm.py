@@ -0,0 +1,52 @@
+# tests/test_ajuste_pcm.py
+
+import asyncio
+
+import pytest
+
+import utils
+from srt_manifest import ManifestoSRT, renderizar_legenda
+
+# MP3 CBR mínimo (MPEG-1 Layer III, 128 kbps, 44.1 kHz, estéreo): só os cabeçalhos importam para analisar_mp3
+MP3 = (b"\xff\xfb\x90\x00" + b"\0" * 413) * 40
+
+
+class _ProcessoFalso:
+    def __init__(self, returncode, stdout=b"", stderr=b""):
+        self.returncode = returncode
+        self._saida = (stdout, stderr)
+
+    async def communicate(self, entrada=None):
+        return self._saida
+
+
+def _ffmpeg_falso(monkeypatch, processo):
+    async def criar(*args, **kwargs):
+        return processo
+    monkeypatch.setattr(utils.asyncio, "create_subprocess_exec", criar)
+
+
+@pytest.mark.parametrize("motor", ["ffmpeg", "numpy"])
+def test_falha_do_ffmpeg_lanca_em_vez_de_devolver_silencio(monkeypatch, motor):
+    _ffmpeg_falso(monkeypatch, _ProcessoFalso(1, stderr=b"falhou"))
+    with pytest.raises(RuntimeError):
+        asyncio.run(utils.ajustar_velocidade_pcm(MP3, 1500, motor=motor))
+
+
+def test_decodificacao_vazia_lanca(monkeypatch):
+    _ffmpeg_falso(monkeypatch, _ProcessoFalso(0))
+    with pytest.raises(RuntimeError):
+        asyncio.run(utils.ajustar_velocidade_pcm(MP3, 1500))
+
+
+def test_falha_em_memoria_nao_vai_para_o_manifesto(monkeypatch, tmp_path):
+    _ffmpeg_falso(monkeypatch, _ProcessoFalso(1, stderr=b"falhou"))
+    manifesto = ManifestoSRT(tmp_path / "manifesto")
+
+    async def obter_bruto():
+        return MP3
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(renderizar_legenda(manifesto, "chave", 1500, obter_bruto, em_memoria=True, motor="ffmpeg"))
+    assert manifesto.render("chave", 1500, ".npy", "ffmpeg") is None
+    assert not (tmp_path / "manifesto" / "renders").exists()
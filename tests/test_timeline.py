@@ -0,0 +1,29 @@
+# tests/test_timeline.py
+
+import numpy as np
+
+from utils import MontadorLinhaDoTempo
+
+
+def test_trecho_que_estoura_seguido_de_legenda_ausente():
+    # Linha do tempo de 2000 ms: a 1ª legenda estoura 30 ms e a seguinte (ausente) empurra o cursor além do buffer
+    montador = MontadorLinhaDoTempo(2000)
+    frame_rate = montador.frame_rate
+    montador.adicionar(0, 1000, np.ones((int(frame_rate * 1.03), 1), dtype=np.int16))
+    montador.adicionar(1000, 2000)
+    audio = montador.para_audio_segment()
+    assert len(audio) == 2030
+    dados = np.frombuffer(audio.raw_data, dtype=np.int16)
+    assert dados[:int(frame_rate * 1.03)].all()
+    assert not dados[int(frame_rate * 1.03):].any()
+
+
+def test_trecho_depois_de_legenda_ausente_alem_do_buffer():
+    montador = MontadorLinhaDoTempo(1000)
+    frame_rate = montador.frame_rate
+    montador.adicionar(0, 1000, np.ones((int(frame_rate * 1.1), 1), dtype=np.int16))
+    montador.adicionar(1000, 1500)
+    montador.adicionar(1600, 2000, np.full((int(frame_rate * 0.4), 1), 2, dtype=np.int16))
+    dados = np.frombuffer(montador.para_audio_segment().raw_data, dtype=np.int16)
+    assert len(dados) == int(frame_rate * 1.1) + int(frame_rate * 0.5) + int(frame_rate * 0.4)
+    assert (dados[-int(frame_rate * 0.4):] == 2).all()
@@ -8,14 +8,21 @@ import asyncio
 import pysrt
 from tqdm import tqdm
 import shutil
+import requests
+from pydub import AudioSegment
 
 # Importa funções utilitárias
-from utils import remove_silence, timetoms, merge_audio_files, adjust_audio_speed
+from utils import remove_silence, timetoms, merge_audio_files, merge_audio_pcm, merge_audio_ffmpeg, escolher_montagem
+from tts_cache import get_cache, chave_cache
+from voice_registry import get_registro
+from srt_manifest import ManifestoSRT, renderizar_legenda, bruto_em_arquivo, trava_manifesto
+from metrics import medir, contar, registrar_coletor
+from adaptive_limiter import get_limitador, espera_retentativa
 
 # --- Configuração e Imports da Biblioteca TikTok ---
 try:
     sys.path.append(str(Path(__file__).parent / "TikTok_TTS"))
-    from TikTok_TTS.tiktok_voice import Voice, tts
+    from TikTok_TTS.tiktok_voice import Voice, tts, tts_async, create_async_session, health_snapshot, configure_limiter
     TIKTOK_TTS_AVAILABLE = True
     print("Biblioteca TikTok TTS carregada com sucesso.")
 except ImportError:
@@ -23,72 +30,58 @@ except ImportError:
     print("Aviso: Biblioteca TikTok TTS não encontrada. A funcionalidade estará desabilitada.")
     class Voice: pass
     def tts(*args, **kwargs): pass
+    async def tts_async(*args, **kwargs): pass
 
-# --- DICIONÁRIO DE VOZES CATEGORIZADAS ---
-TIKTOK_VOICES_CATEGORIZED = {
-    'Português (Brasil)': [
-        'BR_FEMALE_1', 'BR_FEMALE_2', 'BR_FEMALE_3', 'BR_MALE', 
-        'BP_FEMALE_IVETE', 'BP_FEMALE_LUDMILLA', 'PT_FEMALE_LHAYS', 'PT_FEMALE_LAIZZA', 'PT_MALE_BUENO'
-    ],
-    'Inglês (EUA)': [
-        'US_FEMALE_1', 'US_FEMALE_2', 'US_MALE_1', 'US_MALE_2', 'US_MALE_3', 'US_MALE_4'
-    ],
-    'Inglês (Reino Unido)': ['UK_MALE_1', 'UK_MALE_2'],
-    'Inglês (Austrália)': ['AU_FEMALE_1', 'AU_MALE_1'],
-    'Inglês (Personagens Especiais)': [
-        'MALE_JOMBOY', 'MALE_CODY', 'FEMALE_SAMC', 'FEMALE_MAKEUP', 'FEMALE_RICHGIRL', 
-        'MALE_ASHMAGIC', 'MALE_OLANTERKKERS', 'MALE_UKNEIGHBOR', 'MALE_UKBUTLER', 
-        'FEMALE_SHENNA', 'FEMALE_PANSINO', 'MALE_TREVOR', 'FEMALE_BETTY', 'MALE_CUPID', 
-        'FEMALE_GRANDMA', 'MALE_NARRATION', 'MALE_FUNNY', 'FEMALE_EMOTIONAL'
-    ],
-    'Inglês Personagens (Filmes e Outros)': [
-        'GHOSTFACE', 'CHEWBACCA', 'C3PO', 'STITCH', 'STORMTROOPER', 'ROCKET', 
-        'MADAME_LEOTA', 'GHOST_HOST', 'PIRATE', 'MALE_GRINCH', 'MALE_DEADPOOL', 'MALE_JARVIS'
-    ],
-    'Inglês Personagens (Festivos)': [
-        'MALE_XMXS_CHRISTMAS', 'MALE_SANTA_NARRATION', 'MALE_SANTA_EFFECT', 
-        'FEMALE_HT_NEYEAR', 'MALE_WIZARD', 'FEMALE_HT_HALLOWEEN'
-    ],
-    'Inglês Cantores / Músicas': [
-        'MALE_SING_DEEP_JINGLE', 'SING_FEMALE_ALTO', 'SING_MALE_TENOR', 'SING_FEMALE_WARMY_BREEZE',
-        'SING_MALE_SUNSHINE_SOON', 'SING_FEMALE_GLORIOUS', 'SING_MALE_IT_GOES_UP', 
-        'SING_MALE_CHIPMUNK', 'SING_FEMALE_WONDERFUL_WORLD', 'SING_MALE_FUNNY_THANKSGIVING'
-    ],
-    'Japonês': [
-        'JP_FEMALE_1', 'JP_FEMALE_2', 'JP_FEMALE_3', 'JP_MALE', 'JP_FEMALE_FUJICOCHAN', 
-        'JP_FEMALE_HASEGAWARIONA', 'JP_MALE_KEIICHINAKANO', 'JP_FEMALE_OOMAEAIIKA', 
-        'JP_MALE_YUJINCHIGUSA', 'JP_FEMALE_SHIROU', 'JP_MALE_TAMAWAKAZUKI', 
-        'JP_FEMALE_KAORISHOJI', 'JP_FEMALE_YAGISHAKI', 'JP_MALE_HIKAKIN', 'JP_FEMALE_REI',
-        'JP_MALE_SHUICHIRO', 'JP_MALE_MATSUDAKE', 'JP_FEMALE_MACHIKORIIITA', 
-        'JP_MALE_MATSUO', 'JP_MALE_OSADA'
-    ],
-    'Coreano': ['KR_MALE_1', 'KR_FEMALE', 'KR_MALE_2'],
-    'Espanhol': ['ES_MALE', 'ES_MX_MALE'],
-    'Francês': ['FR_MALE_1', 'FR_MALE_2'],
-    'Alemão': ['DE_FEMALE', 'DE_MALE'],
-    'Indonésio': ['ID_FEMALE']
-}
+TIKTOK_CONNECTION_ERROR_MSG = "Não foi possível conectar aos servidores do TikTok TTS. Verifique sua conexão ou tente novamente mais tarde."
+
+def _metricas_endpoints():
+    """Requisições, falhas e estado do circuito de cada endpoint do TikTok, lidos da própria biblioteca."""
+    for url, estado in health_snapshot().items():
+        yield "endpoint_requisicoes_total", "counter", {"endpoint": url}, estado["requests"]
+        yield "endpoint_falhas_total", "counter", {"endpoint": url}, estado["failures"]
+        yield "endpoint_circuito_aberto", "gauge", {"endpoint": url}, int(estado["circuit_open"])
+
+if TIKTOK_TTS_AVAILABLE:
+    registrar_coletor(_metricas_endpoints)
+    # Cada endpoint do TikTok tem seu próprio limitador adaptativo, compartilhado por todos os controladores
+    configure_limiter(lambda url: get_limitador("tiktok", url))
 
 def get_tiktok_voice_options(language):
-    return TIKTOK_VOICES_CATEGORIZED.get(language, [])
+    return get_registro().vozes_tiktok(language)
 
 # --- Função Controladora de Texto/Arquivo ---
-def controlador_generate_audio_tiktok(voice_str, text, text_file, cut_silence):
+def controlador_generate_audio_tiktok(voice_str, text, text_file, cut_silence, output_file=None):
     if not TIKTOK_TTS_AVAILABLE:
         raise gr.Error("A biblioteca TikTok TTS não está instalada ou configurada corretamente.")
     if not text and text_file is None:
         raise gr.Error("Por favor, forneça um texto ou um arquivo .txt para gerar o áudio.")
 
-    output_dir = "output"; os.makedirs(output_dir, exist_ok=True)
-    output_file = os.path.join(output_dir, "tiktok_audio.mp3")
+    if output_file is None:
+        output_file = os.path.join("output", "tiktok_audio.mp3")
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
     input_text = text if text else Path(text_file.name).read_text(encoding='utf-8')
     
+    cache = get_cache()
+    chave = chave_cache("tiktok", voice_str, input_text)
+    
     try:
-        print(f"Gerando áudio com a voz TikTok: {voice_str}...")
-        tts(input_text, Voice[voice_str], output_file)
-        print("Áudio TikTok gerado com sucesso!")
+        if cache and cache.copiar_para(chave, output_file):
+            print("Áudio TikTok encontrado no cache.")
+        else:
+            print(f"Gerando áudio com a voz TikTok: {voice_str}...")
+            try:
+                with medir("sintese", provedor="tiktok"):
+                    tts(input_text, Voice[voice_str], output_file)
+            except Exception:
+                contar("falhas_sintese", provedor="tiktok")
+                raise
+            print("Áudio TikTok gerado com sucesso!")
+            if cache: cache.salvar_arquivo(chave, output_file)
         if cut_silence:
-            print("Removendo silêncio do áudio TikTok..."); remove_silence(output_file, output_file); print("Silêncio removido.")
+            print("Removendo silêncio do áudio TikTok...")
+            with medir("remover_silencio"):
+                remove_silence(output_file, output_file)
+            print("Silêncio removido.")
         return output_file
     
     except requests.exceptions.RequestException as e:
@@ -102,45 +95,106 @@ def controlador_generate_audio_tiktok(voice_str, text, text_file, cut_silence):
 
 # --- NOVA LÓGICA DE PROCESSAMENTO DE SRT PARA TIKTOK ---
 
-async def process_srt_file_tiktok(srt_file_path, voice_str, output_dir_str, srt_temp_deleta, progress=None):
+# Número padrão de legendas em andamento ao mesmo tempo no TikTok (são corrotinas, não threads);
+# as requisições a cada endpoint são limitadas pelo limitador adaptativo
+SRT_MAX_CONCORRENCIA_TIKTOK = 32
+
+async def process_srt_file_tiktok(srt_file_path, voice_str, output_dir_str, srt_temp_deleta, progress=None, max_concorrencia=SRT_MAX_CONCORRENCIA_TIKTOK, em_memoria=False, output_file=None, incremental=True, manifesto_dir=None, motor_ajuste=None, montagem=None):
+    """Gera o áudio sincronizado de um SRT com o TikTok. em_memoria, incremental, motor_ajuste e montagem funcionam como no process_srt_file do Edge-TTS."""
+    montagem = escolher_montagem(montagem)
     subs = pysrt.open(srt_file_path)
     output_dir = Path(output_dir_str)
-    output_dir.mkdir(parents=True, exist_ok=True)
+    if not em_memoria or montagem == "ffmpeg":
+        output_dir.mkdir(parents=True, exist_ok=True)
     max_retries = 3 # Número de tentativas para cada legenda
-
-    with tqdm(total=len(subs), desc="Gerando e ajustando áudios com TikTok", unit="segmento") as pbar:
-        for sub in subs:
-            output_file = output_dir / f"{sub.index:02d}.mp3"
-            temp_file = output_dir / f"{sub.index:02d}_temp.mp3"
-            target_duration_ms = timetoms(sub.end) - timetoms(sub.start)
-
-            if not output_file.exists() or output_file.stat().st_size == 0:
-                success = False
-                for attempt in range(max_retries):
-                    try:
-                        await asyncio.to_thread(tts, sub.text, Voice[voice_str], str(temp_file))
-                        
-                        if temp_file.exists() and temp_file.stat().st_size > 0:
-                            await adjust_audio_speed(str(temp_file), str(output_file), target_duration_ms)
-                            os.remove(temp_file)
-                            success = True
-                            break
-                        else:
-                            print(f"Aviso: Tentativa {attempt + 1} para o índice {sub.index} (TikTok) falhou. Retentando...")
-
-                    except Exception as e:
-                        print(f"Aviso: Tentativa {attempt + 1} para o índice {sub.index} (TikTok) falhou com erro: {e}. Retentando...")
+    num_workers = max(1, int(max_concorrencia or 1))
+    cache = get_cache()
+    audios = {} # Modo em memória: índice da legenda -> PCM já ajustado
+    brutos = {} # Montagem "ffmpeg": índice da legenda -> caminho do MP3 bruto
+    manifesto = ManifestoSRT.para_srt(srt_file_path, manifesto_dir) if incremental else None
+
+    async def processar_legenda(sub, session):
+        legenda_file = output_dir / f"{sub.index:02d}.mp3"
+        target_duration_ms = timetoms(sub.end) - timetoms(sub.start)
+        # Chave do cache e do manifesto, usada também pelo obter_bruto abaixo
+        chave = chave_cache("tiktok", voice_str, sub.text)
+
+        async def obter_bruto():
+            dados = cache.get(chave) if cache else None
+            if dados is None:
+                try:
+                    with medir("sintese", provedor="tiktok"):
+                        dados = await tts_async(sub.text, Voice[voice_str], None, session=session)
+                except Exception:
+                    contar("falhas_sintese", provedor="tiktok")
+                    raise
+                if not dados:
+                    contar("falhas_sintese", provedor="tiktok")
+                elif cache: cache.put(chave, dados)
+            return dados
+
+        if em_memoria or manifesto is not None or montagem == "ffmpeg" or not legenda_file.exists() or legenda_file.stat().st_size == 0:
+            success = False
+            for attempt in range(max_retries):
+                try:
+                    if montagem == "ffmpeg":
+                        resultado = await bruto_em_arquivo(manifesto, chave, obter_bruto, output_dir / f"{sub.index:02d}_bruto.mp3")
+                    else:
+                        resultado = await renderizar_legenda(manifesto, chave, target_duration_ms, obter_bruto, legenda_file, em_memoria, motor_ajuste)
                     
-                    await asyncio.sleep(1)
-
-                if not success:
-                    print(f"ERRO: Todas as {max_retries} tentativas (TikTok) falharam para o índice {sub.index}. Gerando silêncio.")
+                    if resultado is not None:
+                        if montagem == "ffmpeg":
+                            brutos[sub.index] = resultado
+                        elif em_memoria:
+                            audios[sub.index] = resultado
+                        success = True
+                        break
+                    else:
+                        print(f"Aviso: Tentativa {attempt + 1} para o índice {sub.index} (TikTok) falhou. Retentando...")
+
+                except Exception as e:
+                    print(f"Aviso: Tentativa {attempt + 1} para o índice {sub.index} (TikTok) falhou com erro: {e}. Retentando...")
+                
+                contar("retentativas", provedor="tiktok")
+                if attempt + 1 < max_retries:
+                    await asyncio.sleep(espera_retentativa(attempt))
+
+            if not success:
+                print(f"ERRO: Todas as {max_retries} tentativas (TikTok) falharam para o índice {sub.index}. Gerando silêncio.")
+                contar("silencio", provedor="tiktok")
+                if not em_memoria and montagem != "ffmpeg":
                     silent_segment = AudioSegment.silent(duration=target_duration_ms)
-                    silent_segment.export(str(output_file), format="mp3")
-
+                    silent_segment.export(str(legenda_file), format="mp3")
+
+    async def worker(fila, session, pbar):
+        # Cada worker mantém uma legenda em andamento; N workers = N legendas em paralelo
+        while True:
+            try:
+                sub = fila.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await processar_legenda(sub, session)
             pbar.update(1)
 
-    final_audio = await merge_audio_files(output_dir, srt_file_path)
+    fila = asyncio.Queue()
+    for sub in subs:
+        fila.put_nowait(sub)
+
+    # Uma única sessão HTTP assíncrona é compartilhada por todas as legendas (conexões keep-alive)
+    async with create_async_session(limit_per_host=num_workers) as session:
+        with tqdm(total=len(subs), desc="Gerando e ajustando áudios com TikTok", unit="segmento") as pbar:
+            await asyncio.gather(*(worker(fila, session, pbar) for _ in range(min(num_workers, len(subs)))))
+
+    if manifesto is not None:
+        manifesto.podar()
+
+    if montagem == "ffmpeg":
+        final_audio = await merge_audio_ffmpeg(brutos, srt_file_path, output_file)
+    elif em_memoria:
+        return await merge_audio_pcm(audios, srt_file_path, output_file)
+    else:
+        # Os arquivos são nomeados pelo índice da legenda, então a mesclagem continua na ordem do SRT
+        final_audio = await merge_audio_files(output_dir, srt_file_path, output_file)
     
     if srt_temp_deleta:
         shutil.rmtree(output_dir, ignore_errors=True)
@@ -148,13 +202,16 @@ async def process_srt_file_tiktok(srt_file_path, voice_str, output_dir_str, srt_
     
     return final_audio
 
-def controlador_process_srt_file_tiktok(srt_file, voice_str, srt_temp_deleta, progress=None):
+def controlador_process_srt_file_tiktok(srt_file, voice_str, srt_temp_deleta, progress=None, max_concorrencia=SRT_MAX_CONCORRENCIA_TIKTOK, em_memoria=False, incremental=True, output_dir=None, output_file=None, motor_ajuste=None, montagem=None):
+    if not TIKTOK_TTS_AVAILABLE:
+        raise gr.Error("A biblioteca TikTok TTS não está instalada ou configurada corretamente.")
     if not srt_file: return None
-    srt_filename_stem = Path(srt_file.name).stem
-    output_dir = f"output/srt_temp_{srt_filename_stem}"
+    if output_dir is None:
+        output_dir = f"output/srt_temp_{Path(srt_file.name).stem}"
     
     try:
-        return asyncio.run(process_srt_file_tiktok(srt_file.name, voice_str, output_dir, srt_temp_deleta, progress=progress))
+        with trava_manifesto(srt_file.name):
+            return asyncio.run(process_srt_file_tiktok(srt_file.name, voice_str, output_dir, srt_temp_deleta, progress=progress, max_concorrencia=max_concorrencia, em_memoria=em_memoria, output_file=output_file, incremental=incremental, motor_ajuste=motor_ajuste, montagem=montagem))
     
     except requests.exceptions.RequestException as e:
         print(f"!!! TIKTOK TTS NETWORK ERROR (SRT): {e}")
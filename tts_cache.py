@@ -0,0 +1,147 @@
+# tts_cache.py
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from metrics import contar
+
+# --- Configuração (pode ser sobrescrita por variáveis de ambiente) ---
+CACHE_DIR = os.environ.get("QUICKTTS_CACHE_DIR", os.path.join("output", "cache"))
+CACHE_MAX_MB = int(os.environ.get("QUICKTTS_CACHE_MAX_MB", "1024"))
+# Camada opcional em memória; 0 desativa
+CACHE_MEMORIA_MAX_MB = int(os.environ.get("QUICKTTS_CACHE_MEMORIA_MB", "0"))
+CACHE_ATIVO = os.environ.get("QUICKTTS_CACHE", "1") != "0"
+
+def chave_cache(provider, voice, text, **params):
+    """Gera a chave (sha256) que identifica um áudio pelo provedor, voz, texto e parâmetros de prosódia."""
+    payload = json.dumps([provider, voice, text, sorted(params.items())], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheSintese:
+    """Cache de áudios sintetizados em disco, com despejo LRU limitado por tamanho e camada opcional em memória."""
+
+    def __init__(self, diretorio=CACHE_DIR, max_bytes=CACHE_MAX_MB * 1024 * 1024, memoria_max_bytes=CACHE_MEMORIA_MAX_MB * 1024 * 1024):
+        self.diretorio = Path(diretorio)
+        self.max_bytes = max_bytes
+        self.memoria_max_bytes = memoria_max_bytes
+        self._lock = threading.Lock()
+        self._indice = None # chave -> tamanho em bytes, do menos para o mais recentemente usado
+        self._total_bytes = 0
+        self._memoria = OrderedDict()
+        self._memoria_bytes = 0
+
+    def _caminho(self, chave):
+        return self.diretorio / chave[:2] / f"{chave}.mp3"
+
+    def _carregar_indice(self):
+        # Reconstrói o índice LRU a partir do disco usando o mtime como "último uso"
+        if self._indice is not None:
+            return
+        entradas = []
+        if self.diretorio.exists():
+            for arquivo in self.diretorio.glob("*/*.mp3"):
+                try:
+                    st = arquivo.stat()
+                except OSError:
+                    continue
+                entradas.append((st.st_mtime, arquivo.stem, st.st_size))
+        entradas.sort()
+        self._indice = OrderedDict((chave, tamanho) for _, chave, tamanho in entradas)
+        self._total_bytes = sum(self._indice.values())
+
+    def _guardar_memoria(self, chave, dados):
+        if self.memoria_max_bytes <= 0 or len(dados) > self.memoria_max_bytes:
+            return
+        if chave in self._memoria:
+            self._memoria_bytes -= len(self._memoria.pop(chave))
+        self._memoria[chave] = dados
+        self._memoria_bytes += len(dados)
+        while self._memoria_bytes > self.memoria_max_bytes:
+            _, antigo = self._memoria.popitem(last=False)
+            self._memoria_bytes -= len(antigo)
+
+    def _despejar(self):
+        while self._total_bytes > self.max_bytes and self._indice:
+            chave, tamanho = self._indice.popitem(last=False)
+            self._total_bytes -= tamanho
+            try:
+                os.remove(self._caminho(chave))
+            except OSError:
+                pass
+
+    def get(self, chave):
+        """Retorna os bytes do áudio em cache, ou None se não existir."""
+        dados = self._get(chave)
+        contar("cache", resultado="falta" if dados is None else "acerto")
+        return dados
+
+    def _get(self, chave):
+        with self._lock:
+            dados = self._memoria.get(chave)
+            if dados is not None:
+                self._memoria.move_to_end(chave)
+                return dados
+            self._carregar_indice()
+            if chave not in self._indice:
+                return None
+            caminho = self._caminho(chave)
+            try:
+                dados = caminho.read_bytes()
+                os.utime(caminho) # Marca como usado recentemente
+            except OSError:
+                self._total_bytes -= self._indice.pop(chave)
+                return None
+            self._indice.move_to_end(chave)
+            self._guardar_memoria(chave, dados)
+            return dados
+
+    def put(self, chave, dados):
+        """Guarda os bytes de um áudio no cache, despejando os menos usados se passar do limite."""
+        if not dados:
+            return
+        with self._lock:
+            self._carregar_indice()
+            caminho = self._caminho(chave)
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            temp = caminho.with_name(f"{caminho.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            temp.write_bytes(dados)
+            os.replace(temp, caminho)
+            if chave in self._indice:
+                self._total_bytes -= self._indice.pop(chave)
+            self._indice[chave] = len(dados)
+            self._total_bytes += len(dados)
+            self._guardar_memoria(chave, dados)
+            self._despejar()
+
+    def copiar_para(self, chave, destino):
+        """Escreve o áudio em cache no arquivo de destino. Retorna True em caso de acerto."""
+        dados = self.get(chave)
+        if dados is None:
+            return False
+        Path(destino).write_bytes(dados)
+        return True
+
+    def salvar_arquivo(self, chave, origem):
+        """Guarda no cache o conteúdo de um arquivo de áudio recém-gerado."""
+        origem = Path(origem)
+        if origem.exists() and origem.stat().st_size > 0:
+            self.put(chave, origem.read_bytes())
+
+
+_cache_padrao = None
+_cache_padrao_lock = threading.Lock()
+
+def get_cache():
+    """Retorna o cache compartilhado por todos os controladores, ou None se estiver desativado."""
+    global _cache_padrao
+    if not CACHE_ATIVO:
+        return None
+    with _cache_padrao_lock:
+        if _cache_padrao is None:
+            _cache_padrao = CacheSintese()
+        return _cache_padrao
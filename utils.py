@@ -2,60 +2,309 @@
 
 import os
 import subprocess
+import tempfile
 from pathlib import Path
 from pydub import AudioSegment
-from pydub.silence import split_on_silence
 import pysrt
 from tqdm import tqdm
 import asyncio
+import numpy as np
 
-def remove_silence(input_file, output_file):
+from metrics import medir, contar
+
+# Tamanho (em ms de áudio) de cada bloco lido do FFmpeg ao remover silêncio; limita o uso de memória
+SILENCIO_BLOCO_MS = 10000
+# Motor do ajuste de velocidade das legendas: "ffmpeg" (filtro atempo) ou "numpy" (WSOLA no próprio processo)
+MOTORES_AJUSTE = ("ffmpeg", "numpy")
+MOTOR_AJUSTE = os.environ.get("QUICKTTS_MOTOR_AJUSTE", "ffmpeg")
+# Montagem do SRT: "montador" (cada legenda é ajustada e o MontadorLinhaDoTempo junta tudo) ou
+# "ffmpeg" (os áudios brutos vão direto para um único grafo filter_complex, que ajusta, posiciona e mistura)
+MONTAGENS = ("montador", "ffmpeg")
+MONTAGEM = os.environ.get("QUICKTTS_MONTAGEM", "montador")
+# Máximo de legendas por grafo na montagem "ffmpeg" (cada uma é uma entrada, ou seja, um arquivo aberto)
+RENDER_LOTE = int(os.environ.get("QUICKTTS_RENDER_LOTE", "256"))
+
+def escolher_motor_ajuste(motor):
+    """Valida o motor de ajuste pedido; sem ele vale QUICKTTS_MOTOR_AJUSTE."""
+    motor = (motor or MOTOR_AJUSTE).lower()
+    if motor not in MOTORES_AJUSTE:
+        raise ValueError(f"Motor de ajuste inválido: {motor} (use {' ou '.join(MOTORES_AJUSTE)}).")
+    return motor
+
+def escolher_montagem(montagem):
+    """Valida a montagem pedida; sem ela vale QUICKTTS_MONTAGEM."""
+    montagem = (montagem or MONTAGEM).lower()
+    if montagem not in MONTAGENS:
+        raise ValueError(f"Montagem inválida: {montagem} (use {' ou '.join(MONTAGENS)}).")
+    return montagem
+
+def _energia_por_ms(amostras, frame_rate, primeiro_ms):
+    """
+    Soma dos quadrados por milissegundo completo de um bloco PCM (amostras, canais) que começa no ms 'primeiro_ms'.
+    Retorna (energias, contagens, amostras_consumidas); o resto do bloco fica para o próximo.
+    """
+    inicio = primeiro_ms * frame_rate // 1000
+    fim_bloco = inicio + len(amostras)
+    # Maior ms cujo limite inicial ainda cabe no bloco (ms * frame_rate // 1000 <= fim_bloco)
+    ultimo_ms = ((fim_bloco + 1) * 1000 - 1) // frame_rate
+    if ultimo_ms <= primeiro_ms:
+        return np.zeros(0), np.zeros(0), 0
+    limites = np.arange(primeiro_ms, ultimo_ms + 1, dtype=np.int64) * frame_rate // 1000 - inicio
+    energia_frames = np.square(amostras[:limites[-1]].astype(np.float64)).sum(axis=1)
+    energias = np.add.reduceat(energia_frames, limites[:-1]) if len(energia_frames) else np.zeros(len(limites) - 1)
+    contagens = np.diff(limites) * amostras.shape[1]
+    return energias, contagens, int(limites[-1])
+
+def _trechos_mantidos(energias, contagens, min_silence_len, silence_thresh, keep_silence):
+    """
+    Mesma regra do split_on_silence do pydub, vetorizada sobre a energia por ms: uma janela de
+    min_silence_len ms com RMS abaixo de silence_thresh (dBFS) é silêncio; cada trecho com som
+    mantém keep_silence ms de cada lado. Retorna a lista de intervalos (início_ms, fim_ms) mantidos.
+    """
+    total_ms = len(energias)
+    if total_ms == 0:
+        return []
+    if total_ms < min_silence_len:
+        return [(0, total_ms)]
+
+    limiar = (10 ** (silence_thresh / 20)) * 32768 # Amplitude máxima de áudio 16 bits
+    soma_energia = np.concatenate(([0.0], np.cumsum(energias)))
+    soma_contagem = np.concatenate(([0], np.cumsum(contagens)))
+    energia_janela = soma_energia[min_silence_len:] - soma_energia[:-min_silence_len]
+    contagem_janela = np.maximum(soma_contagem[min_silence_len:] - soma_contagem[:-min_silence_len], 1)
+    inicio_silencio = np.sqrt(energia_janela / contagem_janela) < limiar
+
+    # Um ms é silêncio se alguma janela silenciosa o cobre
+    coberturas = np.concatenate(([0], np.cumsum(inicio_silencio)))
+    ms = np.arange(total_ms)
+    fim_janelas = np.minimum(ms + 1, len(inicio_silencio))
+    inicio_janelas = np.clip(ms - min_silence_len + 1, 0, len(inicio_silencio))
+    com_som = (coberturas[fim_janelas] - coberturas[inicio_janelas]) == 0
+    if not com_som.any():
+        return []
+
+    # Dilata os trechos com som em keep_silence ms para cada lado
+    somas = np.concatenate(([0], np.cumsum(com_som)))
+    manter = (somas[np.minimum(ms + keep_silence + 1, total_ms)] - somas[np.maximum(ms - keep_silence, 0)]) > 0
+
+    bordas = np.diff(np.concatenate(([0], manter.astype(np.int8), [0])))
+    return list(zip(np.nonzero(bordas == 1)[0].tolist(), np.nonzero(bordas == -1)[0].tolist()))
+
+def remove_silence(input_file, output_file, min_silence_len=500, silence_thresh=-40, keep_silence=250):
     """Lê um arquivo MP3, remove o silêncio e salva como MP3 com alta qualidade, mantendo pequenas pausas."""
-    audio = AudioSegment.from_mp3(input_file)
-    segments = split_on_silence(
-        audio,
-        min_silence_len=500,
-        silence_thresh=-40,
-        keep_silence=250
-    )
-    non_silent_audio = AudioSegment.silent(duration=0)
-    for segment in segments:
-        non_silent_audio += segment
-    non_silent_audio.export(output_file, format="mp3", bitrate="192k")
+    with open(input_file, "rb") as f:
+        info = analisar_mp3(f.read(64 * 1024)) # Só o começo, para descobrir taxa e canais
+    frame_rate, channels = (info[1], info[2]) if info else (44100, 2)
+    bytes_por_amostra = 2 * channels
+
+    # 1ª passada: decodifica em blocos, calcula a energia por ms e guarda o PCM num arquivo temporário
+    energias, contagens = [], []
+    with tempfile.TemporaryFile() as pcm:
+        decoder = subprocess.Popen(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", str(input_file),
+             "-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(frame_rate), "-ac", str(channels), "pipe:1"],
+            stdout=subprocess.PIPE
+        )
+        tamanho_bloco = SILENCIO_BLOCO_MS * frame_rate // 1000 * bytes_por_amostra
+        resto = np.zeros((0, channels), dtype=np.int16)
+        ms_atual = 0
+        total_amostras = 0
+        while True:
+            dados = decoder.stdout.read(tamanho_bloco)
+            if not dados:
+                break
+            dados = dados[:len(dados) - len(dados) % bytes_por_amostra]
+            pcm.write(dados)
+            bloco = np.frombuffer(dados, dtype=np.int16).reshape(-1, channels)
+            total_amostras += len(bloco)
+            bloco = np.concatenate((resto, bloco)) if len(resto) else bloco
+            e, c, consumidas = _energia_por_ms(bloco, frame_rate, ms_atual)
+            energias.append(e)
+            contagens.append(c)
+            ms_atual += len(e)
+            resto = bloco[consumidas:]
+        decoder.wait()
+        if decoder.returncode != 0:
+            raise RuntimeError(f"FFmpeg não conseguiu decodificar {input_file}.")
+
+        trechos = _trechos_mantidos(
+            np.concatenate(energias) if energias else np.zeros(0),
+            np.concatenate(contagens) if contagens else np.zeros(0),
+            min_silence_len, silence_thresh, keep_silence
+        )
+
+        # 2ª passada: copia só os trechos mantidos do PCM temporário para o codificador, em blocos
+        temp_output = f"{output_file}.tmp.mp3"
+        encoder = subprocess.Popen(
+            ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-f", "s16le", "-ar", str(frame_rate),
+             "-ac", str(channels), "-i", "pipe:0", "-b:a", "192k", temp_output],
+            stdin=subprocess.PIPE
+        )
+        try:
+            for inicio_ms, fim_ms in trechos:
+                inicio = inicio_ms * frame_rate // 1000
+                # O último ms também leva as amostras que sobraram depois do último ms completo
+                fim = total_amostras if fim_ms >= ms_atual else fim_ms * frame_rate // 1000
+                pcm.seek(inicio * bytes_por_amostra)
+                restante = (fim - inicio) * bytes_por_amostra
+                while restante > 0:
+                    dados = pcm.read(min(tamanho_bloco, restante))
+                    if not dados:
+                        break
+                    encoder.stdin.write(dados)
+                    restante -= len(dados)
+        finally:
+            encoder.stdin.close()
+            encoder.wait()
+    if encoder.returncode != 0:
+        raise RuntimeError(f"FFmpeg não conseguiu codificar {output_file}.")
+    os.replace(temp_output, output_file)
 
 def timetoms(time_obj):
     """Converte um objeto de tempo do Pysrt para milissegundos."""
     return time_obj.hours * 3600000 + time_obj.minutes * 60000 + time_obj.seconds * 1000 + time_obj.milliseconds
 
-# --- VERSÃO COMPLETAMENTE NOVA E ROBUSTA ---
-async def adjust_audio_speed(input_file, output_file, target_duration_ms):
-    """Ajusta a velocidade do áudio usando o filtro 'atempo' do FFmpeg para máxima qualidade."""
-    
-    # Usa ffprobe para obter a duração exata, é mais confiável que pydub
-    try:
-        probe_cmd = [
-            "ffprobe", "-v", "error", "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1", input_file
-        ]
-        result = subprocess.run(probe_cmd, capture_output=True, text=True, check=True)
-        original_duration_ms = float(result.stdout.strip()) * 1000
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        # Fallback para pydub se ffprobe não estiver disponível ou falhar
-        original_duration_ms = len(AudioSegment.from_mp3(input_file))
+# --- Leitura de Duração de MP3 (sem ffprobe) ---
+# Tabelas de bitrate (kbps) por (versão MPEG, camada); MPEG 2 e 2.5 compartilham a mesma tabela
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 25: (11025, 12000, 8000)}
 
-    if original_duration_ms == 0 or target_duration_ms <= 0:
-        silent_audio = AudioSegment.silent(duration=target_duration_ms)
-        silent_audio.export(output_file, format="mp3", bitrate="192k")
-        return silent_audio
+def _ler_cabecalho_mp3(dados, pos):
+    """Lê o cabeçalho do frame MP3 em 'pos'. Retorna (tamanho_frame, amostras_por_frame, frame_rate, canais) ou None."""
+    if pos + 4 > len(dados) or dados[pos] != 0xFF or (dados[pos + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2, b3 = dados[pos + 1], dados[pos + 2], dados[pos + 3]
+    versao = {0: 25, 2: 2, 3: 1}.get((b1 >> 3) & 3)
+    camada = {1: 3, 2: 2, 3: 1}.get((b1 >> 1) & 3)
+    indice_bitrate, indice_rate = b2 >> 4, (b2 >> 2) & 3
+    if versao is None or camada is None or indice_bitrate in (0, 15) or indice_rate == 3:
+        return None
+    bitrate = _MP3_BITRATES[(1 if versao == 1 else 2, camada)][indice_bitrate] * 1000
+    frame_rate = _MP3_SAMPLE_RATES[versao][indice_rate]
+    padding = (b2 >> 1) & 1
+    canais = 1 if (b3 >> 6) == 3 else 2
+    if camada == 1:
+        return (12 * bitrate // frame_rate + padding) * 4, 384, frame_rate, canais
+    if camada == 3 and versao != 1:
+        return 72 * bitrate // frame_rate + padding, 576, frame_rate, canais
+    return 144 * bitrate // frame_rate + padding, 1152, frame_rate, canais
 
-    speed_factor = original_duration_ms / target_duration_ms
+def _info_xing(dados, pos, versao_1, canais):
+    """
+    Lê o cabeçalho Xing/Info/VBRI do primeiro frame, se existir. Retorna (frames, atraso, preenchimento) ou None:
+    frames é o número de frames de áudio declarado (None se ausente); atraso e preenchimento são as amostras
+    de encoder delay e padding da extensão LAME (0 sem ela), que os decodificadores descartam.
+    """
+    offset = pos + 4 + ((32 if canais == 2 else 17) if versao_1 else (17 if canais == 2 else 9))
+    if dados[offset:offset + 4] in (b"Xing", b"Info") and len(dados) >= offset + 8:
+        flags = int.from_bytes(dados[offset + 4:offset + 8], "big")
+        campo = offset + 8
+        frames = None
+        if flags & 1:
+            if len(dados) < campo + 4:
+                return None # Cabeçalho truncado
+            frames = int.from_bytes(dados[campo:campo + 4], "big")
+            campo += 4
+        campo += (4 if flags & 2 else 0) + (100 if flags & 4 else 0) + (4 if flags & 8 else 0)
+        atraso = preenchimento = 0
+        # Extensão LAME (o FFmpeg grava a mesma estrutura com "Lavc"/"Lavf"): delay e padding em 12 bits cada
+        if dados[campo:campo + 4] in (b"LAME", b"Lavc", b"Lavf") and len(dados) >= campo + 24:
+            valor = int.from_bytes(dados[campo + 21:campo + 24], "big")
+            atraso, preenchimento = valor >> 12, valor & 0xFFF
+        return frames, atraso, preenchimento
+    if dados[pos + 36:pos + 40] == b"VBRI" and len(dados) >= pos + 54:
+        return int.from_bytes(dados[pos + 50:pos + 54], "big"), 0, 0
+    return None
 
-    # Se a velocidade já for quase perfeita, apenas renomeia para evitar re-compressão
-    if 0.99 < speed_factor < 1.01:
-        Path(input_file).rename(output_file)
-        return AudioSegment.from_mp3(output_file)
+def analisar_mp3(dados):
+    """
+    Calcula a duração de um MP3 lendo apenas os cabeçalhos dos frames.
+    Retorna (duracao_ms, frame_rate, canais) ou None se os dados não parecerem MP3.
+    """
+    pos = 0
+    # Pula tags ID3v2 (podem aparecer mais de uma vez em arquivos concatenados)
+    while dados[pos:pos + 3] == b"ID3" and len(dados) >= pos + 10:
+        tamanho = (dados[pos + 6] << 21) | (dados[pos + 7] << 14) | (dados[pos + 8] << 7) | dados[pos + 9]
+        pos += 10 + tamanho + (10 if dados[pos + 5] & 0x10 else 0)
+
+    total_amostras = 0
+    descontar = 0
+    frame_rate = canais = None
+    primeiro = True
+    while pos + 4 <= len(dados):
+        cabecalho = _ler_cabecalho_mp3(dados, pos)
+        if cabecalho is None:
+            if dados[pos:pos + 3] == b"TAG": # ID3v1 no fim do arquivo
+                break
+            # Ressincroniza no próximo byte de sync
+            proximo = dados.find(b"\xff", pos + 1)
+            if proximo < 0:
+                break
+            pos = proximo
+            continue
+        tamanho_frame, amostras, rate, ch = cabecalho
+        if primeiro:
+            # Confirma que é mesmo um frame: o próximo cabeçalho também precisa ser válido
+            if pos + tamanho_frame < len(dados) and _ler_cabecalho_mp3(dados, pos + tamanho_frame) is None:
+                pos += 1
+                continue
+            primeiro = False
+            frame_rate, canais = rate, ch
+            info_xing = _info_xing(dados, pos, (dados[pos + 1] & 0x18) == 0x18, ch)
+            if info_xing is not None:
+                frames_vbr, atraso, preenchimento = info_xing
+                if frames_vbr:
+                    return max(0, frames_vbr * amostras - atraso - preenchimento) * 1000 / rate, rate, ch
+                # O frame do cabeçalho Xing/Info não tem áudio; delay e padding saem do total no fim
+                descontar = atraso + preenchimento
+                pos += tamanho_frame
+                continue
+        if pos + tamanho_frame > len(dados):
+            break # Frame final truncado
+        total_amostras += amostras * frame_rate / rate
+        pos += tamanho_frame
+
+    if frame_rate is None:
+        return None
+    return max(0, total_amostras - descontar) * 1000 / frame_rate, frame_rate, canais
+
+async def obter_duracao_ms(input_file):
+    """Duração do áudio em ms: lê os cabeçalhos MP3 no próprio processo e só usa ffprobe/pydub como último recurso."""
+    try:
+        info = analisar_mp3(Path(input_file).read_bytes())
+        if info and info[0] > 0:
+            contar("duracao", metodo="cabecalho")
+            return info[0]
+    except (OSError, ValueError, IndexError):
+        pass # Arquivo ilegível ou cabeçalho corrompido: o ffprobe decide
 
-    # Constrói a cadeia de filtros 'atempo'
+    # Usa ffprobe sem bloquear o loop de eventos
+    try:
+        with medir("ffprobe"):
+            proc = await asyncio.create_subprocess_exec(
+                "ffprobe", "-v", "error", "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1", str(input_file),
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+            stdout, _ = await proc.communicate()
+        if proc.returncode == 0:
+            contar("duracao", metodo="ffprobe")
+            return float(stdout.decode().strip()) * 1000
+    except (FileNotFoundError, ValueError):
+        pass
+    # Fallback para pydub se ffprobe não estiver disponível ou falhar
+    contar("duracao", metodo="pydub")
+    return len(AudioSegment.from_mp3(input_file))
+
+def cadeia_atempo(speed_factor):
+    """Constrói a cadeia de filtros 'atempo' do FFmpeg para um fator de velocidade qualquer."""
     atempo_filters = []
     current_factor = speed_factor
     
@@ -72,8 +321,43 @@ async def adjust_audio_speed(input_file, output_file, target_duration_ms):
     # Adiciona o fator final (que agora está entre 0.5 e 2.0)
     if current_factor != 1.0:
         atempo_filters.append(f"atempo={current_factor:.5f}")
+    return atempo_filters
 
-    filter_string = ",".join(atempo_filters)
+# --- VERSÃO COMPLETAMENTE NOVA E ROBUSTA ---
+async def adjust_audio_speed(input_file, output_file, target_duration_ms, motor=None):
+    """
+    Ajusta a velocidade do áudio usando o filtro 'atempo' do FFmpeg para máxima qualidade.
+    Com motor="numpy", o FFmpeg só decodifica e codifica; o ajuste é feito pelo esticar_wsola.
+    Lança RuntimeError se o áudio de entrada não tiver duração ou o FFmpeg falhar, sem escrever
+    output_file, para quem chama poder tentar de novo em vez de guardar silêncio como resultado.
+    """
+    motor = escolher_motor_ajuste(motor)
+    original_duration_ms = await obter_duracao_ms(input_file)
+
+    if target_duration_ms <= 0:
+        silent_audio = AudioSegment.silent(duration=target_duration_ms)
+        silent_audio.export(output_file, format="mp3", bitrate="192k")
+        return silent_audio
+    if original_duration_ms == 0:
+        raise RuntimeError(f"O áudio {input_file} não tem duração; nada para ajustar.")
+
+    speed_factor = original_duration_ms / target_duration_ms
+
+    # Se a velocidade já for quase perfeita, apenas renomeia para evitar re-compressão
+    if 0.99 < speed_factor < 1.01:
+        Path(input_file).rename(output_file)
+        return AudioSegment.from_mp3(output_file)
+
+    if motor == "numpy":
+        try:
+            amostras = await ajustar_velocidade_pcm(Path(input_file).read_bytes(), target_duration_ms, motor="numpy")
+        except ValueError:
+            pass # Não é MP3 (ex.: WAV): segue pelo atempo do FFmpeg, que lê qualquer formato
+        else:
+            await _codificar_mp3(amostras, output_file)
+            return AudioSegment(data=amostras.tobytes(), sample_width=2, frame_rate=TIMELINE_FRAME_RATE, channels=amostras.shape[1])
+
+    filter_string = ",".join(cadeia_atempo(speed_factor))
 
     # Executa o comando FFmpeg
     ffmpeg_cmd = [
@@ -84,54 +368,371 @@ async def adjust_audio_speed(input_file, output_file, target_duration_ms):
 
     try:
         # Roda o subprocesso bloqueante em uma thread separada para não congelar a UI
-        proc = await asyncio.create_subprocess_exec(
-            *ffmpeg_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await proc.communicate()
-        if proc.returncode != 0:
-            print(f"Erro no FFmpeg ao ajustar a velocidade: {stderr.decode()}")
-            # Em caso de erro, cria silêncio para não quebrar o processo
-            silent = AudioSegment.silent(duration=target_duration_ms)
-            silent.export(output_file, format="mp3")
+        with medir("atempo", modo="arquivo", motor="ffmpeg"):
+            proc = await asyncio.create_subprocess_exec(
+                *ffmpeg_cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await proc.communicate()
     except FileNotFoundError:
         print("ERRO: FFmpeg não encontrado. Verifique se ele está instalado e no PATH do sistema.")
         raise
+    if proc.returncode != 0:
+        # Um arquivo parcial não pode ser confundido com o resultado
+        Path(output_file).unlink(missing_ok=True)
+        raise RuntimeError(f"Erro no FFmpeg ao ajustar a velocidade: {stderr.decode()}")
     
     return AudioSegment.from_mp3(output_file)
 
 
-async def merge_audio_files(output_folder, srt_file_path):
-    """Mescla segmentos de áudio baseados nos tempos de um arquivo SRT com sincronização correta."""
-    subs = pysrt.open(srt_file_path)
-    final_audio = AudioSegment.silent(duration=0)
+# Taxa de amostragem usada na montagem da linha do tempo (a mesma que o ajuste de velocidade gera)
+TIMELINE_FRAME_RATE = 44100
+
+def segmento_para_pcm(segmento, frame_rate=TIMELINE_FRAME_RATE, channels=None):
+    """Converte um AudioSegment em um array int16 com formato (amostras, canais)."""
+    segmento = segmento.set_frame_rate(frame_rate).set_sample_width(2)
+    if channels and segmento.channels != channels:
+        segmento = segmento.set_channels(channels)
+    return np.frombuffer(segmento.raw_data, dtype=np.int16).reshape(-1, segmento.channels)
+
+class MontadorLinhaDoTempo:
+    """
+    Monta o áudio final de um SRT em um único buffer PCM, escrevendo cada trecho
+    na sua posição com fatiamento do NumPy em vez de concatenar AudioSegments.
+    """
+
+    def __init__(self, duracao_ms, frame_rate=TIMELINE_FRAME_RATE):
+        self.frame_rate = frame_rate
+        self.duracao_ms = max(0, duracao_ms)
+        self.channels = None
+        self._buffer = None
+        self._cursor = 0 # Posição (em amostras) do fim do áudio já montado
+
+    def _ms_para_amostras(self, ms):
+        return int(round(ms * self.frame_rate / 1000))
+
+    def _garantir_buffer(self, channels, amostras_necessarias):
+        # O buffer é alocado uma vez com a duração do SRT; só cresce se algum trecho empurrar o fim para frente
+        if self._buffer is None:
+            self.channels = channels
+            tamanho = max(self._ms_para_amostras(self.duracao_ms), amostras_necessarias)
+            self._buffer = np.zeros((tamanho, channels), dtype=np.int16)
+        elif channels > self.channels:
+            self._buffer = np.repeat(self._buffer, channels // self.channels, axis=1)
+            self.channels = channels
+        if amostras_necessarias > len(self._buffer):
+            novo_tamanho = max(amostras_necessarias, int(len(self._buffer) * 1.5))
+            novo = np.zeros((novo_tamanho, self.channels), dtype=np.int16)
+            # O cursor pode já estar além do fim do buffer (legenda ausente depois de um trecho que estourou)
+            copiar = min(self._cursor, len(self._buffer))
+            novo[:copiar] = self._buffer[:copiar]
+            self._buffer = novo
+
+    def adicionar(self, start_time_ms, end_time_ms, amostras=None):
+        """Adiciona um trecho (array int16) na linha do tempo; sem amostras, ocupa a duração da legenda com silêncio."""
+        cursor_ms = self._cursor * 1000 / self.frame_rate
+        if start_time_ms - cursor_ms > 5: # Adiciona uma pequena margem para evitar micro-silêncios
+            self._cursor = self._ms_para_amostras(start_time_ms)
+
+        if amostras is not None and len(amostras) > 0:
+            if self.channels and amostras.shape[1] < self.channels:
+                amostras = np.repeat(amostras, self.channels // amostras.shape[1], axis=1)
+            fim = self._cursor + len(amostras)
+            self._garantir_buffer(amostras.shape[1], fim)
+            self._buffer[self._cursor:fim] = amostras
+            self._cursor = fim
+        else:
+            # Trecho ausente: apenas avança o cursor, o buffer já está zerado (silêncio)
+            self._cursor += self._ms_para_amostras(max(0, end_time_ms - start_time_ms))
+
+    def para_audio_segment(self):
+        """Retorna o áudio montado como AudioSegment."""
+        self._garantir_buffer(self.channels or 1, self._cursor)
+        dados = self._buffer[:self._cursor]
+        return AudioSegment(data=dados.tobytes(), sample_width=2, frame_rate=self.frame_rate, channels=self.channels)
+
+def esticar_wsola(amostras, speed_factor, frame_rate=TIMELINE_FRAME_RATE, quadro_ms=40, tolerancia_ms=10):
+    """
+    Muda a duração de um PCM int16 (amostras, canais) sem mudar o tom, por WSOLA (overlap-add com busca
+    de similaridade), no próprio processo. Mesma semântica do atempo: speed_factor > 1 acelera, < 1
+    desacelera, e o resultado tem round(amostras / speed_factor) amostras. Aceita qualquer fator, sem
+    a cadeia de filtros que o atempo precisa fora de 0.5–2.0.
+    """
+    amostras = np.asarray(amostras)
+    n, canais = amostras.shape
+    saida_len = int(round(n / speed_factor))
+    if saida_len <= 0 or n == 0:
+        return np.zeros((max(0, saida_len), canais), dtype=np.int16)
+
+    N = max(2, int(frame_rate * quadro_ms / 1000) // 2 * 2) # Tamanho do quadro
+    if n < N or saida_len < N:
+        # Trecho menor que um quadro: reamostragem linear simples (muda o tom, mas dura menos de 40 ms)
+        posicoes = np.linspace(0, n - 1, saida_len)
+        saida = np.stack([np.interp(posicoes, np.arange(n), amostras[:, c]) for c in range(canais)], axis=1)
+        return np.clip(np.round(saida), -32768, 32767).astype(np.int16)
+
+    passo_saida = N // 2
+    passo_entrada = passo_saida * speed_factor
+    tolerancia = int(frame_rate * tolerancia_ms / 1000)
+    num_quadros = saida_len // passo_saida + 1
+    # Margem de 'tolerancia' antes (busca para trás) e espaço depois para o último quadro e sua busca
+    tamanho = tolerancia + max(n, int(np.ceil((num_quadros - 1) * passo_entrada)) + 2 * tolerancia + 2 * N)
+    x = np.zeros((tamanho, canais), dtype=np.float32)
+    x[tolerancia:tolerancia + n] = amostras
+
+    # A similaridade é medida num sinal mono reduzido (média de blocos de ~8 kHz), bem mais barato que na taxa cheia
+    d = max(1, frame_rate // 8000)
+    mono = x.mean(axis=1)
+    mono = mono[:len(mono) // d * d].reshape(-1, d).mean(axis=1)
+    energia = np.concatenate(([0.0], np.cumsum(mono.astype(np.float64) ** 2)))
+    N_reduzido = N // d
+
+    janela = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(N) / N)).astype(np.float32) # Hann periódica
+    saida = np.zeros((num_quadros * passo_saida + N, canais), dtype=np.float32)
+    peso = np.zeros(num_quadros * passo_saida + N, dtype=np.float32)
+    inicio = tolerancia
+    for k in range(num_quadros):
+        if k:
+            # Procura, perto da posição ideal, o trecho mais parecido com a continuação natural do quadro anterior
+            ideal = int(round(k * passo_entrada)) + tolerancia
+            natural = (inicio + passo_saida) // d
+            lo, hi = (ideal - tolerancia) // d, (ideal + tolerancia) // d
+            correlacao = np.correlate(mono[lo:hi + N_reduzido], mono[natural:natural + N_reduzido], "valid")
+            energia_regiao = energia[lo + N_reduzido:hi + N_reduzido + 1] - energia[lo:hi + 1]
+            correlacao = correlacao / np.sqrt(np.maximum(energia_regiao[:len(correlacao)], 1e-9))
+            inicio = (lo + int(np.argmax(correlacao))) * d
+        p = k * passo_saida
+        saida[p:p + N] += x[inicio:inicio + N] * janela[:, None]
+        peso[p:p + N] += janela
+
+    saida = saida[:saida_len] / np.maximum(peso[:saida_len], 1e-3)[:, None]
+    return np.clip(np.round(saida), -32768, 32767).astype(np.int16)
+
+async def _codificar_mp3(amostras, output_file, frame_rate=TIMELINE_FRAME_RATE):
+    """Codifica um PCM int16 (amostras, canais) em MP3 com os mesmos parâmetros do adjust_audio_speed."""
+    proc = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-f", "s16le", "-ar", str(frame_rate),
+        "-ac", str(amostras.shape[1]), "-i", "pipe:0", "-b:a", "192k", "-ar", "44100", str(output_file),
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await proc.communicate(amostras.tobytes())
+    if proc.returncode != 0:
+        raise RuntimeError(f"FFmpeg não conseguiu codificar {output_file}: {stderr.decode()}")
+
+async def ajustar_velocidade_pcm(dados_mp3, target_duration_ms, frame_rate=TIMELINE_FRAME_RATE, motor=None):
+    """
+    Versão em memória do adjust_audio_speed: decodifica o MP3 do provedor uma única vez
+    (aplicando o 'atempo' no mesmo processo do FFmpeg, via pipes) e retorna PCM int16 (amostras, canais).
+    Com motor="numpy", o FFmpeg só decodifica e o ajuste é feito pelo esticar_wsola.
+    Lança RuntimeError se o áudio não tiver duração, o FFmpeg falhar ou não decodificar nada: quem chama
+    tenta de novo em vez de usar (e guardar no manifesto) silêncio como se fosse a legenda.
+    """
+    motor = escolher_motor_ajuste(motor)
+    info = analisar_mp3(dados_mp3)
+    if info is None:
+        raise ValueError("Os dados recebidos do provedor não são um MP3 válido.")
+    original_duration_ms, _, channels = info
+
+    if target_duration_ms <= 0:
+        return np.zeros((0, channels), dtype=np.int16)
+    if original_duration_ms == 0:
+        raise RuntimeError("O áudio recebido do provedor não tem duração; nada para ajustar.")
+
+    speed_factor = original_duration_ms / target_duration_ms
+    # Mesmo critério do adjust_audio_speed: perto de 1.0x o áudio é só decodificado
+    ajustar = not 0.99 < speed_factor < 1.01
+    filtros = cadeia_atempo(speed_factor) if ajustar and motor == "ffmpeg" else []
+
+    ffmpeg_cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "mp3", "-i", "pipe:0"]
+    if filtros:
+        ffmpeg_cmd += ["-filter:a", ",".join(filtros)]
+    ffmpeg_cmd += ["-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(frame_rate), "-ac", str(channels), "pipe:1"]
+
+    try:
+        with medir("atempo", modo="pcm", motor="ffmpeg") if filtros else medir("decodificacao"):
+            proc = await asyncio.create_subprocess_exec(
+                *ffmpeg_cmd,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await proc.communicate(dados_mp3)
+    except FileNotFoundError:
+        print("ERRO: FFmpeg não encontrado. Verifique se ele está instalado e no PATH do sistema.")
+        raise
+    if proc.returncode != 0:
+        raise RuntimeError(f"Erro no FFmpeg ao ajustar a velocidade: {stderr.decode()}")
+    amostras = np.frombuffer(stdout, dtype=np.int16).reshape(-1, channels)
+    if not len(amostras):
+        raise RuntimeError("O FFmpeg não decodificou nenhuma amostra do áudio recebido do provedor.")
+    if ajustar and motor == "numpy":
+        # O fator sai das amostras decodificadas (não da duração estimada pelo cabeçalho): o resultado tem a duração exata da legenda
+        alvo = max(1, int(round(target_duration_ms * frame_rate / 1000)))
+        with medir("atempo", modo="pcm", motor="numpy"):
+            amostras = esticar_wsola(amostras, len(amostras) / alvo, frame_rate)
+    return amostras
+
+def _montar_e_exportar(subs, srt_file_path, obter_amostras, output_file=None):
+    """Monta a linha do tempo do SRT com as amostras de cada legenda e exporta o MP3 final (única codificação).
+    Sem output_file, o arquivo vai para output/srt_output/{nome}_final.mp3."""
     base_name = Path(srt_file_path).stem
+    duracao_total_ms = max((timetoms(sub.end) for sub in subs), default=0)
+    montador = MontadorLinhaDoTempo(duracao_total_ms)
     
-    with tqdm(total=len(subs), desc=f"Mesclando áudios para {base_name}", unit="segmento") as pbar:
+    with medir("montagem"), tqdm(total=len(subs), desc=f"Mesclando áudios para {base_name}", unit="segmento") as pbar:
         for sub in subs:
-            start_time_ms = timetoms(sub.start)
-            end_time_ms = timetoms(sub.end)
-            
-            audio_file = Path(output_folder) / f"{sub.index:02d}.mp3"
-            
-            silence_duration = start_time_ms - len(final_audio)
-            if silence_duration > 5: # Adiciona uma pequena margem para evitar micro-silêncios
-                final_audio += AudioSegment.silent(duration=silence_duration)
-            
-            if audio_file.exists() and audio_file.stat().st_size > 0:
-                audio_segment = AudioSegment.from_mp3(str(audio_file))
-                final_audio += audio_segment
-            else:
-                segment_duration = end_time_ms - start_time_ms
-                final_audio += AudioSegment.silent(duration=max(0, segment_duration))
-            
+            montador.adicionar(timetoms(sub.start), timetoms(sub.end), obter_amostras(sub, montador.frame_rate))
             pbar.update(1)
+        final_audio = montador.para_audio_segment()
+    if output_file:
+        output_file_path = Path(output_file)
+    else:
+        output_file_path = Path("output/srt_output") / f"{base_name}_final.mp3"
+    output_file_path.parent.mkdir(parents=True, exist_ok=True)
+    with medir("exportacao"):
+        final_audio.export(str(output_file_path), format="mp3", bitrate="192k")
+    print(f"\nÁudio final salvo em: {output_file_path}\n")
+    return str(output_file_path)
+
+async def merge_audio_files(output_folder, srt_file_path, output_file=None):
+    """Mescla segmentos de áudio baseados nos tempos de um arquivo SRT com sincronização correta."""
+    subs = pysrt.open(srt_file_path)
+
+    def obter_amostras(sub, frame_rate):
+        audio_file = Path(output_folder) / f"{sub.index:02d}.mp3"
+        if audio_file.exists() and audio_file.stat().st_size > 0:
+            # Decodificar cada MP3 intermediário costuma dominar a montagem em disco
+            with medir("decodificacao"):
+                return segmento_para_pcm(AudioSegment.from_mp3(str(audio_file)), frame_rate)
+        return None
+
+    return _montar_e_exportar(subs, srt_file_path, obter_amostras, output_file)
+
+async def merge_audio_pcm(audios, srt_file_path, output_file=None):
+    """Mescla as legendas já decodificadas em memória ({índice: array PCM}); legendas ausentes viram silêncio."""
+    subs = pysrt.open(srt_file_path)
+    return _montar_e_exportar(subs, srt_file_path, lambda sub, frame_rate: audios.get(sub.index), output_file)
+
+def posicoes_linha_do_tempo(subs, frame_rate=TIMELINE_FRAME_RATE):
+    """
+    Posição de cada legenda na linha do tempo, pela mesma regra do MontadorLinhaDoTempo.adicionar
+    (legendas sobrepostas empurram as seguintes), supondo que cada trecho dura exatamente a sua legenda.
+    Retorna ([(sub, início em amostras, amostras)], total de amostras).
+    """
+    ms_para_amostras = lambda ms: int(round(ms * frame_rate / 1000))
+    cursor = 0
+    posicoes = []
+    for sub in subs:
+        start_time_ms, end_time_ms = timetoms(sub.start), timetoms(sub.end)
+        if start_time_ms - cursor * 1000 / frame_rate > 5:
+            cursor = ms_para_amostras(start_time_ms)
+        amostras = ms_para_amostras(max(0, end_time_ms - start_time_ms))
+        posicoes.append((sub, cursor, amostras))
+        cursor += amostras
+    return posicoes, cursor
+
+def grafo_linha_do_tempo(trechos, total_amostras, channels, frame_rate=TIMELINE_FRAME_RATE):
+    """
+    Texto do filter_complex que monta uma linha do tempo inteira num único processo do FFmpeg.
+    trechos é uma lista de (fator de velocidade ou None, início em amostras, amostras), um por entrada,
+    em ordem e sem sobreposição (como os de posicoes_linha_do_tempo). Cada trecho passa pela sua cadeia
+    atempo, é cortado/completado com silêncio até a duração exata e recebe com adelay o silêncio que o
+    separa do anterior; o concat junta tudo em [saida]. Como a linha do tempo nunca se sobrepõe, o concat
+    faz o papel de uma mistura com amix, mas com custo linear (o amix processaria cada entrada até o fim).
+    """
+    layout = "stereo" if channels > 1 else "mono"
+    linhas = []
+    fim_anterior = 0
+    for i, (speed_factor, inicio, amostras) in enumerate(trechos):
+        # Mesmo critério do adjust_audio_speed: perto de 1.0x não há atempo
+        filtros = cadeia_atempo(speed_factor) if speed_factor and not 0.99 < speed_factor < 1.01 else []
+        filtros += [
+            f"aresample={frame_rate}", f"aformat=sample_fmts=fltp:channel_layouts={layout}",
+            "apad", f"atrim=end_sample={amostras}",
+        ]
+        if inicio > fim_anterior:
+            filtros.append("adelay=" + "|".join([f"{inicio - fim_anterior}S"] * channels))
+        fim_anterior = max(fim_anterior, inicio) + amostras
+        linhas.append(f"[{i}:a]{','.join(filtros)}[a{i}];")
+    entradas = "".join(f"[a{i}]" for i in range(len(trechos)))
+    linhas.append(f"{entradas}concat=n={len(trechos)}:v=0:a=1,apad,atrim=end_sample={total_amostras}[saida]")
+    return "\n".join(linhas) + "\n"
+
+async def _renderizar_grafo(entradas, grafo, saida, codificacao, pasta_temp):
+    """Roda o FFmpeg uma vez com as entradas e o grafo (passado por arquivo, que pode ser grande)."""
+    script = Path(pasta_temp) / f"{Path(saida).name}.grafo"
+    script.write_text(grafo, encoding="utf-8")
+    ffmpeg_cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error"]
+    for entrada in entradas:
+        ffmpeg_cmd += ["-i", str(entrada)]
+    ffmpeg_cmd += ["-filter_complex_script", str(script), "-map", "[saida]", *codificacao, str(saida)]
+    try:
+        proc = await asyncio.create_subprocess_exec(*ffmpeg_cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    except FileNotFoundError:
+        print("ERRO: FFmpeg não encontrado. Verifique se ele está instalado e no PATH do sistema.")
+        raise
+    _, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"FFmpeg não conseguiu montar {saida}: {stderr.decode()}")
+
+async def merge_audio_ffmpeg(brutos, srt_file_path, output_file=None, lote=RENDER_LOTE):
+    """
+    Montagem "ffmpeg": recebe o MP3 bruto de cada legenda ({índice: caminho}), sem ajuste prévio, e faz
+    ajuste de velocidade, posicionamento, mistura e codificação num único processo do FFmpeg.
+    Com mais de 'lote' legendas, cada lote vira um WAV intermediário e uma última passada junta os lotes.
+    Legendas ausentes viram silêncio.
+    """
+    subs = pysrt.open(srt_file_path)
+    base_name = Path(srt_file_path).stem
+    if output_file:
+        output_file_path = Path(output_file)
+    else:
+        output_file_path = Path("output/srt_output") / f"{base_name}_final.mp3"
+    output_file_path.parent.mkdir(parents=True, exist_ok=True)
+    frame_rate = TIMELINE_FRAME_RATE
+    codificacao_final = ["-ar", str(frame_rate), "-b:a", "192k"]
+
+    posicoes, total_amostras = posicoes_linha_do_tempo(subs, frame_rate)
+    trechos = [] # (caminho, fator de velocidade, início, amostras)
+    channels = 1
+    for sub, inicio, amostras in posicoes:
+        caminho = brutos.get(sub.index)
+        if caminho is None or amostras == 0:
+            continue
+        info = analisar_mp3(Path(caminho).read_bytes())
+        if info is None or info[0] == 0:
+            print(f"Aviso: o áudio da legenda {sub.index} não é um MP3 válido. Usando silêncio.")
+            continue
+        channels = max(channels, info[2])
+        trechos.append((caminho, info[0] / (timetoms(sub.end) - timetoms(sub.start)), inicio, amostras))
+
+    with medir("render_ffmpeg"):
+        if not trechos:
+            AudioSegment.silent(duration=total_amostras * 1000 / frame_rate, frame_rate=frame_rate).export(str(output_file_path), format="mp3", bitrate="192k")
+        else:
+            with tempfile.TemporaryDirectory(dir=output_file_path.parent) as pasta_temp:
+                lote = max(1, int(lote))
+                if len(trechos) > lote:
+                    # Os lotes não se sobrepõem (a linha do tempo só anda para frente): cada um vira um trecho da passada final
+                    async def renderizar_lote(numero, grupo):
+                        inicio_lote = grupo[0][2]
+                        fim_lote = grupo[-1][2] + grupo[-1][3]
+                        grafo = grafo_linha_do_tempo([(fator, inicio - inicio_lote, amostras) for _, fator, inicio, amostras in grupo], fim_lote - inicio_lote, channels, frame_rate)
+                        parcial = Path(pasta_temp) / f"lote_{numero:04d}.wav"
+                        await _renderizar_grafo([caminho for caminho, *_ in grupo], grafo, parcial, ["-c:a", "pcm_s16le"], pasta_temp)
+                        return parcial, None, inicio_lote, fim_lote - inicio_lote
+
+                    # Um FFmpeg por núcleo: o grafo de cada lote roda numa thread só
+                    semaforo = asyncio.Semaphore(os.cpu_count() or 1)
+                    async def com_vaga(numero, grupo):
+                        async with semaforo:
+                            return await renderizar_lote(numero, grupo)
+                    grupos = [trechos[k:k + lote] for k in range(0, len(trechos), lote)]
+                    trechos = await asyncio.gather(*(com_vaga(numero, grupo) for numero, grupo in enumerate(grupos)))
 
-    srt_output_dir = Path("output/srt_output")
-    srt_output_dir.mkdir(parents=True, exist_ok=True)
-    output_file_path = srt_output_dir / f"{base_name}_final.mp3"
-    final_audio.export(str(output_file_path), format="mp3", bitrate="192k")
+                grafo = grafo_linha_do_tempo([trecho[1:] for trecho in trechos], total_amostras, channels, frame_rate)
+                await _renderizar_grafo([trecho[0] for trecho in trechos], grafo, output_file_path, codificacao_final, pasta_temp)
     print(f"\nÁudio final salvo em: {output_file_path}\n")
     return str(output_file_path)
 
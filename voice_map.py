@@ -349,3 +349,48 @@ SUPPORTED_VOICES = {
      'zu-ZA-ThandoNeural',
      'zu-ZA-ThembaNeural',
 }
+
+# --- DICIONÁRIO DE VOZES CATEGORIZADAS DO TIKTOK ---
+TIKTOK_VOICES_CATEGORIZED = {
+    'Português (Brasil)': [
+        'BR_FEMALE_1', 'BR_FEMALE_2', 'BR_FEMALE_3', 'BR_MALE', 
+        'BP_FEMALE_IVETE', 'BP_FEMALE_LUDMILLA', 'PT_FEMALE_LHAYS', 'PT_FEMALE_LAIZZA', 'PT_MALE_BUENO'
+    ],
+    'Inglês (EUA)': [
+        'US_FEMALE_1', 'US_FEMALE_2', 'US_MALE_1', 'US_MALE_2', 'US_MALE_3', 'US_MALE_4'
+    ],
+    'Inglês (Reino Unido)': ['UK_MALE_1', 'UK_MALE_2'],
+    'Inglês (Austrália)': ['AU_FEMALE_1', 'AU_MALE_1'],
+    'Inglês (Personagens Especiais)': [
+        'MALE_JOMBOY', 'MALE_CODY', 'FEMALE_SAMC', 'FEMALE_MAKEUP', 'FEMALE_RICHGIRL', 
+        'MALE_ASHMAGIC', 'MALE_OLANTERKKERS', 'MALE_UKNEIGHBOR', 'MALE_UKBUTLER', 
+        'FEMALE_SHENNA', 'FEMALE_PANSINO', 'MALE_TREVOR', 'FEMALE_BETTY', 'MALE_CUPID', 
+        'FEMALE_GRANDMA', 'MALE_NARRATION', 'MALE_FUNNY', 'FEMALE_EMOTIONAL'
+    ],
+    'Inglês Personagens (Filmes e Outros)': [
+        'GHOSTFACE', 'CHEWBACCA', 'C3PO', 'STITCH', 'STORMTROOPER', 'ROCKET', 
+        'MADAME_LEOTA', 'GHOST_HOST', 'PIRATE', 'MALE_GRINCH', 'MALE_DEADPOOL', 'MALE_JARVIS'
+    ],
+    'Inglês Personagens (Festivos)': [
+        'MALE_XMXS_CHRISTMAS', 'MALE_SANTA_NARRATION', 'MALE_SANTA_EFFECT', 
+        'FEMALE_HT_NEYEAR', 'MALE_WIZARD', 'FEMALE_HT_HALLOWEEN'
+    ],
+    'Inglês Cantores / Músicas': [
+        'MALE_SING_DEEP_JINGLE', 'SING_FEMALE_ALTO', 'SING_MALE_TENOR', 'SING_FEMALE_WARMY_BREEZE',
+        'SING_MALE_SUNSHINE_SOON', 'SING_FEMALE_GLORIOUS', 'SING_MALE_IT_GOES_UP', 
+        'SING_MALE_CHIPMUNK', 'SING_FEMALE_WONDERFUL_WORLD', 'SING_MALE_FUNNY_THANKSGIVING'
+    ],
+    'Japonês': [
+        'JP_FEMALE_1', 'JP_FEMALE_2', 'JP_FEMALE_3', 'JP_MALE', 'JP_FEMALE_FUJICOCHAN', 
+        'JP_FEMALE_HASEGAWARIONA', 'JP_MALE_KEIICHINAKANO', 'JP_FEMALE_OOMAEAIIKA', 
+        'JP_MALE_YUJINCHIGUSA', 'JP_FEMALE_SHIROU', 'JP_MALE_TAMAWAKAZUKI', 
+        'JP_FEMALE_KAORISHOJI', 'JP_FEMALE_YAGISHAKI', 'JP_MALE_HIKAKIN', 'JP_FEMALE_REI',
+        'JP_MALE_SHUICHIRO', 'JP_MALE_MATSUDAKE', 'JP_FEMALE_MACHIKORIIITA', 
+        'JP_MALE_MATSUO', 'JP_MALE_OSADA'
+    ],
+    'Coreano': ['KR_MALE_1', 'KR_FEMALE', 'KR_MALE_2'],
+    'Espanhol': ['ES_MALE', 'ES_MX_MALE'],
+    'Francês': ['FR_MALE_1', 'FR_MALE_2'],
+    'Alemão': ['DE_FEMALE', 'DE_MALE'],
+    'Indonésio': ['ID_FEMALE']
+}
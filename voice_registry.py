@@ -0,0 +1,221 @@
+# voice_registry.py
+
+import os
+import json
+import time
+import pickle
+import threading
+from collections import defaultdict
+
+from voice_map import SUPPORTED_VOICES, TIKTOK_VOICES_CATEGORIZED
+
+# --- Configuração (pode ser sobrescrita por variáveis de ambiente) ---
+VOZES_ARQUIVO = os.environ.get("QUICKTTS_VOZES_ARQUIVO", "voices.json")
+# Idade máxima do voices.json antes de uma atualização em segundo plano; 0 desativa
+VOZES_TTL_HORAS = float(os.environ.get("QUICKTTS_VOZES_TTL_H", "24"))
+# Índice pré-compilado do voices.json, recriado sempre que o arquivo muda
+VOZES_INDICE = os.environ.get("QUICKTTS_VOZES_INDICE", os.path.join("output", "cache", "voices.idx.pkl"))
+_VERSAO_INDICE = 1
+# Intervalo mínimo entre verificações de validade, para manter as consultas baratas
+_INTERVALO_VERIFICACAO_S = 60
+# Depois de uma atualização que falhou (ex.: sem internet), espera mais antes de tentar de novo
+_ESPERA_APOS_FALHA_S = 600
+
+
+class _Catalogo:
+    """Retrato imutável das vozes com os índices prontos. Nunca é alterado depois de criado."""
+
+    def __init__(self, vozes_por_idioma, mtime, indices=None):
+        self.mtime = mtime
+        self.por_idioma = vozes_por_idioma
+        self.idiomas = list(vozes_por_idioma.keys())
+        if indices is None:
+            indices = _indexar(vozes_por_idioma)
+        self.por_nome, self.por_genero, self.opcoes_por_idioma = indices
+        self.tiktok_por_categoria = TIKTOK_VOICES_CATEGORIZED
+        self.tiktok_categoria_por_nome = {
+            nome: categoria for categoria, nomes in TIKTOK_VOICES_CATEGORIZED.items() for nome in nomes
+        }
+
+
+def _indexar(vozes_por_idioma):
+    """Monta os índices por nome, por gênero e as opções formatadas de cada idioma."""
+    por_nome = {}
+    por_genero = defaultdict(list)
+    for idioma, vozes in vozes_por_idioma.items():
+        for voz in vozes:
+            por_nome[voz["name"]] = {"name": voz["name"], "gender": voz["gender"], "language": idioma}
+            por_genero[voz["gender"]].append(voz["name"])
+    opcoes_por_idioma = {
+        idioma: [f"{voz['name']} | {voz['gender']}" for voz in vozes]
+        for idioma, vozes in vozes_por_idioma.items()
+    }
+    return por_nome, dict(por_genero), opcoes_por_idioma
+
+def _vozes_de_supported_voices():
+    """Monta o catálogo a partir de voice_map.SUPPORTED_VOICES quando não há voices.json."""
+    from get_voices import language_mapping
+    vozes_por_idioma = defaultdict(list)
+    for nome in sorted(SUPPORTED_VOICES):
+        idioma = language_mapping.get(nome.split('-')[0], nome.split('-')[0])
+        vozes_por_idioma[idioma].append({"name": nome, "gender": "Unknown"})
+    return dict(sorted(vozes_por_idioma.items()))
+
+
+class RegistroVozes:
+    """Catálogo de vozes em memória com consultas O(1) e atualização em segundo plano.
+
+    O voices.json é lido uma única vez. Quando passa do TTL, uma thread gera a lista
+    nova e troca o catálogo de uma vez; até lá as consultas continuam usando o antigo.
+    """
+
+    def __init__(self, arquivo=VOZES_ARQUIVO, ttl_horas=VOZES_TTL_HORAS, indice=VOZES_INDICE):
+        self.arquivo = arquivo
+        self.indice = indice
+        self.ttl_s = ttl_horas * 3600
+        self._catalogo = self._carregar()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._proxima_verificacao = 0.0
+
+    def _carregar(self):
+        try:
+            st = os.stat(self.arquivo)
+        except OSError as e:
+            print(f"Aviso: não foi possível ler '{self.arquivo}' ({e}). Usando a lista interna de vozes.")
+            return _Catalogo(_vozes_de_supported_voices(), 0.0)
+        chave = (_VERSAO_INDICE, st.st_mtime_ns, st.st_size)
+        catalogo = self._carregar_indice(chave, st.st_mtime)
+        if catalogo is not None:
+            return catalogo
+        try:
+            with open(self.arquivo, 'r', encoding='utf-8') as f:
+                catalogo = _Catalogo(json.load(f), st.st_mtime)
+        except (OSError, ValueError) as e:
+            print(f"Aviso: não foi possível ler '{self.arquivo}' ({e}). Usando a lista interna de vozes.")
+            return _Catalogo(_vozes_de_supported_voices(), 0.0)
+        self._salvar_indice(chave, catalogo)
+        return catalogo
+
+    def _carregar_indice(self, chave, mtime):
+        # O índice só vale para exatamente a mesma versão do voices.json
+        try:
+            with open(self.indice, 'rb') as f:
+                salvo = pickle.load(f)
+            if salvo["chave"] != chave:
+                return None
+            return _Catalogo(salvo["por_idioma"], mtime, salvo["indices"])
+        except Exception:
+            return None
+
+    def _salvar_indice(self, chave, catalogo):
+        try:
+            os.makedirs(os.path.dirname(self.indice) or ".", exist_ok=True)
+            temp = f"{self.indice}.{os.getpid()}.tmp"
+            with open(temp, 'wb') as f:
+                pickle.dump({
+                    "chave": chave,
+                    "por_idioma": catalogo.por_idioma,
+                    "indices": (catalogo.por_nome, catalogo.por_genero, catalogo.opcoes_por_idioma),
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self.indice)
+        except OSError as e:
+            print(f"Aviso: não foi possível salvar o índice de vozes: {e}")
+
+    def _catalogo_atual(self):
+        # Dispara a atualização se o arquivo passou do TTL, sem bloquear a consulta
+        agora = time.monotonic()
+        if self.ttl_s > 0 and agora >= self._proxima_verificacao:
+            self._proxima_verificacao = agora + _INTERVALO_VERIFICACAO_S
+            if time.time() - self._catalogo.mtime > self.ttl_s:
+                self.atualizar()
+        return self._catalogo
+
+    def _executar_atualizacao(self):
+        import asyncio
+        from get_voices import generate_voices_json
+        try:
+            asyncio.run(generate_voices_json(self.arquivo))
+            try:
+                mtime = os.path.getmtime(self.arquivo)
+            except OSError:
+                mtime = None
+            if mtime is not None and mtime != self._catalogo.mtime:
+                self._catalogo = self._carregar() # Troca atômica da referência
+                return
+        except Exception as e:
+            print(f"Erro ao atualizar a lista de vozes: {e}")
+        # O arquivo não mudou: a geração falhou, então adia a próxima tentativa
+        self._proxima_verificacao = time.monotonic() + _ESPERA_APOS_FALHA_S
+
+    def atualizar(self, esperar=0):
+        """Inicia a atualização em segundo plano (se ainda não estiver rodando).
+
+        Com esperar > 0, aguarda até esse número de segundos pelo fim da atualização.
+        Retorna True se não há atualização pendente ao retornar.
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar_atualizacao, name="atualiza-vozes", daemon=True)
+                self._thread.start()
+            thread = self._thread
+        if esperar > 0:
+            thread.join(esperar)
+        return not thread.is_alive()
+
+    # --- Consultas (Edge-TTS) ---
+    def dados(self):
+        """Vozes agrupadas por idioma, no mesmo formato do voices.json. Não modifique o retorno."""
+        return self._catalogo_atual().por_idioma
+
+    def idiomas(self):
+        return self._catalogo_atual().idiomas
+
+    def voz(self, nome):
+        """Retorna {"name", "gender", "language"} da voz, ou None se não existir."""
+        return self._catalogo_atual().por_nome.get(nome)
+
+    def existe(self, nome):
+        return nome in self._catalogo_atual().por_nome
+
+    def vozes_do_idioma(self, idioma):
+        return self._catalogo_atual().por_idioma.get(idioma, [])
+
+    def vozes_do_genero(self, genero):
+        return self._catalogo_atual().por_genero.get(genero, [])
+
+    def opcoes_do_idioma(self, idioma):
+        """Opções formatadas "nome | gênero" para os dropdowns."""
+        return self._catalogo_atual().opcoes_por_idioma.get(idioma, [])
+
+    # --- Consultas (TikTok) ---
+    def categorias_tiktok(self):
+        return list(self._catalogo.tiktok_por_categoria.keys())
+
+    def vozes_tiktok(self, categoria):
+        return self._catalogo.tiktok_por_categoria.get(categoria, [])
+
+    def categoria_tiktok(self, nome):
+        return self._catalogo.tiktok_categoria_por_nome.get(nome)
+
+
+_registro = None
+_registro_lock = threading.Lock()
+
+def get_registro():
+    """Retorna o registro de vozes compartilhado pela aplicação."""
+    global _registro
+    with _registro_lock:
+        if _registro is None:
+            _registro = RegistroVozes()
+        return _registro
+
+def load_voices():
+    """Vozes agrupadas por idioma, vindas do registro em memória (o voices.json é lido uma vez só)."""
+    return get_registro().dados()
+
+def get_voice_options(language, voices_data=None):
+    """Opções "nome | gênero" do idioma; com voices_data, monta a partir desse dicionário."""
+    if voices_data is None:
+        return get_registro().opcoes_do_idioma(language)
+    return [f"{voice['name']} | {voice['gender']}" for voice in voices_data.get(language, [])]